@@ -13,17 +13,42 @@ const ChatInterface: React.FC = () => {
     ragEnabled,
     toggleRag,
     sendMessage,
-    currentSessionId
+    currentSessionId,
+    messagesCursor,
+    loadOlderMessages
   } = useChat();
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const messagesContainerRef = useRef<HTMLDivElement>(null);
+  const loadingOlderRef = useRef(false);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  // Follow new messages at the bottom, but not older ones prepended at the top
+  const lastMessage = messages[messages.length - 1];
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [lastMessage]);
+
+  const handleScroll = async () => {
+    const container = messagesContainerRef.current;
+    if (!container || !messagesCursor || loadingOlderRef.current || container.scrollTop > 50) {
+      return;
+    }
+
+    loadingOlderRef.current = true;
+    const previousHeight = container.scrollHeight;
+    try {
+      await loadOlderMessages();
+      // Keep the messages the user was reading in place
+      requestAnimationFrame(() => {
+        container.scrollTop += container.scrollHeight - previousHeight;
+      });
+    } finally {
+      loadingOlderRef.current = false;
+    }
+  };
 
   const handleSendMessage = async (message: string) => {
     await sendMessage(message);
@@ -50,7 +75,11 @@ const ChatInterface: React.FC = () => {
         />
       </div>
 
-      <div className={styles.messagesContainer}>
+      <div
+        ref={messagesContainerRef}
+        className={styles.messagesContainer}
+        onScroll={handleScroll}
+      >
         {messages.length === 0 ? (
           <div className={styles.welcomeMessage}>
             <MessageCircle size={32} className={styles.welcomeIcon} />
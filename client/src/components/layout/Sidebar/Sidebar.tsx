@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useRef } from 'react';
 import { Plus, MessageCircle, Trash2 } from 'lucide-react';
 import { useChat } from '../../../hooks/useChat';
 import Button from '../../common/Button/Button';
@@ -15,7 +15,8 @@ interface SidebarProps {
 const Sidebar: React.FC<SidebarProps> = ({ isOpen, onClose }) => {
     const navigate = useNavigate();
     const location = useLocation();
-    const { sessions, currentSessionId, setCurrentSession, createNewSession, deleteSession } = useChat();
+    const { sessions, currentSessionId, setCurrentSession, createNewSession, deleteSession, sessionsCursor, loadMoreSessions } = useChat();
+    const loadingMoreRef = useRef(false);
 
     const handleNewChat = async () => {
         try {
@@ -26,6 +27,21 @@ const Sidebar: React.FC<SidebarProps> = ({ isOpen, onClose }) => {
         }
     };
 
+    const handleScroll = async (e: React.UIEvent<HTMLDivElement>) => {
+        // Fetch the next page of sessions as the list nears its end
+        const { scrollTop, scrollHeight, clientHeight } = e.currentTarget;
+        if (!sessionsCursor || loadingMoreRef.current || scrollHeight - scrollTop - clientHeight > 100) {
+            return;
+        }
+
+        loadingMoreRef.current = true;
+        try {
+            await loadMoreSessions();
+        } finally {
+            loadingMoreRef.current = false;
+        }
+    };
+
     const handleSessionClick = (sessionId: number) => {
         setCurrentSession(sessionId);
         navigate(`/chat/${sessionId}`);
@@ -98,7 +114,7 @@ const Sidebar: React.FC<SidebarProps> = ({ isOpen, onClose }) => {
             </Button>
             </div>
             
-            <div className={styles.sessions}>
+            <div className={styles.sessions} onScroll={handleScroll}>
                 {sessions.map((session) => (
                     <div
                     key={session.id}
@@ -6,6 +6,9 @@ interface ChatState {
   sessions: ChatSession[];
   currentSessionId: number | null;
   messages: ChatMessage[];
+  // X-Next-Cursor of the last page loaded; null once everything is loaded
+  sessionsCursor: string | null;
+  messagesCursor: string | null;
   isLoading: boolean;
   ragEnabled: boolean;
   selectedModel: keyof typeof CHAT_MODELS;
@@ -16,6 +19,10 @@ interface ChatContextType extends ChatState {
   addMessage: (message: ChatMessage) => void;
   setSessions: (sessions: ChatSession[]) => void;
   setMessages: (messages: ChatMessage[]) => void;
+  appendSessions: (cursor: string, sessions: ChatSession[], nextCursor: string | null) => void;
+  prependMessages: (sessionId: number, cursor: string, messages: ChatMessage[], nextCursor: string | null) => void;
+  setSessionsCursor: (cursor: string | null) => void;
+  setMessagesCursor: (cursor: string | null) => void;
   setLoading: (loading: boolean) => void;
   toggleRag: () => void;
   setRagEnabled: (enabled: boolean) => void;
@@ -29,6 +36,10 @@ type ChatAction =
   | { type: 'ADD_MESSAGE'; payload: ChatMessage }
   | { type: 'SET_SESSIONS'; payload: ChatSession[] }
   | { type: 'SET_MESSAGES'; payload: ChatMessage[] }
+  | { type: 'APPEND_SESSIONS'; payload: { cursor: string; sessions: ChatSession[]; nextCursor: string | null } }
+  | { type: 'PREPEND_MESSAGES'; payload: { sessionId: number; cursor: string; messages: ChatMessage[]; nextCursor: string | null } }
+  | { type: 'SET_SESSIONS_CURSOR'; payload: string | null }
+  | { type: 'SET_MESSAGES_CURSOR'; payload: string | null }
   | { type: 'SET_LOADING'; payload: boolean }
   | { type: 'TOGGLE_RAG' }
   | { type: 'SET_RAG_ENABLED'; payload: boolean }
@@ -44,6 +55,29 @@ const chatReducer = (state: ChatState, action: ChatAction): ChatState => {
       return { ...state, sessions: action.payload };
     case 'SET_MESSAGES':
       return { ...state, messages: action.payload };
+    // Older pages apply only to the listing they were loaded for, and only once
+    case 'APPEND_SESSIONS': {
+      if (state.sessionsCursor !== action.payload.cursor) {
+        return state;
+      }
+      // A session created or updated since the first page may already be listed
+      const known = new Set(state.sessions.map(session => session.id));
+      const sessions = action.payload.sessions.filter(session => !known.has(session.id));
+      return { ...state, sessions: [...state.sessions, ...sessions], sessionsCursor: action.payload.nextCursor };
+    }
+    case 'PREPEND_MESSAGES':
+      if (state.currentSessionId !== action.payload.sessionId || state.messagesCursor !== action.payload.cursor) {
+        return state;
+      }
+      return {
+        ...state,
+        messages: [...action.payload.messages, ...state.messages],
+        messagesCursor: action.payload.nextCursor,
+      };
+    case 'SET_SESSIONS_CURSOR':
+      return { ...state, sessionsCursor: action.payload };
+    case 'SET_MESSAGES_CURSOR':
+      return { ...state, messagesCursor: action.payload };
     case 'SET_LOADING':
       return { ...state, isLoading: action.payload };
     case 'TOGGLE_RAG':
@@ -62,6 +96,8 @@ export const ChatProvider: React.FC<{ children: React.ReactNode }> = ({ children
     sessions: [],
     currentSessionId: null,
     messages: [],
+    sessionsCursor: null,
+    messagesCursor: null,
     isLoading: false,
     ragEnabled: false,
     selectedModel: 'claude-instant',
@@ -83,6 +119,22 @@ export const ChatProvider: React.FC<{ children: React.ReactNode }> = ({ children
     dispatch({ type: 'SET_MESSAGES', payload: messages });
   };
 
+  const appendSessions = (cursor: string, sessions: ChatSession[], nextCursor: string | null) => {
+    dispatch({ type: 'APPEND_SESSIONS', payload: { cursor, sessions, nextCursor } });
+  };
+
+  const prependMessages = (sessionId: number, cursor: string, messages: ChatMessage[], nextCursor: string | null) => {
+    dispatch({ type: 'PREPEND_MESSAGES', payload: { sessionId, cursor, messages, nextCursor } });
+  };
+
+  const setSessionsCursor = (cursor: string | null) => {
+    dispatch({ type: 'SET_SESSIONS_CURSOR', payload: cursor });
+  };
+
+  const setMessagesCursor = (cursor: string | null) => {
+    dispatch({ type: 'SET_MESSAGES_CURSOR', payload: cursor });
+  };
+
   const setLoading = (loading: boolean) => {
     dispatch({ type: 'SET_LOADING', payload: loading });
   };
@@ -107,6 +159,10 @@ export const ChatProvider: React.FC<{ children: React.ReactNode }> = ({ children
         addMessage,
         setSessions,
         setMessages,
+        appendSessions,
+        prependMessages,
+        setSessionsCursor,
+        setMessagesCursor,
         setLoading,
         toggleRag,
         setRagEnabled,
@@ -4,6 +4,14 @@ import { chatService } from '../services/chat';
 import { CHAT_MODELS, DEFAULT_SYSTEM_PROMPT } from '../utils/constants';
 import { generateSessionTitle } from '../utils/helpers';
 
+// Convert backend message format to frontend format
+const formatMessages = (messages: any[]) =>
+  messages.map((msg: any) => ({
+    role: msg.role,
+    content: msg.content,
+    timestamp: new Date(msg.created_at),
+  }));
+
 export const useChat = () => {
   const context = useChatContext();
 //   const [selectedModel, setSelectedModel] = useState<keyof typeof CHAT_MODELS>('claude-instant');
@@ -69,16 +77,11 @@ export const useChat = () => {
   const loadSessionMessages = async (sessionId: number) => {
     try {
       context.setLoading(true);
-      const messages = await chatService.getSessionMessages(sessionId);
-      
-      // Convert backend message format to frontend format
-      const formattedMessages = messages.map((msg : any) => ({
-        role: msg.role,
-        content: msg.content,
-        timestamp: new Date(msg.created_at),
-      }));
-      
-      context.setMessages(formattedMessages);
+      // Only the newest page; older messages load as the user scrolls up
+      const page = await chatService.getSessionMessages(sessionId);
+
+      context.setMessages(formatMessages(page.items));
+      context.setMessagesCursor(page.nextCursor);
       context.setCurrentSession(sessionId);
     } catch (error) {
       console.error('Error loading session messages:', error);
@@ -88,6 +91,38 @@ export const useChat = () => {
     }
   };
 
+  const loadOlderMessages = async () => {
+    const { currentSessionId: sessionId, messagesCursor: cursor } = context;
+    if (!sessionId || !cursor) return;
+
+    try {
+      const page = await chatService.getSessionMessages(sessionId, cursor);
+      // Ignored if the user switched sessions or this page already arrived
+      context.prependMessages(sessionId, cursor, formatMessages(page.items), page.nextCursor);
+    } catch (error) {
+      console.error('Error loading older messages:', error);
+    }
+  };
+
+  const loadSessions = async () => {
+    const page = await chatService.getSessions();
+    context.setSessions(page.items);
+    context.setSessionsCursor(page.nextCursor);
+    return page.items;
+  };
+
+  const loadMoreSessions = async () => {
+    const cursor = context.sessionsCursor;
+    if (!cursor) return;
+
+    try {
+      const page = await chatService.getSessions(cursor);
+      context.appendSessions(cursor, page.items, page.nextCursor);
+    } catch (error) {
+      console.error('Error loading more sessions:', error);
+    }
+  };
+
   const switchToSession = async (sessionId: number) => {
     // Don't reload if already on this session
     if (context.currentSessionId === sessionId) {
@@ -135,6 +170,9 @@ export const useChat = () => {
     deleteSession,
     createNewSession,
     loadSessionMessages,
+    loadOlderMessages,
+    loadSessions,
+    loadMoreSessions,
     switchToSession,
     toggleRag
   };
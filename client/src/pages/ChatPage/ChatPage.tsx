@@ -2,7 +2,6 @@ import React, { useState, useEffect } from 'react';
 import { useChat } from '../../hooks/useChat';
 import Layout from '../../components/layout/Layout/Layout';
 import ChatInterface from '../../components/chat/ChatInterface/ChatInterface';
-import { chatService } from '../../services/chat';
 import styles from './ChatPage.module.css';
 import { useParams } from 'react-router-dom';
 import { useNavigate } from 'react-router-dom';
@@ -10,23 +9,22 @@ import { useNavigate } from 'react-router-dom';
 const ChatPage: React.FC = () => {
     const { sessionId } = useParams<{ sessionId?: string }>();
     const navigate = useNavigate();
-    const { setSessions, sessions, currentSessionId, switchToSession } = useChat();
+    const { loadSessions, sessions, currentSessionId, switchToSession } = useChat();
     const [isLoading, setIsLoading] = useState(true);
 
     useEffect(() => {
-        const loadSessions = async () => {
+        const loadFirstPage = async () => {
         try {
-            const sessionsData = await chatService.getSessions();
-            setSessions(sessionsData);
+            // Only the first page; the sidebar fetches more as it is scrolled
+            const sessionsData = await loadSessions();
 
             // If we have a sessionId in URL but no sessions loaded yet, wait for them
             if (sessionId && sessionsData.length > 0) {
             const targetSessionId = parseInt(sessionId);
-            const sessionExists = sessionsData.find(s => s.id === targetSessionId);
-            
-            if (sessionExists) {
+            try {
+                // A session past the first page is still opened directly
                 await switchToSession(targetSessionId);
-            } else {
+            } catch {
                 // Session doesn't exist, redirect to chat page without session
                 navigate('/chat');
             }
@@ -41,7 +39,7 @@ const ChatPage: React.FC = () => {
         }
         };
 
-        loadSessions();
+        loadFirstPage();
     }, []);
 
     useEffect(() => {
@@ -1,19 +1,33 @@
 import { apiService } from './api';
-import { ChatRequest, ChatResponse, ChatSession, ChatMessage } from '../types/chat';
+import { ChatRequest, ChatResponse, ChatSession, ChatMessage, Page } from '../types/chat';
+
+// Listings are keyset-paginated: X-Next-Cursor, when present, fetches the following page
+const getPage = async <T>(url: string, params: Record<string, string | undefined> = {}): Promise<Page<T>> => {
+  const query = Object.entries(params)
+    .filter(([, value]) => value !== undefined)
+    .map(([key, value]) => `${key}=${encodeURIComponent(value as string)}`)
+    .join('&');
+  const res = await apiService.get<T[]>(query ? `${url}?${query}` : url);
+  return { items: res.data, nextCursor: res.headers['x-next-cursor'] ?? null };
+};
 
 export const chatService = {
   sendMessage: (request: ChatRequest): Promise<ChatResponse> =>
     apiService.post<ChatResponse>('/chat/', request).then(res => res.data),
 
-  getSessions: (): Promise<ChatSession[]> =>
-    apiService.get<ChatSession[]>('/sessions/').then(res => res.data),
+  // Most recently updated first; nextCursor loads the next page
+  getSessions: (cursor?: string): Promise<Page<ChatSession>> =>
+    getPage<ChatSession>('/sessions/', { cursor }),
 
   createSession: (title: string): Promise<ChatSession> =>
     apiService.post<ChatSession>('/sessions/', { title }).then(res => res.data),
 
-  getSessionMessages: (sessionId: number): Promise<ChatMessage[]> =>
-    apiService.get<ChatMessage[]>(`/sessions/${sessionId}/messages/`).then(res => res.data),
+  // The newest page of messages in chronological order; nextCursor loads the page before it
+  getSessionMessages: async (sessionId: number, cursor?: string): Promise<Page<ChatMessage>> => {
+    const page = await getPage<ChatMessage>(`/sessions/${sessionId}/messages/`, { order: 'desc', cursor });
+    return { ...page, items: [...page.items].reverse() };
+  },
 
   deleteSession: (sessionId: number): Promise<void> =>
     apiService.delete<void>(`/sessions/${sessionId}/`).then(() => {}),
-};
\ No newline at end of file
+};
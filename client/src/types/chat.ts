@@ -22,4 +22,9 @@ export interface ChatRequest {
 
 export interface ChatResponse {
   response: string;
-}
\ No newline at end of file
+}
+
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
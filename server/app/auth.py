@@ -1,19 +1,24 @@
 # app/auth.py
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import uuid4
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_TIMEDELTA, REFRESH_TOKEN_EXPIRE_TIMEDELTA
+from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_TIMEDELTA, REFRESH_TOKEN_EXPIRE_TIMEDELTA, BCRYPT_ROUNDS
 from .database import get_db
 from .models import User, RefreshToken
 from .schemas import TokenData
+from .services.user_cache import user_cache
+from .services.password_hasher import password_hashing_pool
+from .services.refresh_tokens import revocation_filter
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # OAuth2 scheme
 security = HTTPBearer()
@@ -26,6 +31,14 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def ahash_password(password: str) -> str:
+    """Hash a password on the password hashing pool; raises HashingPoolSaturated when it is full"""
+    return await password_hashing_pool.run(pwd_context.hash, password)
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password hashing pool; raises HashingPoolSaturated when it is full"""
+    return await password_hashing_pool.run(pwd_context.verify, plain_password, hashed_password)
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """Authenticate a user"""
     user = db.query(User).filter(User.email == email).first()
@@ -35,6 +48,19 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
         return None
     return user
 
+async def aauthenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate a user without holding a request thread while bcrypt runs"""
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.email == email).first())
+    if not user:
+        return None
+    if not await averify_password(password, user.hashed_password):
+        return None
+    return user
+
+def token_claims(user: User) -> dict:
+    """Subject claims for a user's tokens; uid lets token checks load the user by primary key."""
+    return {"sub": user.email, "uid": user.id}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create access token"""
     to_encode = data.copy()
@@ -55,7 +81,8 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + REFRESH_TOKEN_EXPIRE_TIMEDELTA
     
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti identifies the token in the refresh_tokens table, so the JWT itself is never stored
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -69,7 +96,7 @@ def verify_token(token: str, token_type: str = "access") -> Optional[TokenData]:
         if email is None or token_type_payload != token_type:
             return None
         
-        return TokenData(email=email)
+        return TokenData(email=email, user_id=payload.get("uid"), jti=payload.get("jti"))
     except JWTError:
         return None
 
@@ -88,31 +115,67 @@ def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = load_token_user(db, token_data)
     if user is None:
         raise credentials_exception
     
     return user
 
+def load_token_user(db: Session, token_data: TokenData) -> Optional[User]:
+    """
+    The user a verified token belongs to. Tokens carrying a uid are served
+    from the user cache or loaded by primary key; older tokens without one
+    fall back to the email lookup.
+    """
+    cached = None
+    if token_data.user_id is not None and user_cache is not None:
+        cached = user_cache.get(token_data.user_id)
+    if cached is not None:
+        user = cached
+    elif token_data.user_id is not None:
+        user = db.get(User, token_data.user_id)
+    else:
+        user = db.query(User).filter(User.email == token_data.email).first()
+
+    # A changed email invalidates tokens issued for the old one
+    if user is None or user.email != token_data.email:
+        return None
+    # Only fresh loads are cached, so an entry in use still expires after the TTL
+    if cached is None and user_cache is not None:
+        user_cache.put(user)
+    return user
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def _revoke_where(db: Session, *criteria) -> int:
+    """Mark matching live refresh tokens revoked and add them to the revocation filter"""
+    jtis = [jti for (jti,) in db.query(RefreshToken.jti).filter(RefreshToken.is_revoked == False, *criteria)]
+    if not jtis:
+        return 0
+    db.query(RefreshToken).filter(RefreshToken.jti.in_(jtis)).update(
+        {"is_revoked": True, "revoked_at": datetime.utcnow()}, synchronize_session=False
+    )
+    if revocation_filter is not None:
+        for jti in jtis:
+            revocation_filter.add(jti)
+    return len(jtis)
+
 def store_refresh_token(db: Session, token: str, user_id: int) -> RefreshToken:
     """Store refresh token in database"""
+    claims = jwt.get_unverified_claims(token)
+
     # Revoke existing refresh tokens for this user
-    db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete()
+    _revoke_where(db, RefreshToken.user_id == user_id)
     
-    # Calculate expiration
-    expires_at = datetime.utcnow() + REFRESH_TOKEN_EXPIRE_TIMEDELTA
-    
-    # Create new refresh token record
+    # Create new refresh token record, keyed by the token's jti
     db_refresh_token = RefreshToken(
-        token=token,
+        jti=claims["jti"],
         user_id=user_id,
-        expires_at=expires_at
+        expires_at=datetime.utcfromtimestamp(claims["exp"])
     )
     
     db.add(db_refresh_token)
@@ -123,30 +186,33 @@ def store_refresh_token(db: Session, token: str, user_id: int) -> RefreshToken:
 
 def verify_refresh_token(db: Session, token: str) -> Optional[User]:
     """Verify refresh token and return associated user"""
-    # Check if token exists and is not revoked
-    db_token = db.query(RefreshToken).filter(
-        RefreshToken.token == token,
-        RefreshToken.is_revoked == False,
-        RefreshToken.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not db_token:
-        return None
-    
-    # Verify JWT token
+    # Verify JWT token; signature and expiry need no database
     token_data = verify_token(token, "refresh")
-    if token_data is None:
+    if token_data is None or token_data.jti is None:
         return None
     
+    # Check the token exists and is not revoked, unless the revocation filter proves it
+    if revocation_filter is None or revocation_filter.might_contain(token_data.jti):
+        db_token = db.query(RefreshToken.id).filter(
+            RefreshToken.jti == token_data.jti,
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.utcnow()
+        ).first()
+        if not db_token:
+            return None
+    
     # Get user
-    user = db.query(User).filter(User.email == token_data.email).first()
-    return user
+    return load_token_user(db, token_data)
 
 def revoke_refresh_token(db: Session, token: str) -> bool:
     """Revoke a refresh token"""
-    db_token = db.query(RefreshToken).filter(RefreshToken.token == token).first()
-    if db_token:
-        db_token.is_revoked = True
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    try:
+        # An expired token can still be revoked
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+    except JWTError:
+        return False
+    if claims.get("type") != "refresh" or not claims.get("jti"):
+        return False
+    revoked = _revoke_where(db, RefreshToken.jti == claims["jti"])
+    db.commit()
+    return revoked > 0
@@ -7,6 +7,34 @@ ALGORITHM = config('ALGORITHM', default='HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = config('ACCESS_TOKEN_EXPIRE_MINUTES', default=30, cast=int)
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Password hashing: bcrypt cost factor, and a dedicated pool (0 workers = one per CPU)
+# that rejects logins with 429 once this many calls are already waiting
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=0, cast=int)
+PASSWORD_HASH_MAX_QUEUE = config("PASSWORD_HASH_MAX_QUEUE", default=32, cast=int)
+
+# Refresh tokens: expired (and, without the filter, revoked) rows are swept in batches.
+# The optional revocation bloom filter lets refreshes skip the database, at the cost
+# of other workers' revocations taking up to one sweep interval to be seen.
+REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS = config("REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS", default=300.0, cast=float)
+REFRESH_TOKEN_SWEEP_BATCH = config("REFRESH_TOKEN_SWEEP_BATCH", default=1000, cast=int)
+REFRESH_REVOCATION_FILTER_ENABLED = config("REFRESH_REVOCATION_FILTER_ENABLED", default=False, cast=bool)
+REFRESH_REVOCATION_FILTER_CAPACITY = config("REFRESH_REVOCATION_FILTER_CAPACITY", default=100000, cast=int)
+REFRESH_REVOCATION_FILTER_FP_RATE = config("REFRESH_REVOCATION_FILTER_FP_RATE", default=0.01, cast=float)
+
+# Authenticated users cached per worker so token checks skip the users query
+USER_CACHE_ENABLED = config("USER_CACHE_ENABLED", default=True, cast=bool)
+USER_CACHE_TTL_SECONDS = config("USER_CACHE_TTL_SECONDS", default=60.0, cast=float)
+USER_CACHE_MAX_ENTRIES = config("USER_CACHE_MAX_ENTRIES", default=10000, cast=int)
+
+# Database connection pool, per engine and per worker process. Keep
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the server's connection limit.
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=10, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30.0, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+
 BEDROCK_MODEL_CLAUDE_INSTANT=config('BEDROCK_MODEL_CLAUDE_INSTANT')
 BEDROCK_MODEL_TITAN_TEXT=config('BEDROCK_MODEL_TITAN_TEXT')
 BEDROCK_MODEL_EMBEDDING=config('BEDROCK_MODEL_EMBEDDING')
@@ -16,5 +44,99 @@ S3_BUCKET_NAME=config('S3_BUCKET_NAME')
 ACCESS_TOKEN_EXPIRE_TIMEDELTA = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 REFRESH_TOKEN_EXPIRE_TIMEDELTA = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
 
-PINECONE_API_KEY = config("PINECONE_API_KEY")
-PINECONE_INDEX_NAME = config("PINECONE_INDEX_NAME")
\ No newline at end of file
+PINECONE_API_KEY = config("PINECONE_API_KEY", default="")
+PINECONE_INDEX_NAME = config("PINECONE_INDEX_NAME", default="")
+
+# Embedding engine
+EMBEDDING_MAX_WORKERS = config("EMBEDDING_MAX_WORKERS", default=8, cast=int)
+EMBEDDING_BATCH_SIZE = config("EMBEDDING_BATCH_SIZE", default=64, cast=int)
+EMBEDDING_MAX_RETRIES = config("EMBEDDING_MAX_RETRIES", default=5, cast=int)
+EMBEDDING_RETRY_BASE_DELAY = config("EMBEDDING_RETRY_BASE_DELAY", default=0.5, cast=float)
+EMBEDDING_RETRY_MAX_DELAY = config("EMBEDDING_RETRY_MAX_DELAY", default=8.0, cast=float)
+
+# Embedding cache
+EMBEDDING_CACHE_ENABLED = config("EMBEDDING_CACHE_ENABLED", default=True, cast=bool)
+EMBEDDING_CACHE_MAX_BYTES = config("EMBEDDING_CACHE_MAX_BYTES", default=64 * 1024 * 1024, cast=int)
+EMBEDDING_CACHE_PATH = config("EMBEDDING_CACHE_PATH", default="")
+EMBEDDING_CACHE_DISK_MAX_BYTES = config("EMBEDDING_CACHE_DISK_MAX_BYTES", default=1024 * 1024 * 1024, cast=int)
+
+# Background ingestion
+INGESTION_MAX_WORKERS = config("INGESTION_MAX_WORKERS", default=2, cast=int)
+INGESTION_SPOOL_DIR = config("INGESTION_SPOOL_DIR", default="./ingestion_spool")
+INGESTION_LEASE_SECONDS = config("INGESTION_LEASE_SECONDS", default=120, cast=int)  # renewed every third of this
+INGESTION_STALE_AFTER_SECONDS = config("INGESTION_STALE_AFTER_SECONDS", default=900, cast=int)  # running jobs without a lease
+
+# Streaming: serve a local fake token stream instead of calling Bedrock
+BEDROCK_FAKE_STREAM = config("BEDROCK_FAKE_STREAM", default=False, cast=bool)
+BEDROCK_FAKE_STREAM_DELAY = config("BEDROCK_FAKE_STREAM_DELAY", default=0.0, cast=float)
+# Claude prompt caching: "auto" enables it for models known to support it, or force "on"/"off"
+BEDROCK_PROMPT_CACHING = config("BEDROCK_PROMPT_CACHING", default="auto")
+# Async Bedrock client used by the chat routes: one pooled connection per in-flight call
+BEDROCK_ASYNC_MAX_CONNECTIONS = config("BEDROCK_ASYNC_MAX_CONNECTIONS", default=200, cast=int)
+BEDROCK_ASYNC_TIMEOUT = config("BEDROCK_ASYNC_TIMEOUT", default=120.0, cast=float)
+
+# Vector store: "pinecone" or "local" (memory-mapped files under LOCAL_VECTOR_STORE_DIR)
+VECTOR_STORE_BACKEND = config("VECTOR_STORE_BACKEND", default="pinecone")
+LOCAL_VECTOR_STORE_DIR = config("LOCAL_VECTOR_STORE_DIR", default="./vector_store")
+# Local store index: "exact" (brute force) or "ivf" (approximate, trained per namespace)
+LOCAL_VECTOR_INDEX = config("LOCAL_VECTOR_INDEX", default="exact")
+LOCAL_VECTOR_IVF_NLIST = config("LOCAL_VECTOR_IVF_NLIST", default=0, cast=int)  # 0 = sqrt(rows)
+LOCAL_VECTOR_IVF_NPROBE = config("LOCAL_VECTOR_IVF_NPROBE", default=8, cast=int)
+LOCAL_VECTOR_IVF_MIN_ROWS = config("LOCAL_VECTOR_IVF_MIN_ROWS", default=10000, cast=int)
+
+# Keyword (BM25) index used by sparse and hybrid retrieval
+BM25_INDEX_DIR = config("BM25_INDEX_DIR", default="./bm25_index")
+RRF_K = config("RRF_K", default=60, cast=int)
+
+# Streaming ingestion: chunks embedded and upserted per batch
+INGESTION_CHUNK_BATCH = config("INGESTION_CHUNK_BATCH", default=128, cast=int)
+
+# Token estimates: roughly four characters per token for English text across Claude and Titan tokenizers
+CHARS_PER_TOKEN = 4
+
+# Chunking: default strategy ("structured" or "recursive", overridable per upload), sizes in estimated tokens
+CHUNK_STRATEGY = config("CHUNK_STRATEGY", default="structured")
+CHUNK_SIZE_TOKENS = config("CHUNK_SIZE_TOKENS", default=128, cast=int)
+CHUNK_OVERLAP_TOKENS = config("CHUNK_OVERLAP_TOKENS", default=12, cast=int)
+
+# Parallel PDF parsing: PDFs with at least this many pages are split across worker processes (0 disables)
+PDF_PARALLEL_MIN_PAGES = config("PDF_PARALLEL_MIN_PAGES", default=64, cast=int)
+PDF_PARSE_WORKERS = config("PDF_PARSE_WORKERS", default=0, cast=int)  # 0 = one per CPU
+PDF_PAGES_PER_TASK = config("PDF_PAGES_PER_TASK", default=16, cast=int)
+
+# Bulk upload: limits per request and per file, and how many files are spooled per job insert
+BULK_UPLOAD_MAX_FILES = config("BULK_UPLOAD_MAX_FILES", default=5000, cast=int)
+BULK_UPLOAD_MAX_FILE_BYTES = config("BULK_UPLOAD_MAX_FILE_BYTES", default=100 * 1024 * 1024, cast=int)
+BULK_UPLOAD_ENQUEUE_BATCH = config("BULK_UPLOAD_ENQUEUE_BATCH", default=100, cast=int)
+
+# Vector upserts: batches are capped by vector count and serialized size, and sent concurrently
+VECTOR_UPSERT_BATCH_SIZE = config("VECTOR_UPSERT_BATCH_SIZE", default=100, cast=int)
+VECTOR_UPSERT_MAX_BYTES = config("VECTOR_UPSERT_MAX_BYTES", default=2 * 1024 * 1024 - 64 * 1024, cast=int)
+VECTOR_UPSERT_MAX_WORKERS = config("VECTOR_UPSERT_MAX_WORKERS", default=4, cast=int)
+VECTOR_UPSERT_MAX_RETRIES = config("VECTOR_UPSERT_MAX_RETRIES", default=3, cast=int)  # throttling, 5xx and connection errors only
+VECTOR_UPSERT_RETRY_BASE_DELAY = config("VECTOR_UPSERT_RETRY_BASE_DELAY", default=0.5, cast=float)
+VECTOR_UPSERT_RETRY_MAX_DELAY = config("VECTOR_UPSERT_RETRY_MAX_DELAY", default=8.0, cast=float)
+
+# Semantic answer cache: first-turn RAG questions similar to one already answered reuse its answer
+ANSWER_CACHE_ENABLED = config("ANSWER_CACHE_ENABLED", default=True, cast=bool)
+ANSWER_CACHE_THRESHOLD = config("ANSWER_CACHE_THRESHOLD", default=0.95, cast=float)
+ANSWER_CACHE_MAX_ENTRIES = config("ANSWER_CACHE_MAX_ENTRIES", default=256, cast=int)  # per user
+ANSWER_CACHE_TTL_SECONDS = config("ANSWER_CACHE_TTL_SECONDS", default=24 * 3600, cast=int)
+ANSWER_CACHE_MAX_TOTAL_ENTRIES = config("ANSWER_CACHE_MAX_TOTAL_ENTRIES", default=20000, cast=int)  # all users
+
+# Chat history: recent messages kept verbatim up to this many estimated tokens, older ones as truncated excerpt lines
+CHAT_HISTORY_TOKEN_BUDGET = config("CHAT_HISTORY_TOKEN_BUDGET", default=3000, cast=int)
+CHAT_SUMMARY_TOKEN_BUDGET = config("CHAT_SUMMARY_TOKEN_BUDGET", default=500, cast=int)
+CHAT_HISTORY_CACHE_SESSIONS = config("CHAT_HISTORY_CACHE_SESSIONS", default=10000, cast=int)
+
+# Session and message listings: keyset-paginated, default and maximum rows per page
+SESSION_LIST_PAGE_SIZE = config("SESSION_LIST_PAGE_SIZE", default=50, cast=int)
+MESSAGE_LIST_PAGE_SIZE = config("MESSAGE_LIST_PAGE_SIZE", default=200, cast=int)
+LIST_MAX_PAGE_SIZE = config("LIST_MAX_PAGE_SIZE", default=1000, cast=int)
+
+# Document deletion: documents with at least this many chunks are purged by a background worker
+DOCUMENT_DELETE_ASYNC_MIN_CHUNKS = config("DOCUMENT_DELETE_ASYNC_MIN_CHUNKS", default=5000, cast=int)
+DOCUMENT_DELETE_WORKERS = config("DOCUMENT_DELETE_WORKERS", default=1, cast=int)
+
+# Tracing: finished request and job traces at least this slow are logged at INFO, the rest at DEBUG
+TRACE_SLOW_SECONDS = config("TRACE_SLOW_SECONDS", default=1.0, cast=float)
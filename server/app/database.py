@@ -1,24 +1,194 @@
 # app/database.py
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+)
+
+
+class PoolMetrics:
+    """
+    Counters for one engine's connection pool: checkouts, how long each
+    waited for a connection, connections opened beyond pool_size, and
+    checkouts that timed out. Together with the live pool status they show
+    whether the pool is sized for the number of workers using it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.overflow_events = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def attach(self, engine: Engine):
+        """Count new connections on engine's pool, and those opened past pool_size."""
+        self.engine = engine
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+                # overflow() goes positive once pool_size connections are open
+                if isinstance(engine.pool, QueuePool) and engine.pool.overflow() > 0:
+                    self.overflow_events += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "wait_seconds_avg": self.wait_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": DB_MAX_OVERFLOW,
+            })
+        return stats
+
+
+def _metered_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """A pool class that times every checkout; kept across pool.recreate() since that reuses the class."""
+
+    class MeteredPool(base):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            except exc.TimeoutError:
+                metrics.record_timeout()
+                raise
+            finally:
+                metrics.record_wait(time.perf_counter() - start)
+
+    MeteredPool.__name__ = MeteredPool.__qualname__ = f"Metered{base.__name__}"
+    return MeteredPool
+
+
+def _engine_options(url: str, pool_class: type, metrics: PoolMetrics) -> dict:
+    parsed = make_url(url)
+    # In-memory SQLite lives inside a single connection, so it keeps SQLAlchemy's default pool
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": _metered_pool_class(pool_class, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
-engine = create_engine(DATABASE_URL)
+
+pool_metrics = PoolMetrics("sync")
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, QueuePool, pool_metrics))
+pool_metrics.attach(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+
+@contextmanager
+def session_scope(factory=SessionLocal) -> Iterator[Session]:
+    """A session that is rolled back if the block raises and always closed, returning its connection."""
+    db = factory()
     try:
         yield db
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
+# Async drivers for the same database, used by the async request path
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+# The engine is built on first use so the sync path never needs the async driver installed
+_async_engine = None
+_async_engine_lock = threading.Lock()
+async_pool_metrics = PoolMetrics("async")
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    with _async_engine_lock:
+        if _async_engine is None:
+            url = async_database_url(DATABASE_URL)
+            _async_engine = create_async_engine(url, **_engine_options(url, AsyncAdaptedQueuePool, async_pool_metrics))
+            async_pool_metrics.attach(_async_engine.sync_engine)
+            AsyncSessionLocal.configure(bind=_async_engine)
+        return _async_engine
+
+def get_db():
+    with session_scope() as db:
+        yield db
+
+def new_async_session() -> AsyncSession:
+    get_async_engine()
+    return AsyncSessionLocal()
+
+async def get_async_db():
+    async with new_async_session() as db:
+        yield db
+
+
+def pool_status() -> dict:
+    """Pool metrics for each engine this process has created."""
+    status = {"sync": pool_metrics.snapshot()}
+    if _async_engine is not None:
+        status["async"] = async_pool_metrics.snapshot()
+    return status
+
 
 def create_tables():
     """Create all tables"""
     # Import all models to make sure they're registered with Base
-    from .models import User, RefreshToken, Document, ChatSession, ChatMessage
-    
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from .models import User, RefreshToken, Document, DocumentChunk, ChatSession, ChatMessage, IngestionJob
+
+    Base.metadata.create_all(bind=engine)
@@ -1,9 +1,18 @@
 # app/main.py
 import logging
-from fastapi import FastAPI, Request
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import auth, inference, upload, sessions
-from .database import create_tables
+from .routes import auth, inference, upload, sessions, documents
+from .database import create_tables, pool_status
+from .services.ingestion_queue import ingestion_queue
+from .services.document_deletion import document_deleter
+from .services import pdf_parallel
+from .services.password_hasher import password_hashing_pool
+from .services.refresh_tokens import refresh_token_sweeper
+from .services.answer_cache import answer_cache
+from .services.user_cache import user_cache
+from .services import metrics
 
 app = FastAPI(title="RAG Chat API", 
               description="Backend API for RAG-based chat application",
@@ -19,10 +28,38 @@ async def log_exceptions(request: Request, call_next):
         logger.exception(f"Unhandled error: {e}")
         raise
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Run each request in a trace, time it per route and return the trace id in X-Trace-Id."""
+    status = "500"
+    # Timed outside the trace, so a failure entering it is still observed and re-raised as is
+    start = time.perf_counter()
+    try:
+        with metrics.trace(f"{request.method} {request.url.path}", traceparent=request.headers.get("traceparent")) as root:
+            response = await call_next(request)
+            status = str(response.status_code)
+    finally:
+        # The matched route's template keeps label cardinality bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.request_seconds.observe(time.perf_counter() - start, method=request.method, route=route, status=status)
+    response.headers["X-Trace-Id"] = root.trace.trace_id
+    return response
+
 # Create tables on startup
 @app.on_event("startup")
 def startup_event():
     create_tables()
+    ingestion_queue.start()
+    document_deleter.start()
+    refresh_token_sweeper.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    ingestion_queue.shutdown(wait=False)
+    document_deleter.shutdown(wait=False)
+    pdf_parallel.shutdown_pool(wait=False)
+    password_hashing_pool.shutdown(wait=False)
+    refresh_token_sweeper.shutdown()
 
 # CORS middleware
 app.add_middleware(
@@ -32,12 +69,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paginated listings return the next page's cursor, and every response its trace id, in headers
+    expose_headers=["X-Next-Cursor", "X-Trace-Id"],
 )
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(inference.router)
 app.include_router(upload.router)
+app.include_router(documents.router)
 app.include_router(sessions.router)
 
 
@@ -49,4 +89,33 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/db")
+def database_pool_health():
+    """Connection pool usage for this worker: checkouts, wait times, overflow and timeouts."""
+    return pool_status()
+
+
+def _stat_samples(stats: dict, **labels):
+    # Every numeric stat becomes one sample, labelled with its name
+    return [({**labels, "stat": key}, value) for key, value in stats.items() if isinstance(value, (int, float))]
+
+metrics.registry.gauge(
+    "rag_db_pool",
+    "Connection pool status and counters per engine (see /health/db).",
+    lambda: [sample for name, stats in pool_status().items() for sample in _stat_samples(stats, engine=name)],
+)
+metrics.registry.gauge(
+    "rag_password_hashing_pool", "Password hashing pool status and counters.",
+    lambda: _stat_samples(password_hashing_pool.stats()),
+)
+if user_cache is not None:
+    metrics.registry.gauge("rag_user_cache", "Authenticated user cache counters.", lambda: _stat_samples(user_cache.stats()))
+if answer_cache is not None:
+    metrics.registry.gauge("rag_answer_cache", "Semantic answer cache counters.", lambda: _stat_samples(answer_cache.stats()))
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Stage and request latency histograms and pool/cache gauges in the Prometheus text format."""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
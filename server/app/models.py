@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -13,6 +13,7 @@ class User(Base):
     last_name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
+    documents_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped whenever the user's documents change
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship to refresh tokens
@@ -24,10 +25,11 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
     
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(Text, unique=True, index=True, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    jti = Column(String(32), unique=True, index=True, nullable=False)  # token id claim; the JWT itself is never stored
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     is_revoked = Column(Boolean, default=False)
+    revoked_at = Column(DateTime(timezone=True), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship to user
@@ -42,16 +44,33 @@ class Document(Base):
     file_size = Column(Integer)
     content_type = Column(String)
     pinecone_namespace = Column(String)
+    content_hash = Column(String(64))  # sha256 of the uploaded bytes
+    chunk_strategy = Column(String(32))  # chunker the stored chunks came from
+    deleting_at = Column(DateTime)  # set while a background delete purges the document
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="documents")
 
 
+class DocumentChunk(Base):
+    """Manifest of the vectors stored for a document, used to diff re-uploads."""
+    __tablename__ = "document_chunks"
+    __table_args__ = (UniqueConstraint("document_id", "vector_id"),)
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    vector_id = Column(String, nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+
+
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    # Serves the per-user, most-recently-updated-first session listing
+    __table_args__ = (Index("ix_chat_sessions_user_id_updated_at", "user_id", "updated_at"),)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=False)
+    summary = Column(Text)  # condensed turns that no longer fit the history token budget
+    summary_through_id = Column(Integer)  # newest message id folded into summary
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -61,6 +80,8 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    # Serves transcript listing and history loads in message order
+    __table_args__ = (Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),)
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
     role = Column(String, nullable=False)  # 'user' or 'assistant'
@@ -68,3 +89,23 @@ class ChatMessage(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     session = relationship("ChatSession", back_populates="messages")
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    spool_path = Column(String)  # uploaded bytes waiting to be ingested
+    batch_id = Column(String(36), index=True)  # set for jobs created by one bulk upload
+    chunk_strategy = Column(String(32))  # requested chunker; None uses CHUNK_STRATEGY
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, failed
+    stage = Column(String, nullable=False, default="queued")
+    progress = Column(Float, nullable=False, default=0.0)
+    error = Column(Text)
+    document_id = Column(Integer, ForeignKey("documents.id"))
+    num_chunks = Column(Integer)
+    lease_owner = Column(String(36))  # worker running the job
+    lease_expires_at = Column(DateTime)  # renewed by that worker's heartbeat; past it the job is recovered
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,15 +1,18 @@
 # app/routes/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models import User
 from ..schemas import UserCreate, UserLogin, UserResponse, Token
+from ..services.password_hasher import HashingPoolSaturated
 from ..auth import (
-    get_password_hash,
-    authenticate_user,
+    ahash_password,
+    aauthenticate_user,
     create_access_token,
     create_refresh_token,
+    token_claims,
     get_current_active_user,
     store_refresh_token,
     verify_refresh_token,
@@ -18,20 +21,17 @@ from ..auth import (
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user"""
-    
-    # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+def _email_registered(db: Session, email: str) -> bool:
+    return db.query(User.id).filter(User.email == email).first() is not None
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     db_user = User(
         email=user.email,
         first_name=user.first_name,
@@ -45,12 +45,34 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     
     return db_user
 
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+    """Register a new user"""
+    # Database work runs on the request threadpool, bcrypt on the hashing pool
+    
+    # Check if user already exists
+    if await run_in_threadpool(_email_registered, db, user.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    
+    # Create new user
+    try:
+        hashed_password = await ahash_password(user.password)
+    except HashingPoolSaturated:
+        raise _hashing_busy()
+    return await run_in_threadpool(_create_user, db, user, hashed_password)
+
 @router.post("/login", response_model=Token)
-def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """Login user and return JWT tokens"""
     
     # Authenticate user
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    try:
+        user = await aauthenticate_user(db, user_credentials.email, user_credentials.password)
+    except HashingPoolSaturated:
+        raise _hashing_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,11 +81,11 @@ def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
         )
     
     # Create tokens
-    access_token = create_access_token(data={"sub": user.email})
-    refresh_token = create_refresh_token(data={"sub": user.email})
+    access_token = create_access_token(data=token_claims(user))
+    refresh_token = create_refresh_token(data=token_claims(user))
     
     # Store refresh token in database
-    store_refresh_token(db, refresh_token, user.id)
+    await run_in_threadpool(store_refresh_token, db, refresh_token, user.id)
     
     return {
         "access_token": access_token,
@@ -90,8 +112,8 @@ def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)):
         )
     
     # Create new tokens
-    new_access_token = create_access_token(data={"sub": user.email})
-    new_refresh_token = create_refresh_token(data={"sub": user.email})
+    new_access_token = create_access_token(data=token_claims(user))
+    new_refresh_token = create_refresh_token(data=token_claims(user))
     
     # Revoke old refresh token
     revoke_refresh_token(db, refresh_token)
@@ -0,0 +1,31 @@
+# app/routes/documents.py
+from fastapi import APIRouter, Depends, HTTPException, Path, Response, status
+from sqlalchemy.orm import Session
+from app.auth import get_current_user
+from app.services.document_deletion import document_deleter
+from ..database import get_db
+from ..models import Document
+
+router = APIRouter(prefix="/documents", tags=["Documents"])
+
+
+@router.delete("/{document_id}")
+def delete_document(
+    response: Response,
+    document_id: int = Path(..., description="ID of the document"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    document = db.query(Document).filter_by(id=document_id, user_id=user.id).first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    try:
+        deleted = document_deleter.delete(db, document)
+    except RuntimeError as e:
+        # Nothing is committed until the vectors and S3 object are gone, so the delete can be retried
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+    if not deleted:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": "Document deletion started", "document_id": document_id, "status": "deleting"}
+    return {"message": "Document deleted successfully", "document_id": document_id, "status": "deleted"}
@@ -1,12 +1,17 @@
 # app/routes/inference.py
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from app.auth import get_current_user
-from app.services.query_handler import run_chat
-from typing import Optional
-from ..database import get_db
+from app.services.query_handler import arun_chat
+from app.services.answer_cache import answer_cache
+from typing import Literal, Optional
+from ..database import get_async_db
 
 router = APIRouter(prefix="/chat", tags=["ChatInference"])
+logger = logging.getLogger(__name__)
 
 # class ChatInferenceRequest(BaseModel):
 #     model: str 
@@ -24,6 +29,7 @@ class ChatInferenceRequest(BaseModel):
     session_id: int
     user_input: str
     enable_rag: Optional[bool] = False
+    retrieval_mode: Literal["dense", "sparse", "hybrid"] = "dense"
 
 # @router.post("/")
 # def chat(request: ChatInferenceRequest, user=Depends(get_current_user)):
@@ -43,9 +49,9 @@ class ChatInferenceRequest(BaseModel):
 #         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/")
-def chat(request: ChatInferenceRequest, user=Depends(get_current_user), db=Depends(get_db)):
+async def chat(request: ChatInferenceRequest, user=Depends(get_current_user), db=Depends(get_async_db)):
     try:
-        response = run_chat(
+        response = await arun_chat(
             db=db,
             user_id=user.id,
             session_id=request.session_id,
@@ -53,8 +59,65 @@ def chat(request: ChatInferenceRequest, user=Depends(get_current_user), db=Depen
             system_prompt=request.system_prompt,
             user_input=request.user_input,
             enable_rag=request.enable_rag,
+            retrieval_mode=request.retrieval_mode,
         )
         return {"response": response}
     except Exception as e:
-        print(f"Error during chat inference: {e}")
+        logger.exception(f"Error during chat inference: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatInferenceRequest, http_request: Request, user=Depends(get_current_user), db=Depends(get_async_db)):
+    """Stream the reply as Server-Sent Events: one `data` event per text delta, then `done`."""
+    try:
+        # History, RAG retrieval and the user-message commit run before the first byte is sent
+        stream = await arun_chat(
+            db=db,
+            user_id=user.id,
+            session_id=request.session_id,
+            model=request.model,
+            system_prompt=request.system_prompt,
+            user_input=request.user_input,
+            enable_rag=request.enable_rag,
+            retrieval_mode=request.retrieval_mode,
+            stream=True,
+        )
+    except Exception as e:
+        logger.exception(f"Error during chat inference: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_source():
+        try:
+            async for delta in stream:
+                if await http_request.is_disconnected():
+                    break
+                yield _sse({"delta": delta})
+            else:
+                message_id = await stream.finalize()
+                yield _sse({"message_id": message_id}, event="done")
+        except Exception as e:
+            logger.exception(f"Error during chat stream: {e}")
+            yield _sse({"detail": str(e)}, event="error")
+        finally:
+            # Persist the partial reply if the client went away mid-stream
+            await stream.finalize()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/cache/stats")
+def answer_cache_stats(user=Depends(get_current_user)):
+    """Hit-rate counters for the semantic answer cache in this worker."""
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
+import base64
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+from ..config import SESSION_LIST_PAGE_SIZE, MESSAGE_LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE
 from ..models import ChatSession, ChatMessage
 from ..database import get_db
 from ..auth import get_current_user
+from ..services.chat_history import chat_history_builder
 from pydantic import BaseModel
 
 class CreateSessionRequest(BaseModel):
@@ -18,42 +24,88 @@ def create_session(request: CreateSessionRequest, db: Session = Depends(get_db),
     db.refresh(new_session)
     return {"id": new_session.id, "title": new_session.title, "created_at": new_session.created_at}
 
+def _encode_cursor(timestamp: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _page(query, order_column, id_column, cursor: Optional[str], limit: int, descending: bool,
+          response: Response) -> list[dict]:
+    """
+    One keyset page of query ordered by (order_column, id_column). Rows
+    are fetched as plain tuples, and the cursor for the following page,
+    if there is one, is returned in the X-Next-Cursor header.
+    """
+    if cursor:
+        timestamp, row_id = _decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(order_column < timestamp, and_(order_column == timestamp, id_column < row_id)))
+        else:
+            query = query.filter(or_(order_column > timestamp, and_(order_column == timestamp, id_column > row_id)))
+    order = (order_column.desc(), id_column.desc()) if descending else (order_column, id_column)
+    # One row beyond the page says whether another page follows
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(getattr(last, order_column.key), last.id)
+    return [row._asdict() for row in rows]
+
+
 @router.get("/")
-def get_sessions(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    sessions = db.query(ChatSession).filter_by(user_id=user.id).order_by(ChatSession.updated_at.desc()).all()
-    return [
-        {
-            "id": s.id,
-            "title": s.title,
-            "created_at": s.created_at,
-            "updated_at": s.updated_at,
-        }
-        for s in sessions
-    ]
+def get_sessions(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(SESSION_LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+    since: Optional[datetime] = Query(None, description="Only sessions updated after this time"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    query = db.query(ChatSession.id, ChatSession.title, ChatSession.created_at, ChatSession.updated_at).filter(
+        ChatSession.user_id == user.id
+    )
+    if since is not None:
+        query = query.filter(ChatSession.updated_at > _naive_utc(since))
+    return _page(query, ChatSession.updated_at, ChatSession.id, cursor, limit, descending=True, response=response)
 
 
 @router.get("/{session_id}/messages")
 def get_session_messages(
+    response: Response,
     session_id: int = Path(..., description="ID of the chat session"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(MESSAGE_LIST_PAGE_SIZE, ge=1, le=LIST_MAX_PAGE_SIZE),
+    since: Optional[datetime] = Query(None, description="Only messages created after this time"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="desc pages back from the newest message"),
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
     # Verify session belongs to user
-    session = db.query(ChatSession).filter_by(id=session_id, user_id=user.id).first()
-    if not session:
+    if db.query(ChatSession.id).filter_by(id=session_id, user_id=user.id).first() is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    messages = db.query(ChatMessage).filter_by(session_id=session_id).order_by(ChatMessage.created_at).all()
-
-    return [
-        {
-            "id": msg.id,
-            "role": msg.role,
-            "content": msg.content,
-            "created_at": msg.created_at
-        }
-        for msg in messages
-    ]
+    query = db.query(ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.created_at).filter(
+        ChatMessage.session_id == session_id
+    )
+    if since is not None:
+        query = query.filter(ChatMessage.created_at > _naive_utc(since))
+    return _page(
+        query, ChatMessage.created_at, ChatMessage.id, cursor, limit, descending=order == "desc", response=response
+    )
 
 @router.delete("/{session_id}")
 def delete_session(
@@ -61,10 +113,12 @@ def delete_session(
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    session = db.query(ChatSession).filter_by(id=session_id, user_id=user.id).first()
-    if not session:
+    if db.query(ChatSession.id).filter_by(id=session_id, user_id=user.id).first() is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    
-    db.delete(session)
+
+    # Set-based deletes: the ORM cascade would load and delete every message one by one
+    db.query(ChatMessage).filter_by(session_id=session_id).delete(synchronize_session=False)
+    db.query(ChatSession).filter_by(id=session_id).delete(synchronize_session=False)
     db.commit()
+    chat_history_builder.forget(session_id)
     return {"message": "Session deleted successfully"}
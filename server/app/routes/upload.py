@@ -1,20 +1,130 @@
 # app/routes/upload.py
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from collections import Counter
+from uuid import uuid4
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Path, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
 from app.auth import get_current_user
-from app.services.document_processor import process_and_store_document
-from ..database import SessionLocal
+from app.services.archive_reader import iter_upload_members
+from app.services.chunker import CHUNK_STRATEGIES
+from app.services.ingestion_queue import ingestion_queue, job_to_dict
+from ..config import BULK_UPLOAD_MAX_FILES, BULK_UPLOAD_ENQUEUE_BATCH
+from ..database import get_db
+from ..models import IngestionJob
 
 router = APIRouter(prefix="/upload", tags=["Documents"])
 
-@router.post("/")
+CHUNKING_QUERY = Query(None, description=f"Chunking strategy: {', '.join(CHUNK_STRATEGIES)}; defaults to CHUNK_STRATEGY")
+
+
+def _check_chunking(chunking: Optional[str]):
+    if chunking is not None and chunking not in CHUNK_STRATEGIES:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown chunking strategy. Expected one of: {', '.join(CHUNK_STRATEGIES)}."
+        )
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     file: UploadFile = File(...),
+    chunking: Optional[str] = CHUNKING_QUERY,
     user=Depends(get_current_user)
 ):
     if not file.filename.endswith((".txt", ".pdf", ".docx")):
         raise HTTPException(status_code=400, detail="Unsupported file type.")
+    _check_chunking(chunking)
 
-    db = SessionLocal()
     contents = await file.read()
-    process_and_store_document(user.id, file.filename, contents, db=db)
-    return {"message": "Upload successful"}
+    # Spooling and the job insert block, so keep them off the event loop
+    job_id = await run_in_threadpool(ingestion_queue.enqueue, user.id, file.filename, contents, chunking)
+    return {"message": "Upload accepted", "job_id": job_id, "status": "queued"}
+
+
+@router.get("/jobs/{job_id}")
+def get_upload_job(
+    job_id: int = Path(..., description="ID of the ingestion job"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    job = db.query(IngestionJob).filter_by(id=job_id, user_id=user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+
+def _enqueue_bulk(user_id: int, uploads: list[UploadFile], chunking: Optional[str] = None) -> dict:
+    """
+    Queue every document in the uploads, reading archive members one at a
+    time and spooling them in groups of BULK_UPLOAD_ENQUEUE_BATCH so at most
+    one group of files is held in memory.
+    """
+    batch_id = str(uuid4())
+    results = []
+    pending: list[tuple[str, bytes]] = []
+    accepted = 0
+
+    def flush():
+        job_ids = ingestion_queue.enqueue_many(user_id, pending, batch_id=batch_id, chunk_strategy=chunking)
+        results.extend(
+            {"filename": filename, "status": "queued", "job_id": job_id}
+            for (filename, _), job_id in zip(pending, job_ids)
+        )
+        pending.clear()
+
+    for upload in uploads:
+        for member in iter_upload_members(upload.filename, upload.file):
+            if member.data is None:
+                results.append({"filename": member.filename, "status": "skipped", "error": member.error})
+                continue
+            if accepted >= BULK_UPLOAD_MAX_FILES:
+                results.append({"filename": member.filename, "status": "skipped", "error": "Too many files in one upload."})
+                continue
+            pending.append((member.filename, member.data))
+            accepted += 1
+            if len(pending) >= BULK_UPLOAD_ENQUEUE_BATCH:
+                flush()
+    if pending:
+        flush()
+
+    return {
+        "message": "Bulk upload accepted",
+        "batch_id": batch_id,
+        "accepted": accepted,
+        "skipped": len(results) - accepted,
+        "files": results,
+    }
+
+
+@router.post("/bulk", status_code=status.HTTP_202_ACCEPTED)
+async def bulk_upload_documents(
+    files: list[UploadFile] = File(...),
+    chunking: Optional[str] = CHUNKING_QUERY,
+    user=Depends(get_current_user)
+):
+    _check_chunking(chunking)
+    # Archive reads, spooling and job inserts all block, so keep them off the event loop
+    report = await run_in_threadpool(_enqueue_bulk, user.id, files, chunking)
+    if not report["accepted"]:
+        raise HTTPException(status_code=400, detail={"message": "No supported documents found.", "files": report["files"]})
+    return report
+
+
+@router.get("/batches/{batch_id}")
+def get_upload_batch(
+    batch_id: str = Path(..., description="ID returned by a bulk upload"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    jobs = (
+        db.query(IngestionJob)
+        .filter_by(batch_id=batch_id, user_id=user.id)
+        .order_by(IngestionJob.id)
+        .all()
+    )
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return {
+        "batch_id": batch_id,
+        "counts": dict(Counter(job.status for job in jobs)),
+        "jobs": [job_to_dict(job) for job in jobs],
+    }
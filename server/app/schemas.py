@@ -35,4 +35,6 @@ class Token(BaseModel):
 
 # Token Data (for JWT payload)
 class TokenData(BaseModel):
-    email: Optional[str] = None
\ No newline at end of file
+    email: Optional[str] = None
+    user_id: Optional[int] = None
+    jti: Optional[str] = None
\ No newline at end of file
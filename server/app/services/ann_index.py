@@ -0,0 +1,145 @@
+# server/app/services/ann_index.py
+import json
+import os
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def normalize_rows(values: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(values, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return values / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-Flat) index over a namespace's normalized rows.
+
+    A spherical k-means coarse quantizer splits the rows into nlist lists;
+    a query scores the centroids, probes the nprobe closest lists and scores
+    only their rows exactly. New rows are assigned to their nearest centroid
+    as they arrive, so the index stays current without retraining. Raising
+    nprobe trades latency for recall; nprobe == nlist is exact search.
+
+    Files, next to the namespace's vectors:
+      ivf_centroids.npy  (nlist, dim) float32
+      ivf_assign.i32     list id per row, kept in step with vectors.f32
+      ivf.json           {"trained_rows": n}
+    """
+
+    KMEANS_ITERATIONS = 10
+    # Training sample size per list; k-means on more rows barely moves the centroids
+    SAMPLE_PER_LIST = 64
+    ASSIGN_BATCH = 65536
+
+    def __init__(self, path: str, nlist: int = 0, nprobe: int = 8, seed: int = 0):
+        self.path = path
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids_path = os.path.join(path, "ivf_centroids.npy")
+        self.assign_path = os.path.join(path, "ivf_assign.i32")
+        self.state_path = os.path.join(path, "ivf.json")
+        self.centroids: Optional[np.ndarray] = None
+        self.assign = np.zeros(0, dtype=np.int32)
+        self.trained_rows = 0
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def load(self, num_rows: int, matrix: Callable[[], np.ndarray]):
+        """Load a trained index, reassigning rows if the assignment file fell behind the vectors."""
+        if not os.path.exists(self.centroids_path):
+            return
+        self.centroids = np.load(self.centroids_path)
+        with open(self.state_path) as f:
+            self.trained_rows = json.load(f)["trained_rows"]
+        assign = np.fromfile(self.assign_path, dtype=np.int32) if os.path.exists(self.assign_path) else np.zeros(0, np.int32)
+        if len(assign) != num_rows:
+            assign = self._nearest(np.asarray(matrix())) if num_rows else np.zeros(0, np.int32)
+            assign.astype("<i4").tofile(self.assign_path)
+        self.assign = assign
+        self._order = None
+
+    def _nearest(self, values: np.ndarray) -> np.ndarray:
+        out = np.empty(len(values), dtype=np.int32)
+        for start in range(0, len(values), self.ASSIGN_BATCH):
+            batch = values[start:start + self.ASSIGN_BATCH]
+            out[start:start + len(batch)] = np.argmax(batch @ self.centroids.T, axis=1)
+        return out
+
+    def train(self, matrix: np.ndarray, alive: np.ndarray):
+        """Run spherical k-means on a sample of live rows, then assign every row."""
+        live_rows = np.flatnonzero(alive)
+        nlist = self.nlist or max(1, int(np.sqrt(len(live_rows))))
+        nlist = min(nlist, len(live_rows))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(live_rows), nlist * self.SAMPLE_PER_LIST)
+        sample = np.asarray(matrix[np.sort(rng.choice(live_rows, sample_size, replace=False))])
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            # Re-seed empty lists from random sample rows
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize_rows(sums).astype(np.float32)
+
+        self.centroids = centroids
+        self.trained_rows = len(live_rows)
+        self.assign = self._nearest(np.asarray(matrix)) if len(matrix) else np.zeros(0, np.int32)
+        self._order = None
+
+        os.makedirs(self.path, exist_ok=True)
+        np.save(self.centroids_path, self.centroids)
+        self.assign.astype("<i4").tofile(self.assign_path)
+        with open(self.state_path, "w") as f:
+            json.dump({"trained_rows": self.trained_rows}, f)
+
+    def add(self, rows: list[int], values: np.ndarray):
+        """Assign new or overwritten rows to their nearest list."""
+        if not self.is_trained or not rows:
+            return
+        labels = self._nearest(values)
+        rows = np.asarray(rows)
+        appended = rows >= len(self.assign)
+        if (~appended).any():
+            self.assign[rows[~appended]] = labels[~appended]
+            on_disk = np.memmap(self.assign_path, dtype=np.int32, mode="r+", shape=(len(self.assign),))
+            on_disk[rows[~appended]] = labels[~appended]
+            on_disk.flush()
+            del on_disk
+        if appended.any():
+            # Appended rows arrive contiguously at the end, in row order
+            order = np.argsort(rows[appended])
+            new_labels = labels[appended][order]
+            self.assign = np.concatenate([self.assign, new_labels])
+            with open(self.assign_path, "ab") as f:
+                f.write(new_labels.astype("<i4").tobytes())
+        self._order = None
+
+    def remap(self, keep: np.ndarray):
+        """Follow a compaction that kept only the given rows, in order."""
+        if not self.is_trained:
+            return
+        self.assign = self.assign[keep]
+        self.assign.astype("<i4").tofile(self.assign_path)
+        self._order = None
+
+    def candidates(self, q: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Row ids in the nprobe lists whose centroids are closest to q."""
+        if self._order is None:
+            # Rows grouped by list, so each list is a contiguous slice
+            self._order = np.argsort(self.assign, kind="stable")
+            self._offsets = np.searchsorted(self.assign[self._order], np.arange(len(self.centroids) + 1))
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ q
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in probe])
@@ -0,0 +1,191 @@
+# server/app/services/answer_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_MAX_TOTAL_ENTRIES,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+from ..models import User
+
+
+class _NamespaceCache:
+    """One user's cached answers: a matrix of normalized query embeddings and a parallel entry list."""
+
+    def __init__(self, dim: int, version: int):
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.entries: list[dict] = []
+        self.version = version  # the user's documents_version the answers were generated from
+
+
+def documents_version(db: Session, user_id: int) -> int:
+    """The user's document version; read before retrieval and passed to lookup and store."""
+    return db.query(User.documents_version).filter_by(id=user_id).scalar() or 0
+
+
+def bump_documents_version(db: Session, user_id: int):
+    """Mark the user's cached answers stale in every worker; commits with the caller's transaction."""
+    db.query(User).filter_by(id=user_id).update(
+        {User.documents_version: User.documents_version + 1}, synchronize_session=False
+    )
+
+
+class SemanticAnswerCache:
+    """
+    Caches chat answers by query meaning. A lookup embeds nothing itself: it
+    takes the query embedding, and returns the answer of the most similar
+    cached query whose cosine similarity reaches the threshold. Only entries
+    from the same user namespace and scope (model, system prompt and
+    retrieval settings) are considered. Each namespace keeps at most
+    max_entries answers, oldest first out, and once all namespaces together
+    hold more than max_total_entries the least recently used namespaces are
+    dropped whole. Every store also expires the least recently used
+    namespace, so idle users' answers are freed after ttl_seconds.
+
+    The cache is per process, but entries are tagged with the user's
+    documents_version, which ingestion and deletion bump in the database.
+    Callers read the version before retrieval, and a lookup or store with a
+    newer version drops the namespace, so a document change made by any
+    worker invalidates the answers cached in all of them. A store with an
+    older version than the cached one is ignored.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float, max_total_entries: int = 0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_total_entries = max_total_entries  # 0 = no limit across namespaces
+        # Least recently used first
+        self._namespaces: OrderedDict[str, _NamespaceCache] = OrderedDict()
+        self._entries = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def scope(model: str, system_prompt: str, enable_rag: bool, retrieval_mode: str) -> str:
+        payload = f"{model}\0{enable_rag}\0{retrieval_mode}\0{system_prompt}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _current(self, namespace: str, version: int) -> Optional[_NamespaceCache]:
+        cache = self._namespaces.get(namespace)
+        if cache is None:
+            return None
+        if cache.version < version:
+            self._drop(namespace)
+            self.invalidations += 1
+            return None
+        self._namespaces.move_to_end(namespace)
+        return cache
+
+    def _drop(self, namespace: str) -> Optional[_NamespaceCache]:
+        cache = self._namespaces.pop(namespace, None)
+        if cache is not None:
+            self._entries -= len(cache.entries)
+        return cache
+
+    def lookup(self, namespace: str, scope: str, embedding: list[float], version: int = 0) -> Optional[dict]:
+        """Best cached entry at or above the threshold, or None. Counts a hit or a miss."""
+        query = self._normalize(embedding)
+        with self._lock:
+            cache = self._current(namespace, version)
+            if cache is not None and cache.version == version and len(cache.entries) and cache.vectors.shape[1] == len(query):
+                self._expire(namespace, cache)
+                scores = cache.vectors @ query
+                for row in np.argsort(-scores):
+                    if scores[row] < self.threshold:
+                        break
+                    entry = cache.entries[row]
+                    if entry["scope"] == scope:
+                        self.hits += 1
+                        return {**entry, "similarity": float(scores[row])}
+            self.misses += 1
+            return None
+
+    def store(
+        self, namespace: str, scope: str, embedding: list[float], answer: str, chunk_ids: list[str], version: int = 0
+    ):
+        vector = self._normalize(embedding)
+        entry = {"scope": scope, "answer": answer, "chunk_ids": list(chunk_ids), "created_at": time.time()}
+        with self._lock:
+            cache = self._current(namespace, version)
+            if cache is not None and cache.version > version:
+                # Generated from documents that have since changed
+                return
+            if cache is None or cache.vectors.shape[1] != len(vector):
+                self._drop(namespace)
+                cache = self._namespaces[namespace] = _NamespaceCache(len(vector), version)
+            self._entries -= len(cache.entries)
+            cache.vectors = np.vstack([cache.vectors, vector[None, :]])[-self.max_entries:]
+            cache.entries = (cache.entries + [entry])[-self.max_entries:]
+            self._entries += len(cache.entries)
+
+            oldest = next(iter(self._namespaces))
+            if oldest != namespace:
+                self._expire(oldest, self._namespaces[oldest])
+            while self.max_total_entries and self._entries > self.max_total_entries:
+                oldest = next(iter(self._namespaces))
+                if oldest == namespace:
+                    break
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _expire(self, namespace: str, cache: _NamespaceCache):
+        cutoff = time.time() - self.ttl_seconds
+        keep = [i for i, entry in enumerate(cache.entries) if entry["created_at"] >= cutoff]
+        if len(keep) < len(cache.entries):
+            self._entries -= len(cache.entries) - len(keep)
+            cache.vectors = cache.vectors[keep]
+            cache.entries = [cache.entries[i] for i in keep]
+        if not cache.entries:
+            self._drop(namespace)
+
+    def invalidate(self, namespace: str):
+        """Forget every answer for a namespace, e.g. after its documents changed."""
+        with self._lock:
+            if self._drop(namespace) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._namespaces.clear()
+            self._entries = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "namespaces": len(self._namespaces),
+                "entries": self._entries,
+            }
+
+
+answer_cache = (
+    SemanticAnswerCache(
+        ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_TOTAL_ENTRIES
+    )
+    if ANSWER_CACHE_ENABLED
+    else None
+)
@@ -0,0 +1,104 @@
+# server/app/services/archive_reader.py
+import posixpath
+import tarfile
+import zipfile
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+from ..config import BULK_UPLOAD_MAX_FILE_BYTES
+
+SUPPORTED_EXTENSIONS = (".txt", ".pdf", ".docx")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2")
+
+
+class UploadMember(NamedTuple):
+    """One file pulled out of a bulk upload; data is None when the file was skipped."""
+    filename: str
+    data: Optional[bytes]
+    error: Optional[str] = None
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _clean_member_name(name: str) -> Optional[str]:
+    """Relative member path, or None for entries that should never be ingested."""
+    name = posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+    parts = name.split("/")
+    if name in ("", ".") or ".." in parts:
+        return None
+    # Resource forks and dotfiles added by archivers, e.g. __MACOSX/ or .DS_Store
+    if parts[0] == "__MACOSX" or any(part.startswith(".") for part in parts):
+        return None
+    return name
+
+
+def _read_limited(fileobj: BinaryIO, max_bytes: int) -> Optional[bytes]:
+    data = fileobj.read(max_bytes + 1)
+    return None if len(data) > max_bytes else data
+
+
+def _member(name: str, size: int, open_member, max_bytes: int) -> Optional[UploadMember]:
+    filename = _clean_member_name(name)
+    if filename is None:
+        return None
+    if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        return UploadMember(filename, None, "Unsupported file type.")
+    if size > max_bytes:
+        return UploadMember(filename, None, f"File exceeds {max_bytes} bytes.")
+    with open_member() as f:
+        data = _read_limited(f, max_bytes)
+    if data is None:
+        return UploadMember(filename, None, f"File exceeds {max_bytes} bytes.")
+    return UploadMember(filename, data)
+
+
+def iter_zip_members(fileobj: BinaryIO, max_bytes: int = BULK_UPLOAD_MAX_FILE_BYTES) -> Iterator[UploadMember]:
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            member = _member(info.filename, info.file_size, lambda: archive.open(info), max_bytes)
+            if member:
+                yield member
+
+
+def iter_tar_members(fileobj: BinaryIO, max_bytes: int = BULK_UPLOAD_MAX_FILE_BYTES) -> Iterator[UploadMember]:
+    # Stream mode reads the archive front to back without seeking or extracting
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            member = _member(info.name, info.size, lambda: archive.extractfile(info), max_bytes)
+            if member:
+                yield member
+
+
+def iter_upload_members(
+    filename: str, fileobj: BinaryIO, max_bytes: int = BULK_UPLOAD_MAX_FILE_BYTES
+) -> Iterator[UploadMember]:
+    """
+    Yield the documents in one uploaded file, one member at a time. Archives
+    are read member by member, so only the current member is held in memory;
+    anything else is treated as a single document.
+    """
+    lowered = filename.lower()
+    try:
+        if lowered.endswith(".zip"):
+            yield from iter_zip_members(fileobj, max_bytes)
+            return
+        if lowered.endswith(ARCHIVE_EXTENSIONS):
+            yield from iter_tar_members(fileobj, max_bytes)
+            return
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        yield UploadMember(filename, None, f"Unreadable archive: {e}")
+        return
+
+    if not lowered.endswith(SUPPORTED_EXTENSIONS):
+        yield UploadMember(filename, None, "Unsupported file type.")
+        return
+    data = _read_limited(fileobj, max_bytes)
+    if data is None:
+        yield UploadMember(filename, None, f"File exceeds {max_bytes} bytes.")
+    else:
+        yield UploadMember(filename, data)
@@ -0,0 +1,161 @@
+# server/app/services/bedrock_async.py
+import asyncio
+import base64
+import json
+import threading
+from typing import AsyncIterator, Optional
+from urllib.parse import quote
+
+import boto3
+import httpx
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.eventstream import EventStreamBuffer
+
+from .bedrock_client import (
+    REGION,
+    THROTTLING_ERROR_CODES,
+    BedrockThrottlingError,
+    Prompt,
+    _build_request,
+    _parse_response,
+    _parse_stream_chunk,
+    _resolve_model_id,
+    fake_response_stream,
+)
+from ..config import (
+    BEDROCK_MODEL_EMBEDDING,
+    BEDROCK_FAKE_STREAM,
+    BEDROCK_FAKE_STREAM_DELAY,
+    BEDROCK_ASYNC_MAX_CONNECTIONS,
+    BEDROCK_ASYNC_TIMEOUT,
+)
+
+
+class AsyncBedrockClient:
+    """
+    Bedrock runtime calls on the event loop. Requests are SigV4-signed with
+    botocore, using the same credential chain as the boto3 client, and sent
+    over a pooled httpx.AsyncClient, so a waiting generation holds a socket
+    rather than a worker thread. Response streams are decoded with botocore's
+    event-stream parser.
+    """
+
+    def __init__(
+        self,
+        region: str = REGION,
+        max_connections: int = BEDROCK_ASYNC_MAX_CONNECTIONS,
+        timeout: float = BEDROCK_ASYNC_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        credentials=None,
+    ):
+        self.region = region
+        self.endpoint = f"https://bedrock-runtime.{region}.amazonaws.com"
+        self._credentials = credentials
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+
+    def _signed_headers(self, url: str, body: bytes, headers: dict) -> dict:
+        if self._credentials is None:
+            self._credentials = boto3.Session().get_credentials()
+        # Frozen per request so refreshable credentials (e.g. from an instance role) stay current
+        credentials = self._credentials.get_frozen_credentials()
+        request = AWSRequest(method="POST", url=url, data=body, headers=headers)
+        SigV4Auth(credentials, "bedrock", self.region).add_auth(request)
+        return dict(request.headers.items())
+
+    def _url(self, model_id: str, action: str) -> str:
+        return f"{self.endpoint}/model/{quote(model_id, safe='')}/{action}"
+
+    @staticmethod
+    def _raise_for_error(model_id: str, response: httpx.Response, body: bytes):
+        if response.status_code < 400:
+            return
+        code = response.headers.get("x-amzn-errortype", "").split(":")[0]
+        try:
+            message = json.loads(body).get("message", "")
+        except ValueError:
+            message = body.decode("utf-8", "replace")
+        if code in THROTTLING_ERROR_CODES or response.status_code == 429:
+            raise BedrockThrottlingError(f"{model_id} throttled: {message}")
+        raise RuntimeError(f"ERROR: Can't invoke {model_id}.\nREASON:  {code or response.status_code}: {message}")
+
+    async def invoke(self, model_id: str, body: str) -> dict:
+        url = self._url(model_id, "invoke")
+        body = body.encode("utf-8")
+        headers = self._signed_headers(url, body, {"Content-Type": "application/json", "Accept": "application/json"})
+        response = await self._http.post(url, content=body, headers=headers)
+        self._raise_for_error(model_id, response, response.content)
+        return response.json()
+
+    async def invoke_stream(self, model_id: str, body: str) -> AsyncIterator[dict]:
+        """Yield each decoded chunk payload of an invoke-with-response-stream call."""
+        url = self._url(model_id, "invoke-with-response-stream")
+        body = body.encode("utf-8")
+        headers = self._signed_headers(
+            url, body, {"Content-Type": "application/json", "X-Amzn-Bedrock-Accept": "application/json"}
+        )
+        async with self._http.stream("POST", url, content=body, headers=headers) as response:
+            if response.status_code >= 400:
+                self._raise_for_error(model_id, response, await response.aread())
+            buffer = EventStreamBuffer()
+            async for data in response.aiter_bytes():
+                buffer.add_data(data)
+                for message in buffer:
+                    message_headers = message.headers
+                    if message_headers.get(":message-type") == "exception":
+                        code = message_headers.get(":exception-type", "")
+                        detail = json.loads(message.payload or b"{}").get("message", "")
+                        # Stream events name exceptions in lower camel case, e.g. throttlingException
+                        if code[:1].upper() + code[1:] in THROTTLING_ERROR_CODES:
+                            raise BedrockThrottlingError(f"{model_id} throttled: {detail}")
+                        raise RuntimeError(f"ERROR: Can't stream {model_id}.\nREASON:  {code}: {detail}")
+                    if message_headers.get(":event-type") == "chunk":
+                        payload = json.loads(message.payload)
+                        yield json.loads(base64.b64decode(payload["bytes"]))
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_client: Optional[AsyncBedrockClient] = None
+_client_lock = threading.Lock()
+
+
+def get_async_client() -> AsyncBedrockClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncBedrockClient()
+        return _client
+
+
+async def async_call_bedrock_model(model_key: str, prompt: Prompt) -> str:
+    model_id = _resolve_model_id(model_key)
+    model_response = await get_async_client().invoke(model_id, _build_request(model_id, prompt))
+    return _parse_response(model_id, model_response)
+
+
+async def async_stream_bedrock_model(model_key: str, prompt: Prompt) -> AsyncIterator[str]:
+    """Async counterpart of stream_bedrock_model."""
+    model_id = _resolve_model_id(model_key)
+
+    if BEDROCK_FAKE_STREAM:
+        for delta in fake_response_stream(prompt):
+            if BEDROCK_FAKE_STREAM_DELAY:
+                await asyncio.sleep(BEDROCK_FAKE_STREAM_DELAY)
+            yield delta
+        return
+
+    async for chunk in get_async_client().invoke_stream(model_id, _build_request(model_id, prompt)):
+        text = _parse_stream_chunk(model_id, chunk)
+        if text:
+            yield text
+
+
+async def async_call_embedding_model(text: str) -> list:
+    model_response = await get_async_client().invoke(BEDROCK_MODEL_EMBEDDING, json.dumps({"inputText": text}))
+    return model_response["embedding"]
@@ -1,55 +1,167 @@
 # app/services/bedrock_client.py
 import boto3
+import logging
 import os
+import time
+from typing import Iterator, Union
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
-from ..config import BEDROCK_MODEL_CLAUDE_INSTANT, BEDROCK_MODEL_TITAN_TEXT, BEDROCK_MODEL_EMBEDDING
+from ..config import (
+    BEDROCK_MODEL_CLAUDE_INSTANT,
+    BEDROCK_MODEL_TITAN_TEXT,
+    BEDROCK_MODEL_EMBEDDING,
+    BEDROCK_FAKE_STREAM,
+    BEDROCK_FAKE_STREAM_DELAY,
+    BEDROCK_PROMPT_CACHING,
+    EMBEDDING_MAX_WORKERS,
+)
 import json
 
+logger = logging.getLogger(__name__)
+
 REGION = os.getenv("AWS_REGION", "us-east-1")
 MODEL_IDS = {
     "claude": BEDROCK_MODEL_CLAUDE_INSTANT,
     "titan": BEDROCK_MODEL_TITAN_TEXT,
 }
 
-client = boto3.client("bedrock-runtime", region_name=REGION)
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+# Claude models on Bedrock that accept cache_control breakpoints
+PROMPT_CACHING_MODELS = (
+    "claude-3-5-haiku",
+    "claude-3-7-sonnet",
+    "claude-sonnet-4",
+    "claude-opus-4",
+    "claude-haiku-4",
+)
+
+# A prompt is either flat text or {"system": str | [str, ...], "messages": [{"role", "content"}, ...]},
+# where the first system block is the stable one and the last message is the new user turn
+Prompt = Union[str, dict]
+
+# The embedding engine shares this client across worker threads, so the
+# connection pool must be at least as large as the worker pool.
+client = boto3.client(
+    "bedrock-runtime",
+    region_name=REGION,
+    config=Config(max_pool_connections=max(10, EMBEDDING_MAX_WORKERS)),
+)
+
+
+class BedrockThrottlingError(RuntimeError):
+    """Raised when Bedrock rejects a call because of rate limiting."""
+
+
+def supports_prompt_caching(model_id: str) -> bool:
+    if BEDROCK_PROMPT_CACHING == "off":
+        return False
+    if BEDROCK_PROMPT_CACHING == "on":
+        return True
+    return any(name in model_id for name in PROMPT_CACHING_MODELS)
+
+
+def flatten_prompt(prompt: Prompt) -> str:
+    """Render a structured prompt as the flat "User:/Assistant:" transcript text models without messages use."""
+    if isinstance(prompt, str):
+        return prompt
+    lines = ["\n\n".join(_system_blocks(prompt))]
+    for message in prompt["messages"]:
+        prefix = "User" if message["role"] == "user" else "Assistant"
+        lines.append(f"{prefix}: {message['content']}")
+    return "\n".join(lines)
+
+
+def _system_blocks(prompt: dict) -> list[str]:
+    system = prompt.get("system") or []
+    return [block for block in ([system] if isinstance(system, str) else system) if block]
+
+
+def _claude_messages(messages: list[dict]) -> list[dict]:
+    """Messages API turns: non-empty, alternating, starting with the user."""
+    turns = []
+    for message in messages:
+        if not message.get("content") or not message["content"].strip():
+            continue
+        if turns and turns[-1]["role"] == message["role"]:
+            turns[-1]["content"][0]["text"] += "\n\n" + message["content"]
+            continue
+        if not turns and message["role"] != "user":
+            continue
+        turns.append({"role": message["role"], "content": [{"type": "text", "text": message["content"]}]})
+    return turns
+
+
+def _build_claude_body(model_id: str, prompt: Prompt) -> dict:
+    if isinstance(prompt, str):
+        prompt = {"system": "", "messages": [{"role": "user", "content": prompt}]}
+    messages = _claude_messages(prompt["messages"])
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 1024,
+        "temperature": 0.0, # Set to 0.0 for deterministic output 
+        "messages": messages,
+    }
+    system = [{"type": "text", "text": block} for block in _system_blocks(prompt)]
+
+    if supports_prompt_caching(model_id):
+        # Cache the prefix that repeats from turn to turn: the stable system
+        # block, and the history up to the turn before the new user message
+        if system:
+            system[0]["cache_control"] = {"type": "ephemeral"}
+        if len(messages) > 1:
+            messages[-2]["content"][-1]["cache_control"] = {"type": "ephemeral"}
+    if system:
+        body["system"] = system
+    return body
+
+
+def _build_request(model_id: str, prompt: Prompt) -> str:
+    if "claude" in model_id:
+        # Claude requires special Anthropic format
+        native_request = _build_claude_body(model_id, prompt)
+    else:  
+        # Titan
+        native_request = {
+            "inputText": flatten_prompt(prompt),
+            "textGenerationConfig": {
+                "maxTokenCount": 1024,
+                "temperature": 0.0,
+            },
+        }
+
+    # Convert the native request to JSON.
+    return json.dumps(native_request)
+
 
-def call_bedrock_model(model_key: str, prompt: str) -> str:
+def _log_cache_usage(model_id: str, usage: dict):
+    if usage.get("cache_read_input_tokens") or usage.get("cache_creation_input_tokens"):
+        logger.debug(
+            f"{model_id} prompt cache: {usage.get('cache_read_input_tokens', 0)} tokens read, "
+            f"{usage.get('cache_creation_input_tokens', 0)} written, {usage.get('input_tokens', 0)} uncached"
+        )
+
+
+def _resolve_model_id(model_key: str) -> str:
     model_id = MODEL_IDS.get(model_key)
     if not model_id:
         raise ValueError(f"Unsupported model key: {model_key}")
+    return model_id
+
+
+def _parse_response(model_id: str, model_response: dict) -> str:
+    """Extract the reply text from an invoke_model response body."""
+    if "claude" in model_id:
+        _log_cache_usage(model_id, model_response.get("usage", {}))
+        return "".join(block.get("text", "") for block in model_response["content"] if block.get("type") == "text")
+    return model_response["results"][0]["outputText"]
+
+
+def call_bedrock_model(model_key: str, prompt: Prompt) -> str:
+    model_id = _resolve_model_id(model_key)
 
     try:
-        if "claude" in model_id:
-            # Claude requires special Anthropic format
-            native_request = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1024,
-                "temperature": 0.0, # Set to 0.0 for deterministic output 
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [{"type": "text", "text": prompt}],
-                    }
-                ],
-            }
-
-            # Convert the native request to JSON.
-            request = json.dumps(native_request)
-            json_output_key = "text"
-
-        else:  
-            # Titan
-            native_request = {
-                "inputText": prompt,
-                "textGenerationConfig": {
-                    "maxTokenCount": 1024,
-                    "temperature": 0.0,
-                },
-            }
-
-            # Convert the native request to JSON.
-            request = json.dumps(native_request)
-            json_output_key = "outputText"
+        request = _build_request(model_id, prompt)
 
         response = client.invoke_model(
             body=request,
@@ -60,15 +172,62 @@ def call_bedrock_model(model_key: str, prompt: str) -> str:
 
         model_response = json.loads(response["body"].read())
 
-        # Extract and print the response text.
-        response_text = model_response["content"][0][json_output_key]
-        return response_text
+        return _parse_response(model_id, model_response)
 
     except (BotoCoreError, ClientError) as e:
-        print(f"ERROR: Can't invoke {model_id}.\nREASON:  {str(e)}")
+        logger.error(f"Can't invoke {model_id}: {e}")
         raise RuntimeError(f"ERROR: Can't invoke {model_id}.\nREASON:  {str(e)}")
 
 
+def fake_response_stream(prompt: Prompt, delay: float = 0.0) -> Iterator[str]:
+    """Offline stand-in for a Bedrock response stream: echoes a canned reply word by word."""
+    prompt = flatten_prompt(prompt)
+    words = f"[fake stream] You said: {prompt.strip().splitlines()[-1] if prompt.strip() else ''}".split(" ")
+    for i, word in enumerate(words):
+        if delay:
+            time.sleep(delay)
+        yield word if i == 0 else f" {word}"
+
+
+def _parse_stream_chunk(model_id: str, chunk: dict) -> str:
+    if "claude" in model_id:
+        # Messages API streams typed events; only content deltas carry text
+        if chunk.get("type") == "content_block_delta":
+            return chunk.get("delta", {}).get("text", "")
+        if chunk.get("type") == "message_start":
+            _log_cache_usage(model_id, chunk.get("message", {}).get("usage", {}))
+        return ""
+    return chunk.get("outputText", "")
+
+
+def stream_bedrock_model(model_key: str, prompt: Prompt) -> Iterator[str]:
+    """Yield text deltas as Bedrock generates them, via invoke_model_with_response_stream."""
+    model_id = _resolve_model_id(model_key)
+
+    if BEDROCK_FAKE_STREAM:
+        yield from fake_response_stream(prompt, delay=BEDROCK_FAKE_STREAM_DELAY)
+        return
+
+    try:
+        response = client.invoke_model_with_response_stream(
+            body=_build_request(model_id, prompt),
+            modelId=model_id,
+            contentType="application/json",
+            accept="application/json"
+        )
+        for event in response["body"]:
+            payload = event.get("chunk")
+            if not payload:
+                continue
+            text = _parse_stream_chunk(model_id, json.loads(payload["bytes"]))
+            if text:
+                yield text
+
+    except (BotoCoreError, ClientError) as e:
+        logger.error(f"Can't stream {model_id}: {e}")
+        raise RuntimeError(f"ERROR: Can't stream {model_id}.\nREASON:  {str(e)}")
+
+
 def call_embedding_model(text: str) -> list:
     try:
         native_request = {
@@ -84,5 +243,9 @@ def call_embedding_model(text: str) -> list:
         model_response = json.loads(response["body"].read())
         return model_response["embedding"]
 
-    except (BotoCoreError, ClientError) as e:
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+            raise BedrockThrottlingError(f"Embedding call throttled: {str(e)}")
+        raise RuntimeError(f"Failed to get embedding: {str(e)}")
+    except BotoCoreError as e:
         raise RuntimeError(f"Failed to get embedding: {str(e)}")
\ No newline at end of file
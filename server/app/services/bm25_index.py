@@ -0,0 +1,337 @@
+# server/app/services/bm25_index.py
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+from ..config import BM25_INDEX_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not serialized
+    fcntl = None
+
+# Identifier-like runs such as "err-1042", "v2.3.1" or "part_no/77" stay together
+TOKEN_PATTERN = re.compile(r"[0-9a-z]+(?:[-_./:][0-9a-z]+)*")
+SUBTOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; compound identifiers are emitted whole and as their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = SUBTOKEN_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def _encode_varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(buf: bytearray) -> np.ndarray:
+    """Vectorized LEB128 decode of a buffer of unsigned varints (each at most 5 bytes)."""
+    data = np.frombuffer(bytes(buf), dtype=np.uint8)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    values = np.zeros(len(ends), dtype=np.int64)
+    for shift in range(5):
+        idx = starts + shift
+        valid = idx <= ends
+        if not valid.any():
+            break
+        values[valid] |= (data[idx[valid]] & 0x7F).astype(np.int64) << (7 * shift)
+    return values
+
+
+class _Postings:
+    """A term's postings: doc-number gaps and term frequencies as varint byte strings."""
+
+    __slots__ = ("gaps", "freqs", "last_doc")
+
+    def __init__(self):
+        self.gaps = bytearray()
+        self.freqs = bytearray()
+        self.last_doc = -1
+
+    def append(self, doc: int, freq: int):
+        # Docs are numbered in insertion order, so gaps are always positive
+        _encode_varint(doc - self.last_doc, self.gaps)
+        _encode_varint(freq, self.freqs)
+        self.last_doc = doc
+
+    def decode(self) -> tuple[np.ndarray, np.ndarray]:
+        docs = np.cumsum(decode_varints(self.gaps)) - 1
+        return docs, decode_varints(self.freqs)
+
+
+class BM25Index:
+    """
+    Incremental Okapi BM25 index for one namespace. Documents are numbered
+    in insertion order so postings only ever append. Deletes tombstone the
+    document in place (its postings stay until KeywordIndexStore compacts
+    the namespace) and re-tokenize its text to keep document frequencies exact.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: list[Optional[str]] = []
+        self.metadata: list[Optional[dict]] = []
+        # Growable buffers; search views them as numpy arrays without copying
+        self.lengths = array("f")
+        self.alive = bytearray()
+        self.doc_of: dict[str, int] = {}
+        self.postings: dict[str, _Postings] = {}
+        self.df: dict[str, int] = {}
+        self.total_length = 0
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_of)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[dict] = None):
+        if doc_id in self.doc_of:
+            self.delete([doc_id])
+        tokens = tokenize(text)
+        doc = len(self.ids)
+        self.ids.append(doc_id)
+        self.metadata.append({**(metadata or {}), "text": text})
+        self.lengths.append(len(tokens))
+        self.alive.append(1)
+        self.doc_of[doc_id] = doc
+        self.total_length += len(tokens)
+
+        counts: dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, freq in counts.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = _Postings()
+            postings.append(doc, freq)
+            self.df[token] = self.df.get(token, 0) + 1
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None) -> int:
+        docs = [self.doc_of[i] for i in ids or [] if i in self.doc_of]
+        if filter:
+            docs.extend(
+                doc for doc, metadata in enumerate(self.metadata)
+                if metadata is not None and all(metadata.get(k) == v for k, v in filter.items())
+            )
+        for doc in set(docs):
+            for token in set(tokenize(self.metadata[doc]["text"])):
+                self.df[token] -= 1
+            self.doc_of.pop(self.ids[doc], None)
+            self.total_length -= int(self.lengths[doc])
+            self.alive[doc] = 0
+            self.ids[doc] = None
+            self.metadata[doc] = None
+        return len(set(docs))
+
+    def search(self, query: str, top_k: int = 5) -> list[dict]:
+        if not self.num_docs or top_k <= 0:
+            return []
+        lengths = np.frombuffer(self.lengths, dtype=np.float32)
+        alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+        avg_length = self.total_length / self.num_docs or 1.0
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            docs, freqs = postings.decode()
+            df = self.df[term]
+            if df == 0:
+                continue
+            idf = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + norm)
+
+        scores[~alive] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) == 0:
+            return []
+        k = min(top_k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [{"id": self.ids[doc], "score": float(scores[doc]), "metadata": self.metadata[doc]} for doc in top]
+
+
+class _Namespace:
+    """One namespace's index and how far into its log the index has read."""
+
+    __slots__ = ("index", "lock", "inode", "offset")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, inode: Optional[int] = None):
+        self.index = BM25Index()
+        self.inode = inode
+        self.offset = 0
+
+
+class KeywordIndexStore:
+    """
+    Per-namespace BM25 indexes, loaded lazily. Each namespace persists as an
+    append-only JSONL log of {"id", "metadata"} and {"delete": ...} records
+    that is replayed on load; postings themselves are rebuilt in memory.
+
+    Several workers may share the log. Before every operation a namespace
+    reads whatever was appended since its stored offset, and reloads from
+    scratch if the log was rewritten by compaction. Writers hold an
+    exclusive lock on a sidecar file while appending or compacting, and
+    apply their own records by reading them back, so every worker applies
+    the log in the same order. Once deleted documents make up COMPACT_RATIO
+    of the index (and at least COMPACT_MIN_TOMBSTONES), the index and its
+    log are rewritten with only live documents.
+    """
+
+    COMPACT_RATIO = 0.5
+    COMPACT_MIN_TOMBSTONES = 1000
+
+    def __init__(self, root_dir: Optional[str]):
+        self.root_dir = root_dir
+        self._namespaces: dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def _log_path(self, namespace: str) -> Optional[str]:
+        if not self.root_dir:
+            return None
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in namespace)
+        return os.path.join(self.root_dir, f"{safe_name}.jsonl")
+
+    def _get(self, namespace: str) -> _Namespace:
+        with self._lock:
+            state = self._namespaces.get(namespace)
+            if state is None:
+                state = self._namespaces[namespace] = _Namespace()
+            return state
+
+    @contextmanager
+    def _write_lock(self, namespace: str):
+        """Exclusive across processes for appends and compaction of one log."""
+        path = self._log_path(namespace)
+        if not path or fcntl is None:
+            yield
+            return
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _sync(self, namespace: str, state: _Namespace):
+        """Apply records appended since the last sync; reload if the log was replaced or truncated."""
+        path = self._log_path(namespace)
+        if not path:
+            return
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            if state.inode is not None:
+                state.reset()
+            return
+        with f:
+            # fstat the open file, so a log swapped in by compaction is never read at the old offset
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != state.inode or stat.st_size < state.offset:
+                state.reset(stat.st_ino)
+            if stat.st_size == state.offset:
+                return
+            f.seek(state.offset)
+            data = f.read()
+        # A record still being written is left for the next sync
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._apply(state.index, json.loads(line))
+        state.offset += end
+
+    @staticmethod
+    def _apply(index: BM25Index, record: dict):
+        if "delete" in record:
+            index.delete(**record["delete"])
+        else:
+            index.add(record["id"], record["metadata"].get("text", ""), record["metadata"])
+
+    def _write(self, namespace: str, state: _Namespace, records: list[dict]):
+        path = self._log_path(namespace)
+        if not path:
+            for record in records:
+                self._apply(state.index, record)
+            return
+        os.makedirs(self.root_dir, exist_ok=True)
+        with open(path, "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+        self._sync(namespace, state)
+
+    def _should_compact(self, index: BM25Index) -> bool:
+        tombstones = len(index.ids) - index.num_docs
+        return tombstones >= self.COMPACT_MIN_TOMBSTONES and tombstones > self.COMPACT_RATIO * len(index.ids)
+
+    def compact(self, namespace: str):
+        """Rebuild a namespace's index and rewrite its log with only live documents."""
+        state = self._get(namespace)
+        with state.lock, self._write_lock(namespace):
+            self._sync(namespace, state)
+            self._compact(namespace, state)
+
+    def _compact(self, namespace: str, state: _Namespace):
+        records = [
+            {"id": doc_id, "metadata": metadata}
+            for doc_id, metadata in zip(state.index.ids, state.index.metadata)
+            if doc_id is not None
+        ]
+        index = BM25Index(state.index.k1, state.index.b)
+        for record in records:
+            self._apply(index, record)
+        path = self._log_path(namespace)
+        if path:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            os.replace(tmp_path, path)
+            stat = os.stat(path)
+            state.inode, state.offset = stat.st_ino, stat.st_size
+        state.index = index
+
+    def add(self, namespace: str, ids: list[str], metadatas: list[dict]):
+        """Index chunks; each metadata dict must carry the chunk under "text"."""
+        state = self._get(namespace)
+        records = [{"id": i, "metadata": m} for i, m in zip(ids, metadatas)]
+        with state.lock, self._write_lock(namespace):
+            self._sync(namespace, state)
+            self._write(namespace, state, records)
+
+    def delete(self, namespace: str, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        state = self._get(namespace)
+        with state.lock, self._write_lock(namespace):
+            self._sync(namespace, state)
+            self._write(namespace, state, [{"delete": {"ids": ids, "filter": filter}}])
+            if self._should_compact(state.index):
+                self._compact(namespace, state)
+
+    def search(self, namespace: str, query: str, top_k: int = 5) -> list[dict]:
+        state = self._get(namespace)
+        with state.lock:
+            self._sync(namespace, state)
+            return state.index.search(query, top_k)
+
+
+keyword_index = KeywordIndexStore(BM25_INDEX_DIR)
@@ -0,0 +1,214 @@
+# server/app/services/chat_history.py
+import math
+import threading
+from collections import OrderedDict, deque
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import CHARS_PER_TOKEN, CHAT_HISTORY_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET, CHAT_HISTORY_CACHE_SESSIONS
+from ..models import ChatMessage, ChatSession
+
+# How much of an evicted message survives as its excerpt line
+EXCERPT_CHARS = 200
+# Introduces the excerpts in prompts, so the model reads them as cut-off quotes rather than a summary
+EXCERPTS_HEADING = "Earlier in this conversation (excerpts, each message cut short):"
+# Messages fetched per query while filling a cold window, newest first
+FETCH_PAGE_SIZE = 50
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def _excerpt_line(role: str, content: str) -> str:
+    text = " ".join(content.split())
+    if len(text) > EXCERPT_CHARS:
+        text = text[:EXCERPT_CHARS].rstrip() + "..."
+    return f"{'User' if role == 'user' else 'Assistant'}: {text}"
+
+
+class _Window:
+    """The newest messages of a session that fit the budget, plus excerpts of everything older."""
+
+    def __init__(self, summary: str, summary_through_id: int):
+        self.messages: deque[dict] = deque()
+        self.tokens = 0
+        self.last_id = summary_through_id
+        self.summary_lines = summary.splitlines() if summary else []
+        self.summary_through_id = summary_through_id
+
+
+class _SessionLock:
+    """A session's lock and how many turns hold or wait for it."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class ChatHistoryBuilder:
+    """
+    Assembles the history sent with each chat turn. The newest messages are
+    kept verbatim up to token_budget (estimated locally, without calling a
+    tokenizer). Each older message is reduced to one excerpt line, its
+    first EXCERPT_CHARS characters; nothing is summarized by a model. The
+    excerpts are stored in ChatSession.summary and capped at
+    summary_budget, oldest lines dropped first.
+
+    Windows are cached per session, so a new turn only reads the messages
+    added since the previous one. A window is rebuilt from the database when
+    it is not cached or when the stored summary moved on without it (for
+    example because another worker handled the session).
+    """
+
+    def __init__(self, token_budget: int, summary_budget: int, max_sessions: int):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_sessions = max_sessions
+        self._windows: OrderedDict[int, _Window] = OrderedDict()
+        self._locks: dict[int, _SessionLock] = {}
+        self._lock = threading.Lock()
+
+    def _session_lock(self, session_id: int) -> threading.Lock:
+        """The session's lock, counted as in use until _release_session_lock."""
+        with self._lock:
+            entry = self._locks.get(session_id)
+            if entry is None:
+                entry = self._locks[session_id] = _SessionLock()
+            entry.users += 1
+            return entry.lock
+
+    def _release_session_lock(self, session_id: int):
+        with self._lock:
+            entry = self._locks[session_id]
+            entry.users -= 1
+            # The session was evicted or forgotten while in use
+            if not entry.users and session_id not in self._windows:
+                del self._locks[session_id]
+
+    def _cached(self, session: ChatSession) -> Optional[_Window]:
+        with self._lock:
+            window = self._windows.get(session.id)
+            if window is None or window.summary_through_id != (session.summary_through_id or 0):
+                return None
+            self._windows.move_to_end(session.id)
+            return window
+
+    def _remember(self, session_id: int, window: _Window):
+        with self._lock:
+            self._windows[session_id] = window
+            self._windows.move_to_end(session_id)
+            while len(self._windows) > self.max_sessions:
+                evicted, _ = self._windows.popitem(last=False)
+                self._drop_lock(evicted)
+
+    def _drop_lock(self, session_id: int):
+        """
+        Discard a session's lock unless a turn holds or waits for it (a later
+        turn would otherwise get a second lock); the last of those discards it.
+        """
+        entry = self._locks.get(session_id)
+        if entry is not None and not entry.users:
+            del self._locks[session_id]
+
+    def forget(self, session_id: int):
+        with self._lock:
+            self._windows.pop(session_id, None)
+            self._drop_lock(session_id)
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+            self._locks = {session_id: entry for session_id, entry in self._locks.items() if entry.users}
+
+    def _load(self, db: Session, session: ChatSession) -> _Window:
+        """Cold start: page backwards from the newest message until the budget is full."""
+        window = _Window(session.summary or "", session.summary_through_id or 0)
+        newest: list[ChatMessage] = []
+        tokens = 0
+        before_id = None
+        while tokens <= self.token_budget:
+            query = db.query(ChatMessage).filter(
+                ChatMessage.session_id == session.id, ChatMessage.id > window.summary_through_id
+            )
+            if before_id is not None:
+                query = query.filter(ChatMessage.id < before_id)
+            page = query.order_by(ChatMessage.id.desc()).limit(FETCH_PAGE_SIZE).all()
+            if not page:
+                break
+            for msg in page:
+                newest.append(msg)
+                tokens += estimate_tokens(msg.content or "")
+            before_id = page[-1].id
+        # Appending oldest first lets the normal eviction fold the overflow into the summary
+        self._append(window, reversed(newest))
+        return window
+
+    def _append(self, window: _Window, messages):
+        for msg in messages:
+            window.last_id = max(window.last_id, msg.id)
+            # Skip messages with null/empty content
+            if msg.content is None or not msg.content.strip():
+                continue
+            tokens = estimate_tokens(msg.content)
+            window.messages.append({"id": msg.id, "role": msg.role, "content": msg.content, "tokens": tokens})
+            window.tokens += tokens
+        while window.tokens > self.token_budget and window.messages:
+            oldest = window.messages.popleft()
+            window.tokens -= oldest["tokens"]
+            window.summary_lines.append(_excerpt_line(oldest["role"], oldest["content"]))
+            window.summary_through_id = oldest["id"]
+        summary_tokens = sum(estimate_tokens(line) for line in window.summary_lines)
+        while summary_tokens > self.summary_budget and window.summary_lines:
+            summary_tokens -= estimate_tokens(window.summary_lines.pop(0))
+
+    def build(self, db: Session, session: ChatSession, blocking: bool = True) -> tuple[list[dict], str]:
+        """
+        History for the next turn as (messages, excerpts). Messages are
+        {"role", "content"} dicts, oldest first; excerpts is the newline-joined
+        excerpt lines of older messages. Updates the session's stored
+        excerpts when messages were folded into them; the caller commits.
+
+        With blocking=False a session whose window is being built elsewhere
+        is read from the database without touching the cache. The async path
+        uses this: its builds share the event loop thread, so waiting on the
+        lock would stall every other request.
+        """
+        lock = self._session_lock(session.id)
+        try:
+            if not lock.acquire(blocking=blocking):
+                return self._result(session, self._load(db, session))
+            try:
+                window = self._cached(session)
+                if window is None:
+                    window = self._load(db, session)
+                else:
+                    new = (
+                        db.query(ChatMessage)
+                        .filter(ChatMessage.session_id == session.id, ChatMessage.id > window.last_id)
+                        .order_by(ChatMessage.id)
+                        .all()
+                    )
+                    self._append(window, new)
+                self._remember(session.id, window)
+                return self._result(session, window)
+            finally:
+                lock.release()
+        finally:
+            self._release_session_lock(session.id)
+
+    @staticmethod
+    def _result(session: ChatSession, window: _Window) -> tuple[list[dict], str]:
+        summary = "\n".join(window.summary_lines)
+        if window.summary_through_id != (session.summary_through_id or 0):
+            session.summary = summary
+            session.summary_through_id = window.summary_through_id
+        return [{"role": m["role"], "content": m["content"]} for m in window.messages], summary
+
+
+chat_history_builder = ChatHistoryBuilder(
+    CHAT_HISTORY_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET, CHAT_HISTORY_CACHE_SESSIONS
+)
@@ -0,0 +1,358 @@
+# server/app/services/chunker.py
+import re
+from collections import deque
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from ..config import CHARS_PER_TOKEN, CHUNK_OVERLAP_TOKENS, CHUNK_SIZE_TOKENS, CHUNK_STRATEGY
+
+CHUNK_STRATEGIES = ("structured", "recursive")
+# What one extracted segment is: a PDF page, a DOCX paragraph or table, or a line of text
+SEGMENT_UNITS = ("page", "paragraph", "line")
+
+# Tried in order on text that is too long; the empty separator splits between characters
+SEPARATORS = ("\n\n", "\n", ". ", " ", "")
+# Inside a single paragraph, sentence ends are better cut points than wrapped lines
+PARAGRAPH_SEPARATORS = ("\n\n", ". ", "\n", " ", "")
+# The recursive strategy splits this many chunks' worth of buffered text at a time
+SPLIT_WINDOW_CHUNKS = 20
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)(?:\s+#+)?$")
+TABLE_DIVIDER_PATTERN = re.compile(r"^\|?\s*:?-{3,}")
+# Short all-caps lines are the only heading signal plain PDF text has
+CAPS_HEADING_MAX_WORDS = 10
+
+
+def estimated_tokens(text: str) -> float:
+    """
+    Token length from the same characters-per-token estimate as chat
+    history. It is additive, so pieces can be measured once and summed.
+    """
+    return len(text) / CHARS_PER_TOKEN
+
+
+class Block(NamedTuple):
+    text: str
+    kind: str  # "heading", "paragraph" or "table"
+    page: Optional[int]
+    level: int = 0  # heading depth, 1 for the top level
+
+
+class Chunk(NamedTuple):
+    text: str
+    metadata: dict  # section, page_start and page_end where known
+
+
+def _heading(line: str) -> Optional[tuple[int, str]]:
+    match = HEADING_PATTERN.match(line)
+    if match:
+        return len(match.group(1)), match.group(2)
+    if (
+        line.upper() == line
+        and any(c.isalpha() for c in line)
+        and len(line.split()) <= CAPS_HEADING_MAX_WORDS
+        and not line.endswith((".", ":", ","))
+    ):
+        return 1, line
+    return None
+
+
+def _is_table_row(line: str) -> bool:
+    return line.count("|") >= 2 or "\t" in line
+
+
+def iter_blocks(segments: Iterable[str], unit: str = "line") -> Iterator[Block]:
+    """
+    Parse extracted segments into headings, paragraphs and tables. Blank
+    lines end paragraphs; so does the end of a page or DOCX paragraph, while
+    consecutive text lines run together. Markdown-style "#" lines (which DOCX
+    extraction emits for heading styles) and short all-caps lines are
+    headings; runs of "|"- or tab-separated lines are tables.
+    """
+    page = None
+    lines: list[str] = []
+    table = False
+    for number, segment in enumerate(segments, 1):
+        if unit == "page":
+            page = number
+        for line in segment.split("\n"):
+            line = line.strip()
+            row = bool(line) and _is_table_row(line)
+            heading = _heading(line) if line and not row else None
+            if lines and (not line or heading or row != table):
+                yield Block("\n".join(lines), "table" if table else "paragraph", page)
+                lines = []
+            if heading:
+                yield Block(heading[1], "heading", page, heading[0])
+            elif line:
+                lines.append(line)
+                table = row
+        if unit != "line" and lines:
+            yield Block("\n".join(lines), "table" if table else "paragraph", page)
+            lines = []
+    if lines:
+        yield Block("\n".join(lines), "table" if table else "paragraph", page)
+
+
+def _merge(pieces: list[tuple[str, float]], separator: str, chunk_size: float, chunk_overlap: float,
+           length: Callable[[str], float], out: list[str]):
+    """Greedily join pieces that each fit into chunks, starting each chunk with up to chunk_overlap of the last."""
+    separator_length = length(separator)
+    window: deque[tuple[str, float]] = deque()
+    total = 0.0
+    for piece, size in pieces:
+        if window and total + separator_length + size > chunk_size:
+            text = separator.join(p for p, _ in window).strip()
+            if text:
+                out.append(text)
+            # Keep a tail of at most chunk_overlap that still leaves room for this piece
+            while window and (total > chunk_overlap or total + separator_length + size > chunk_size):
+                _, first = window.popleft()
+                total -= first + (separator_length if window else 0.0)
+        total += size + (separator_length if window else 0.0)
+        window.append((piece, size))
+    if window:
+        text = separator.join(p for p, _ in window).strip()
+        if text:
+            out.append(text)
+
+
+def _split(text: str, separators: tuple, chunk_size: float, chunk_overlap: float,
+           length: Callable[[str], float], out: list[str]):
+    separator = next(s for s in separators if s == "" or s in text)
+    finer = separators[separators.index(separator) + 1:]
+    fitting: list[tuple[str, float]] = []
+    for piece in text.split(separator) if separator else text:
+        if not piece:
+            continue
+        size = length(piece)
+        if size <= chunk_size:
+            fitting.append((piece, size))
+            continue
+        if fitting:
+            _merge(fitting, separator, chunk_size, chunk_overlap, length, out)
+            fitting = []
+        if finer:
+            _split(piece, finer, chunk_size, chunk_overlap, length, out)
+        else:
+            out.append(piece)
+    if fitting:
+        _merge(fitting, separator, chunk_size, chunk_overlap, length, out)
+
+
+def split_text(
+    text: str,
+    chunk_size: float = CHUNK_SIZE_TOKENS,
+    chunk_overlap: float = CHUNK_OVERLAP_TOKENS,
+    length: Callable[[str], float] = estimated_tokens,
+    separators: tuple = SEPARATORS,
+) -> list[str]:
+    """
+    Recursive splitting: cut at the coarsest separator present, recurse into
+    pieces still longer than chunk_size with the next one, then merge
+    neighbouring pieces back up to chunk_size. Each character is visited
+    once per separator level, so the cost is linear in the text.
+    """
+    chunks: list[str] = []
+    _split(text, separators, chunk_size, chunk_overlap, length, chunks)
+    return chunks
+
+
+def iter_recursive_chunks(
+    segments: Iterable[str],
+    chunk_size: float = CHUNK_SIZE_TOKENS,
+    chunk_overlap: float = CHUNK_OVERLAP_TOKENS,
+    length: Callable[[str], float] = estimated_tokens,
+) -> Iterator[Chunk]:
+    """
+    Split a stream of segments without materializing the whole text.
+    Segments are buffered up to SPLIT_WINDOW_CHUNKS chunks' worth and split;
+    every chunk but the last is emitted, and the last is carried into the
+    next window so boundaries match splitting the joined text.
+    """
+    window = chunk_size * SPLIT_WINDOW_CHUNKS
+    newline = length("\n")
+    parts: list[str] = []
+    buffered = 0.0
+    for segment in segments:
+        parts.append(segment)
+        buffered += length(segment) + newline
+        if buffered >= window:
+            chunks = split_text("\n".join(parts), chunk_size, chunk_overlap, length)
+            for text in chunks[:-1]:
+                yield Chunk(text, {})
+            parts = chunks[-1:]
+            buffered = sum(length(p) for p in parts)
+    if parts:
+        for text in split_text("\n".join(parts).strip(), chunk_size, chunk_overlap, length):
+            yield Chunk(text, {})
+
+
+class _ChunkBuilder:
+    """The blocks of the chunk being filled, with their token total and page span."""
+
+    def __init__(self, length: Callable[[str], float], section: Optional[str] = None):
+        self.length = length
+        self.separator_length = length("\n\n")
+        self.section = section
+        self.parts: list[str] = []
+        self.headings: list[Block] = []  # headings not yet followed by any content
+        self.tokens = 0.0
+        self.first_page: Optional[int] = None
+        self.last_page: Optional[int] = None
+
+    @property
+    def has_body(self) -> bool:
+        return len(self.parts) > len(self.headings)
+
+    def cost(self, tokens: float) -> float:
+        return self.tokens + tokens + (self.separator_length if self.parts else 0.0)
+
+    def add(self, text: str, tokens: float, page: Optional[int]):
+        self.tokens = self.cost(tokens)
+        self.parts.append(text)
+        if page is not None:
+            self.first_page = page if self.first_page is None else self.first_page
+            self.last_page = page
+
+    def add_heading(self, heading: Block):
+        self.add(heading.text, self.length(heading.text), heading.page)
+        self.headings.append(heading)
+
+    def build(self) -> Chunk:
+        metadata = {}
+        if self.section:
+            metadata["section"] = self.section
+        if self.first_page is not None:
+            metadata["page_start"] = self.first_page
+            metadata["page_end"] = self.last_page
+        return Chunk("\n\n".join(self.parts), metadata)
+
+
+def _split_table(text: str, chunk_size: float, length: Callable[[str], float]) -> list[str]:
+    """Split a table between rows, repeating its header row (and any divider) at the top of every piece."""
+    rows = text.split("\n")
+    header = rows[:2] if len(rows) > 1 and TABLE_DIVIDER_PATTERN.match(rows[1]) else rows[:1]
+    header_text = "\n".join(header)
+    header_tokens = length(header_text)
+    newline = length("\n")
+    pieces: list[str] = []
+    current: list[str] = []
+    tokens = header_tokens
+    for row in rows[len(header):]:
+        size = length(row) + newline
+        if current and tokens + size > chunk_size:
+            pieces.append("\n".join([header_text] + current))
+            current, tokens = [], header_tokens
+        if header_tokens + size > chunk_size:
+            # A row too long to share a chunk with the header is split like prose
+            pieces.extend(split_text(row, chunk_size, 0, length))
+            continue
+        current.append(row)
+        tokens += size
+    if current or not pieces:
+        pieces.append("\n".join([header_text] + current))
+    return pieces
+
+
+def iter_structured_chunks(
+    blocks: Iterable[Block],
+    chunk_size: float = CHUNK_SIZE_TOKENS,
+    chunk_overlap: float = CHUNK_OVERLAP_TOKENS,
+    length: Callable[[str], float] = estimated_tokens,
+) -> Iterator[Chunk]:
+    """
+    Pack whole blocks into chunks of at most chunk_size tokens. A heading
+    always starts a new chunk and stays with the content after it, and each
+    chunk records the heading path it falls under and the pages it spans;
+    headings with no room left for content go out as a chunk of their own.
+    A paragraph too long for one chunk is split at sentences with
+    chunk_overlap, and a long table between rows with its header repeated;
+    whole blocks are never overlapped, so an edit only changes the chunks
+    around it.
+    """
+    path: list[tuple[int, str]] = []
+    current = _ChunkBuilder(length)
+    for block in blocks:
+        if block.kind == "heading":
+            path = [entry for entry in path if entry[0] < block.level] + [(block.level, block.text)]
+            section = " > ".join(text for _, text in path)
+            if current.has_body:
+                yield current.build()
+                pending = []
+            else:
+                # Consecutive headings stay together, minus any this one closes
+                pending = [heading for heading in current.headings if heading.level < block.level]
+            current = _ChunkBuilder(length, section)
+            for heading in pending + [block]:
+                tokens = length(heading.text)
+                if current.parts and current.cost(tokens) > chunk_size:
+                    # Headings that no longer fit together go out on their own rather than overfill the chunk
+                    yield current.build()
+                    current = _ChunkBuilder(length, section)
+                if tokens > chunk_size:
+                    # A heading too long for any chunk is split like prose, its last piece kept with the content
+                    *pieces, last = split_text(heading.text, chunk_size, 0, length)
+                    for piece in pieces:
+                        current.add(piece, length(piece), heading.page)
+                        yield current.build()
+                        current = _ChunkBuilder(length, section)
+                    heading = heading._replace(text=last)
+                current.add_heading(heading)
+            continue
+
+        tokens = length(block.text)
+        if current.cost(tokens) <= chunk_size:
+            current.add(block.text, tokens, block.page)
+            continue
+        if current.has_body:
+            yield current.build()
+            current = _ChunkBuilder(length, current.section)
+            if tokens <= chunk_size:
+                current.add(block.text, tokens, block.page)
+                continue
+
+        # Too long for a chunk of its own: split it, the first piece sharing a chunk with any pending headings
+        budget = chunk_size - (current.tokens + current.separator_length if current.parts else 0.0)
+        if budget < chunk_size / 2:
+            if current.parts:
+                # Too little room beside the pending headings: they go out on their own
+                yield current.build()
+            current = _ChunkBuilder(length, current.section)
+            budget = chunk_size
+        if block.kind == "table":
+            pieces = _split_table(block.text, budget, length)
+        else:
+            pieces = split_text(block.text, budget, chunk_overlap, length, PARAGRAPH_SEPARATORS)
+        for i, piece in enumerate(pieces):
+            if i:
+                yield current.build()
+                current = _ChunkBuilder(length, current.section)
+            current.add(piece, length(piece), block.page)
+    if current.parts:
+        yield current.build()
+
+
+def iter_chunks(
+    segments: Iterable[str],
+    strategy: Optional[str] = None,
+    unit: str = "line",
+    chunk_size: float = CHUNK_SIZE_TOKENS,
+    chunk_overlap: float = CHUNK_OVERLAP_TOKENS,
+    length: Callable[[str], float] = estimated_tokens,
+) -> Iterator[Chunk]:
+    """
+    Chunk extracted segments with strategy (CHUNK_STRATEGY by default).
+    "structured" keeps headings, paragraphs and tables whole where they fit
+    and records section and pages; "recursive" splits the running text at
+    the coarsest separator that fits, ignoring structure. Sizes are in
+    tokens as measured by length.
+    """
+    strategy = strategy or CHUNK_STRATEGY
+    if strategy not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}; expected one of {', '.join(CHUNK_STRATEGIES)}.")
+    if unit not in SEGMENT_UNITS:
+        raise ValueError(f"Unknown segment unit {unit!r}; expected one of {', '.join(SEGMENT_UNITS)}.")
+    if strategy == "structured":
+        return iter_structured_chunks(iter_blocks(segments, unit), chunk_size, chunk_overlap, length)
+    return iter_recursive_chunks(segments, chunk_size, chunk_overlap, length)
+
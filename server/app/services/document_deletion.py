@@ -0,0 +1,132 @@
+# server/app/services/document_deletion.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import DOCUMENT_DELETE_ASYNC_MIN_CHUNKS, DOCUMENT_DELETE_WORKERS
+from ..database import SessionLocal, session_scope
+from ..models import Document, DocumentChunk, IngestionJob
+from .answer_cache import bump_documents_version
+from .bm25_index import keyword_index
+from .pinecone_client import DELETE_BATCH_SIZE, delete_document_vectors, delete_vectors, user_namespace
+from .s3_client import delete_document_from_s3
+
+logger = logging.getLogger(__name__)
+
+
+def purge_document(db: Session, document: Document):
+    """
+    Remove a document from every store: its vectors by manifest id, one
+    delete request per DELETE_BATCH_SIZE ids, its keyword index entries,
+    its S3 object, then its manifest and row with set-based deletes.
+    External stores go first and each step is idempotent, so a purge that
+    fails part way leaves the row behind to be deleted again.
+    """
+    user_id, document_id = document.user_id, document.id
+    namespace = user_namespace(user_id)
+
+    manifest = (
+        db.query(DocumentChunk.vector_id)
+        .filter_by(document_id=document_id)
+        .order_by(DocumentChunk.id)
+        .yield_per(DELETE_BATCH_SIZE)
+    )
+    batch, any_ids = [], False
+    for (vector_id,) in manifest:
+        batch.append(vector_id)
+        if len(batch) >= DELETE_BATCH_SIZE:
+            delete_vectors(str(user_id), batch)
+            batch, any_ids = [], True
+    if batch:
+        delete_vectors(str(user_id), batch)
+        any_ids = True
+    if not any_ids:
+        # Indexed before manifests existed, so its vector ids are unknown and it is deleted by
+        # metadata; on serverless Pinecone this raises and the document is left in place
+        delete_document_vectors(user_id, document_id, document.filename)
+    keyword_index.delete(namespace, filter={"document_id": document_id})
+
+    delete_document_from_s3(document.file_path)
+
+    db.query(IngestionJob).filter_by(document_id=document_id).update(
+        {"document_id": None}, synchronize_session=False
+    )
+    db.query(DocumentChunk).filter_by(document_id=document_id).delete(synchronize_session=False)
+    db.query(Document).filter_by(id=document_id).delete(synchronize_session=False)
+    # Cached answers may cite the deleted chunks
+    bump_documents_version(db, user_id)
+    db.commit()
+
+
+class DocumentDeleter:
+    """
+    Deletes documents, purging small ones in the request and handing
+    documents with at least async_min_chunks chunks to a worker pool so
+    the request returns at once. A document being purged in the background
+    is marked with deleting_at; marked documents are skipped by re-uploads
+    and resumed on the next start if the process stops first.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        max_workers: int = DOCUMENT_DELETE_WORKERS,
+        async_min_chunks: int = DOCUMENT_DELETE_ASYNC_MIN_CHUNKS,
+    ):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.async_min_chunks = async_min_chunks
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="document-delete")
+        return self._executor
+
+    def delete(self, db: Session, document: Document) -> bool:
+        """Delete document; True if it is already gone, False if it is being purged in the background."""
+        if document.deleting_at is None:
+            num_chunks = db.query(DocumentChunk).filter_by(document_id=document.id).count()
+            if num_chunks < self.async_min_chunks:
+                purge_document(db, document)
+                return True
+            document.deleting_at = datetime.utcnow()
+            db.commit()
+            self.submit(document.id)
+        return False
+
+    def submit(self, document_id: int):
+        self._get_executor().submit(self._run, document_id)
+
+    def _run(self, document_id: int):
+        with session_scope(self.session_factory) as db:
+            document = db.get(Document, document_id)
+            if document is None:
+                return
+            try:
+                purge_document(db, document)
+            except Exception as e:
+                # Left marked, so the next start tries again
+                logger.exception(f"Deleting document {document_id} failed: {e}")
+
+    def start(self):
+        """Resume purges that were still running when the process stopped."""
+        with session_scope(self.session_factory) as db:
+            document_ids = [
+                document_id for (document_id,) in db.query(Document.id).filter(Document.deleting_at.isnot(None))
+            ]
+        for document_id in document_ids:
+            self.submit(document_id)
+        if document_ids:
+            logger.info(f"Resumed deleting {len(document_ids)} document(s)")
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+document_deleter = DocumentDeleter(SessionLocal)
@@ -1,86 +1,340 @@
 # server/app/services/document_processor.py
-import os
-import tempfile
+import hashlib
+import io
+import json
+import logging
 import pdfplumber
 import docx
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from docx.table import Table
 from .embedder import get_embeddings
-from .pinecone_client import upsert_documents
-from .s3_client import upload_document_to_s3
-from ..database import SessionLocal
-from ..models import Document
+from .pinecone_client import (
+    upsert_documents,
+    user_namespace,
+    delete_vectors,
+    chunk_vector_ids,
+)
+from .bm25_index import keyword_index
+from .chunker import CHUNK_STRATEGIES, Chunk, iter_chunks
+from .answer_cache import bump_documents_version
+from .document_deletion import purge_document
+from .metrics import TimedIterator, stage
+from .s3_client import upload_document_to_s3, delete_document_from_s3
+from .pdf_parallel import iter_pdf_pages_parallel
+from ..config import CHUNK_STRATEGY, INGESTION_CHUNK_BATCH, PDF_PARALLEL_MIN_PAGES
+from ..database import session_scope
+from ..models import Document, DocumentChunk
 import mimetypes
+from typing import Callable, Iterable, Iterator, Optional
 from sqlalchemy.orm import Session
 
+logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(file_bytes)
-        tmp.flush()
-        with pdfplumber.open(tmp.name) as pdf:
-            text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-        os.remove(tmp.name)
-        return text.strip()
+# What each extracted segment is, so the chunker knows where pages and paragraphs end
+SEGMENT_UNITS = {".pdf": "page", ".docx": "paragraph", ".txt": "line"}
 
 
-def extract_text_from_docx(file_bytes: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-        tmp.write(file_bytes)
-        tmp.flush()
-        doc = docx.Document(tmp.name)
-        text = "\n".join(para.text for para in doc.paragraphs)
-        os.remove(tmp.name)
-        return text.strip()
+def iter_pdf_pages(
+    file_bytes: bytes,
+    on_progress: Optional[Callable[[float], None]] = None,
+    parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+) -> Iterator[str]:
+    """
+    Yield each page's text, releasing the page's parsed objects before moving
+    on. PDFs with at least parallel_min_pages pages are parsed across worker
+    processes instead; pages still come out in order.
+    """
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        total = len(pdf.pages)
+        if not parallel_min_pages or total < parallel_min_pages:
+            for i, page in enumerate(pdf.pages):
+                yield page.extract_text() or ""
+                page.close()
+                if on_progress:
+                    on_progress((i + 1) / total)
+            return
+    yield from iter_pdf_pages_parallel(file_bytes, total, on_progress)
 
 
-def extract_text(file_bytes: bytes, filename: str) -> str:
+def _docx_text(item) -> str:
+    """A body paragraph as text, with heading styles as "#" headings, or a table as "|" rows."""
+    if isinstance(item, Table):
+        return "\n".join(
+            "| " + " | ".join(" ".join(cell.text.split()) for cell in row.cells) + " |" for row in item.rows
+        )
+    style = item.style.name if item.style is not None else ""
+    level = 1 if style == "Title" else int(style[8:]) if style.startswith("Heading ") and style[8:].isdigit() else 0
+    if level and item.text.strip():
+        return "#" * min(level, 6) + " " + item.text
+    return item.text
+
+
+def iter_docx_paragraphs(file_bytes: bytes, on_progress: Optional[Callable[[float], None]] = None) -> Iterator[str]:
+    """Yield body paragraphs and tables in document order, keeping headings and table rows recognizable."""
+    doc = docx.Document(io.BytesIO(file_bytes))
+    content = list(doc.iter_inner_content())
+    for i, item in enumerate(content):
+        yield _docx_text(item)
+        if on_progress:
+            on_progress((i + 1) / len(content))
+
+
+def iter_txt_lines(file_bytes: bytes, on_progress: Optional[Callable[[float], None]] = None) -> Iterator[str]:
+    stream = io.TextIOWrapper(io.BytesIO(file_bytes), encoding="utf-8", errors="replace")
+    for line in stream:
+        yield line.rstrip("\n")
+        if on_progress:
+            on_progress(stream.buffer.tell() / max(len(file_bytes), 1))
+
+
+def iter_text_segments(
+    file_bytes: bytes, filename: str, on_progress: Optional[Callable[[float], None]] = None
+) -> Iterator[str]:
     if filename.endswith(".pdf"):
-        return extract_text_from_pdf(file_bytes)
+        return iter_pdf_pages(file_bytes, on_progress)
     elif filename.endswith(".docx"):
-        return extract_text_from_docx(file_bytes)
+        return iter_docx_paragraphs(file_bytes, on_progress)
+    elif filename.endswith(".txt"):
+        return iter_txt_lines(file_bytes, on_progress)
     else:
-        raise ValueError("Unsupported file format. Only PDF and DOCX are supported.")
+        raise ValueError("Unsupported file format. Only PDF, DOCX and TXT are supported.")
+
 
+def extract_text_from_pdf(file_bytes: bytes) -> str:
+    return "\n".join(iter_pdf_pages(file_bytes)).strip()
 
-def process_and_store_document(user_id: str, filename: str, file_bytes: bytes, db: Session):
-    # 1. Extract text
-    text = extract_text(file_bytes, filename)
-    if not text:
-        raise ValueError("No extractable text found.")
 
-    # 2. Chunk text
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = splitter.split_text(text)
+def extract_text_from_docx(file_bytes: bytes) -> str:
+    return "\n".join(iter_docx_paragraphs(file_bytes)).strip()
 
-    # 3. Embed text
-    embeddings = get_embeddings(chunks)
 
-    # 4. Upload embeddings to Pinecone
-    metadata = {"filename": filename, "user_id": user_id}
-    pinecone_namespace = upsert_documents(str(user_id), chunks, embeddings, metadata)
+def extract_text(file_bytes: bytes, filename: str) -> str:
+    return "\n".join(iter_text_segments(file_bytes, filename)).strip()
 
-    # 5. Upload to S3
-    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
-    file_path = upload_document_to_s3(user_id, filename, file_bytes, content_type)
-
-    # 6. Save metadata to DB
-    db = SessionLocal()
-    document = Document(
-        user_id=user_id,
-        filename=filename,
-        file_path=file_path,
-        file_size=len(file_bytes),
-        content_type=content_type,
-        pinecone_namespace=pinecone_namespace
+
+def iter_batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def process_and_store_document(
+    user_id: str,
+    filename: str,
+    file_bytes: bytes,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+    chunk_strategy: Optional[str] = None,
+):
+    """
+    Ingest a document as a pipeline: pages or paragraphs are extracted one at
+    a time, chunked, and embedded and upserted in batches of
+    INGESTION_CHUNK_BATCH, so memory stays bounded by the batch rather than
+    the document.
+
+    Uploading a filename the user already has re-ingests that document
+    incrementally. Chunk ids hash the chunk content, so only chunks missing
+    from the stored manifest are embedded and upserted, and chunks no longer
+    present are deleted; identical bytes are skipped outright. Unchanged
+    vectors keep the chunk_index they were first stored with.
+
+    chunk_strategy picks the chunker (CHUNK_STRATEGY by default); a
+    re-upload with a different strategy re-chunks even identical bytes.
+
+    On failure, the vectors and S3 object this run added are removed and the
+    database changes are rolled back, leaving any previous version intact;
+    chunks the new version dropped are only deleted once it is committed.
+    """
+    def report(stage: str, progress: float):
+        if progress_callback:
+            progress_callback(stage, progress)
+
+    # Fraction of pages/paragraphs read so far, updated as extraction streams
+    extracted = [0.0]
+
+    def on_extract(fraction: float):
+        extracted[0] = fraction
+
+    # Raises on unsupported formats and strategies before anything is written
+    segments = iter_text_segments(file_bytes, filename, on_progress=on_extract)
+    strategy = chunk_strategy or CHUNK_STRATEGY
+    if strategy not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}; expected one of {', '.join(CHUNK_STRATEGIES)}.")
+    unit = SEGMENT_UNITS[filename[filename.rindex("."):]]
+    content_hash = hashlib.sha256(file_bytes).hexdigest()
+
+    # Document writes use their own session: progress callbacks commit the
+    # caller's session, which must never commit a half-indexed document
+    with session_scope() as document_db:
+        return _ingest(
+            user_id, filename, file_bytes, segments, extracted, content_hash, strategy, unit, document_db, report
+        )
+
+
+def _chunk_key(chunk: Chunk) -> str:
+    # Chunk ids hash this, so a chunk whose section or pages moved is re-indexed with its new metadata
+    if not chunk.metadata:
+        return chunk.text
+    return f"{chunk.text}\0{json.dumps(chunk.metadata, sort_keys=True)}"
+
+
+def _ingest(user_id, filename, file_bytes, segments, extracted, content_hash, strategy, unit, db: Session, report) -> dict:
+    document = (
+        db.query(Document)
+        .filter_by(user_id=user_id, filename=filename, deleting_at=None)
+        .order_by(Document.id.desc())
+        .first()
     )
-    db.add(document)
-    db.commit()
+    if document is not None and document.content_hash == content_hash and document.chunk_strategy == strategy:
+        num_chunks = db.query(DocumentChunk).filter_by(document_id=document.id).count()
+        return {
+            "filename": filename,
+            "num_chunks": num_chunks,
+            "s3_key": document.file_path,
+            "document_id": document.id,
+            "added": 0,
+            "removed": 0,
+        }
+
+    # 1. Upload to S3
+    report("uploading", 0.0)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    with stage("ingestion", "s3"):
+        file_path = upload_document_to_s3(user_id, filename, file_bytes, content_type)
+
+    # 2. Save metadata to DB; flushed first so vectors can carry the document id
+    report("saving", 0.05)
+    previous_path = None
+    legacy_document = None
+    stored_ids: set[str] = set()
+    if document is not None:
+        stored_ids = {
+            vector_id for (vector_id,) in db.query(DocumentChunk.vector_id).filter_by(document_id=document.id)
+        }
+        if not stored_ids:
+            # Indexed before manifests existed: its ids can't be diffed, so the new version is
+            # indexed as a new document and the old one purged once that is committed
+            legacy_document, document = document, None
+    if document is None:
+        document = Document(
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            file_size=len(file_bytes),
+            content_type=content_type,
+            pinecone_namespace=user_namespace(user_id),
+            content_hash=content_hash,
+            chunk_strategy=strategy,
+        )
+        db.add(document)
+        db.flush()
+    else:
+        previous_path = document.file_path
+        document.file_path = file_path
+        document.file_size = len(file_bytes)
+        document.content_type = content_type
+        document.content_hash = content_hash
+        document.chunk_strategy = strategy
+
+    # 3. Extract, chunk, embed and index batch by batch, skipping chunks already stored
+    report("indexing", 0.1)
+    metadata = {"filename": filename, "user_id": user_id, "document_id": document.id}
+    namespace = user_namespace(user_id)
+    manifest = []
+    added_ids = []
+    occurrences: dict[str, int] = {}
+    # Extraction and chunking are lazy, so each is timed across the steps that pull from it
+    extract = TimedIterator(segments, "ingestion", "extract")
+    chunks = TimedIterator(iter_chunks(extract, strategy, unit), "ingestion", "chunk", exclude=extract)
+    try:
+        for batch in iter_batches(chunks, INGESTION_CHUNK_BATCH):
+            chunk_ids = chunk_vector_ids(document.id, [_chunk_key(chunk) for chunk in batch], occurrences)
+            first_index = len(manifest)
+            manifest.extend(
+                {"document_id": document.id, "vector_id": chunk_id, "chunk_index": first_index + i}
+                for i, chunk_id in enumerate(chunk_ids)
+            )
+            new = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in stored_ids]
+            if new:
+                new_chunks = [batch[i].text for i in new]
+                new_metadata = [batch[i].metadata for i in new]
+                new_ids = [chunk_ids[i] for i in new]
+                new_indexes = [first_index + i for i in new]
+                with stage("ingestion", "embed"):
+                    embeddings = get_embeddings(new_chunks)
+                added_ids.extend(new_ids)
+                with stage("ingestion", "upsert"):
+                    upsert_documents(
+                        str(user_id), new_chunks, embeddings, metadata,
+                        ids=new_ids, chunk_indexes=new_indexes, chunk_metadata=new_metadata,
+                    )
+                    keyword_index.add(
+                        namespace,
+                        new_ids,
+                        [
+                            {**metadata, **extra, "chunk_index": index, "text": chunk}
+                            for index, chunk, extra in zip(new_indexes, new_chunks, new_metadata)
+                        ],
+                    )
+            report("indexing", 0.1 + 0.85 * extracted[0])
+
+        if not manifest:
+            raise ValueError("No extractable text found.")
+
+        removed_ids = list(stored_ids - {row["vector_id"] for row in manifest})
+
+        report("finalizing", 0.95)
+        with stage("ingestion", "db"):
+            db.query(DocumentChunk).filter_by(document_id=document.id).delete(synchronize_session=False)
+            db.bulk_insert_mappings(DocumentChunk, manifest)
+            # Cached answers may cite chunks that just changed
+            bump_documents_version(db, user_id)
+            db.commit()
+    except Exception:
+        _discard_partial_document(user_id, document.id, added_ids, file_path)
+        raise
+
     db.refresh(document)
-    db.close()
+    # The previous version is only removed now, so a failed run never loses it
+    if removed_ids:
+        try:
+            delete_vectors(str(user_id), removed_ids)
+            keyword_index.delete(namespace, ids=removed_ids)
+        except Exception as e:
+            logger.warning(f"Failed to delete {len(removed_ids)} replaced chunks of document {document.id}: {e}")
+    if legacy_document is not None:
+        try:
+            purge_document(db, legacy_document)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to purge document {legacy_document.id}, replaced by {document.id}: {e}")
+    if previous_path and previous_path != file_path:
+        try:
+            delete_document_from_s3(previous_path)
+        except Exception as e:
+            logger.warning(f"Failed to delete previous upload {previous_path}: {e}")
 
     return {
         "filename": filename,
-        "num_chunks": len(chunks),
+        "num_chunks": len(manifest),
         "s3_key": file_path,
-        "document_id": document.id
+        "document_id": document.id,
+        "added": len(added_ids),
+        "removed": len(removed_ids),
     }
+
+
+def _discard_partial_document(user_id, document_id: int, vector_ids: list[str], file_path: str):
+    """Best-effort removal of what a failed ingestion already wrote."""
+    for cleanup in (
+        lambda: delete_vectors(str(user_id), vector_ids),
+        lambda: keyword_index.delete(user_namespace(user_id), ids=vector_ids),
+        lambda: delete_document_from_s3(file_path),
+    ):
+        try:
+            cleanup()
+        except Exception as e:
+            logger.warning(f"Cleanup after failed ingestion of document {document_id} failed: {e}")
@@ -1,10 +1,136 @@
 # server/app/services/embedder.py
-import os
-import json
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-from .bedrock_client import call_embedding_model
+from .bedrock_client import call_embedding_model, BedrockThrottlingError
+from .bedrock_async import async_call_embedding_model
+from .embedding_cache import embedding_cache
+from ..config import (
+    EMBEDDING_MAX_WORKERS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_RETRY_BASE_DELAY,
+    EMBEDDING_RETRY_MAX_DELAY,
+)
 
-def get_embeddings(chunks: list[str]) -> list[list[float]]:
-    return [call_embedding_model(chunk) for chunk in chunks]
+logger = logging.getLogger(__name__)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(EMBEDDING_RETRY_MAX_DELAY, EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def embed_with_retry(text: str) -> list[float]:
+    """Embed a single text, retrying throttled calls with jittered backoff."""
+    attempt = 0
+    while True:
+        try:
+            return call_embedding_model(text)
+        except BedrockThrottlingError:
+            if attempt >= EMBEDDING_MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(f"Embedding throttled, retrying in {delay:.2f}s (attempt {attempt + 1}/{EMBEDDING_MAX_RETRIES})")
+            time.sleep(delay)
+            attempt += 1
+
+
+async def aembed_with_retry(text: str) -> list[float]:
+    """Async counterpart of embed_with_retry; backoff waits without blocking the event loop."""
+    attempt = 0
+    while True:
+        try:
+            return await async_call_embedding_model(text)
+        except BedrockThrottlingError:
+            if attempt >= EMBEDDING_MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(f"Embedding throttled, retrying in {delay:.2f}s (attempt {attempt + 1}/{EMBEDDING_MAX_RETRIES})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def _cache_call(fn, *args):
+    """Run an embedding cache call off the event loop when it may block on the SQLite tier."""
+    if embedding_cache.persistent:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+async def aget_query_embedding(text: str) -> list[float]:
+    """
+    Embed one query on the event loop, going through the embedding cache
+    like get_embeddings. The memory tier is checked inline; SQLite reads
+    and writes run in a worker thread.
+    """
+    if embedding_cache is not None:
+        cached = embedding_cache.get_from_memory(text)
+        if cached is None:
+            cached = (await _cache_call(embedding_cache.get_many, [text]))[0]
+        if cached is not None:
+            return cached
+    embedding = await aembed_with_retry(text)
+    if embedding_cache is not None:
+        await _cache_call(embedding_cache.put_many, [text], [embedding])
+    return embedding
+
+
+def get_embeddings(chunks: list[str], max_workers: Optional[int] = None) -> list[list[float]]:
+    """
+    Embed chunks, serving repeats from the embedding cache. Only cache
+    misses reach Bedrock, and identical texts within one call are
+    embedded once. Output order always matches input order.
+    """
+    if not chunks:
+        return []
+    if embedding_cache is None:
+        return _embed_all(chunks, max_workers)
+
+    embeddings = embedding_cache.get_many(chunks)
+    pending: dict[str, list[int]] = {}
+    for i, embedding in enumerate(embeddings):
+        if embedding is None:
+            pending.setdefault(embedding_cache.key(chunks[i]), []).append(i)
+    if not pending:
+        return embeddings
+
+    texts = [chunks[positions[0]] for positions in pending.values()]
+    fresh = _embed_all(texts, max_workers)
+    embedding_cache.put_many(texts, fresh)
+    for positions, embedding in zip(pending.values(), fresh):
+        for i in positions:
+            embeddings[i] = embedding
+    return embeddings
+
+
+def _embed_all(chunks: list[str], max_workers: Optional[int] = None) -> list[list[float]]:
+    """
+    Embed chunks over a bounded worker pool, one batch at a time.
+    Output order always matches input order. With a single worker the
+    chunks are embedded serially and the first failure stops the run.
+    """
+    if not chunks:
+        return []
+
+    workers = min(max_workers or EMBEDDING_MAX_WORKERS, len(chunks))
+    if workers <= 1:
+        return [embed_with_retry(chunk) for chunk in chunks]
+
+    embeddings = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedder") as executor:
+        for start in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+            batch = chunks[start:start + EMBEDDING_BATCH_SIZE]
+            batch_start = time.perf_counter()
+            # executor.map yields results in submission order
+            embeddings.extend(executor.map(embed_with_retry, batch))
+            elapsed = time.perf_counter() - batch_start
+            logger.info(
+                f"Embedded batch {start // EMBEDDING_BATCH_SIZE + 1} "
+                f"({len(batch)} chunks) in {elapsed:.3f}s with {workers} workers"
+            )
+    return embeddings
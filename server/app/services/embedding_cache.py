@@ -0,0 +1,239 @@
+# server/app/services/embedding_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import (
+    BEDROCK_MODEL_EMBEDDING,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_DISK_MAX_BYTES,
+)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode and collapse whitespace so trivially different chunks share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _pack(embedding: list[float]) -> bytes:
+    # Vectors are kept as float32, the precision the vector store uses anyway
+    return array("f", embedding).tobytes()
+
+
+def _unpack(blob: bytes) -> list[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache with an in-memory LRU tier and an
+    optional SQLite tier that survives restarts. Keys are the SHA-256 of
+    (model id, normalized text).
+
+    The SQLite tier's size is kept as a running total, summed once at open
+    and updated on every insert and eviction, so writes never scan the
+    table. Workers sharing the file do not see each other's writes in the
+    total, so it is re-summed every RESYNC_WRITES writes and before trimming.
+    """
+
+    RESYNC_WRITES = 1000
+
+    def __init__(
+        self,
+        model_id: str,
+        max_bytes: int,
+        sqlite_path: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ):
+        self.model_id = model_id
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        self._conn = None
+        self._disk_bytes = 0
+        if sqlite_path:
+            self._conn = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+            self._conn.commit()
+            self._disk_bytes = self._sum_disk_bytes()
+        self._disk_writes = 0
+
+    @property
+    def persistent(self) -> bool:
+        """True when lookups and writes may touch the SQLite tier."""
+        return self._conn is not None
+
+    def get_from_memory(self, text: str) -> Optional[list[float]]:
+        """
+        Memory-tier lookup that never touches SQLite, cheap enough to run on
+        an event loop. A hit is counted; a miss is not, since the caller goes
+        on to get_many, which counts it.
+        """
+        key = self.key(text)
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is None:
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+        return _unpack(blob)
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_id}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _remember(self, key: str, blob: bytes):
+        """Insert into the memory tier, evicting least recently used entries past the byte limit."""
+        if len(blob) > self.max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def get_many(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Look up each text; returns the cached embedding or None per position."""
+        keys = [self.key(text) for text in texts]
+        results: list[Optional[list[float]]] = [None] * len(texts)
+        with self._lock:
+            missing = {}
+            for i, key in enumerate(keys):
+                blob = self._memory.get(key)
+                if blob is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = _unpack(blob)
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            if missing and self._conn is not None:
+                found = dict(self._select(list(missing), "vector"))
+                if found:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+                    self._conn.commit()
+                for key, blob in found.items():
+                    self._remember(key, blob)
+                    for i in missing.pop(key):
+                        results[i] = _unpack(blob)
+                        self.disk_hits += 1
+
+            misses = sum(len(positions) for positions in missing.values())
+            self.misses += misses
+            self.hits += len(texts) - misses
+        return results
+
+    def _select(self, keys: list[str], column: str) -> list[tuple]:
+        rows = []
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows.extend(self._conn.execute(f"SELECT key, {column} FROM embeddings WHERE key IN ({placeholders})", part))
+        return rows
+
+    def _sum_disk_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def put_many(self, texts: list[str], embeddings: list[list[float]]):
+        entries = {self.key(text): _pack(embedding) for text, embedding in zip(texts, embeddings)}
+        with self._lock:
+            for key, blob in entries.items():
+                self._remember(key, blob)
+            if self._conn is not None:
+                now = time.time()
+                # Replaced rows only add the difference in size; a primary key lookup, not a scan
+                replaced = dict(self._select(list(entries), "LENGTH(vector)"))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                    [(key, blob, now) for key, blob in entries.items()],
+                )
+                self._disk_bytes += sum(len(blob) - replaced.get(key, 0) for key, blob in entries.items())
+                self._disk_writes += 1
+                if self._disk_writes % self.RESYNC_WRITES == 0:
+                    self._disk_bytes = self._sum_disk_bytes()
+                self._trim_disk()
+                self._conn.commit()
+
+    def _trim_disk(self):
+        """Drop least recently used rows until the SQLite tier fits its byte limit."""
+        if not self.disk_max_bytes or self._disk_bytes <= self.disk_max_bytes:
+            return
+        # Other workers may have trimmed already; only the real total decides
+        self._disk_bytes = self._sum_disk_bytes()
+        if self._disk_bytes <= self.disk_max_bytes:
+            return
+        excess = self._disk_bytes - self.disk_max_bytes
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+        self._disk_bytes -= freed
+        self.evictions += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+embedding_cache = (
+    EmbeddingCache(
+        model_id=BEDROCK_MODEL_EMBEDDING,
+        max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+        sqlite_path=EMBEDDING_CACHE_PATH or None,
+        disk_max_bytes=EMBEDDING_CACHE_DISK_MAX_BYTES,
+    )
+    if EMBEDDING_CACHE_ENABLED
+    else None
+)
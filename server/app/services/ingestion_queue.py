@@ -0,0 +1,233 @@
+# server/app/services/ingestion_queue.py
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import (
+    INGESTION_LEASE_SECONDS,
+    INGESTION_MAX_WORKERS,
+    INGESTION_SPOOL_DIR,
+    INGESTION_STALE_AFTER_SECONDS,
+)
+from ..database import SessionLocal, session_scope
+from ..models import IngestionJob
+from .metrics import trace
+
+logger = logging.getLogger(__name__)
+
+
+def _process_document(user_id, filename, file_bytes, progress_callback=None, chunk_strategy=None):
+    # Imported lazily so the queue can be constructed without the vector store client
+    from .document_processor import process_and_store_document
+    return process_and_store_document(
+        user_id, filename, file_bytes, progress_callback=progress_callback, chunk_strategy=chunk_strategy
+    )
+
+
+class IngestionQueue:
+    """
+    Runs document ingestion on a local worker pool. Jobs are persisted in
+    the ingestion_jobs table and their upload bytes are spooled to disk, so
+    queued work (and work orphaned by a crashed worker) is picked up again
+    on the next start.
+
+    A running job is leased to the queue that claimed it, and a heartbeat
+    thread renews the leases of all its jobs every third of the lease, however
+    long a single ingestion step takes. Only jobs whose lease has run out
+    are recovered, so a job another worker is still running is never
+    started twice.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        handler: Callable = _process_document,
+        max_workers: int = INGESTION_MAX_WORKERS,
+        spool_dir: str = INGESTION_SPOOL_DIR,
+        lease: timedelta = timedelta(seconds=INGESTION_LEASE_SECONDS),
+        stale_after: timedelta = timedelta(seconds=INGESTION_STALE_AFTER_SECONDS),
+    ):
+        self.session_factory = session_factory
+        self.handler = handler
+        self.max_workers = max_workers
+        self.spool_dir = spool_dir
+        self.lease = lease
+        # Only for running jobs recorded before leases, which have none
+        self.stale_after = stale_after
+        self.worker_id = str(uuid4())
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingestion")
+            self._stopping.clear()
+            self._heartbeat = threading.Thread(target=self._renew_leases, name="ingestion-heartbeat", daemon=True)
+            self._heartbeat.start()
+        return self._executor
+
+    def _renew_leases(self):
+        while not self._stopping.wait(self.lease.total_seconds() / 3):
+            try:
+                with session_scope(self.session_factory) as db:
+                    db.query(IngestionJob).filter(
+                        IngestionJob.lease_owner == self.worker_id, IngestionJob.status == "running"
+                    ).update({"lease_expires_at": datetime.utcnow() + self.lease}, synchronize_session=False)
+                    db.commit()
+            except Exception as e:
+                logger.warning(f"Failed to renew ingestion leases: {e}")
+
+    def start(self):
+        """Resubmit queued jobs and running jobs whose lease has expired."""
+        with session_scope(self.session_factory) as db:
+            now = datetime.utcnow()
+            # One conditional UPDATE, so a lease renewed meanwhile keeps its job
+            recovered = db.query(IngestionJob).filter(
+                IngestionJob.status == "running",
+                or_(
+                    IngestionJob.lease_expires_at < now,
+                    and_(IngestionJob.lease_expires_at.is_(None), IngestionJob.updated_at < now - self.stale_after),
+                ),
+            ).update(
+                {"status": "queued", "stage": "queued", "lease_owner": None, "lease_expires_at": None},
+                synchronize_session=False,
+            )
+            db.commit()
+            job_ids = [job_id for (job_id,) in db.query(IngestionJob.id).filter_by(status="queued")]
+
+        for job_id in job_ids:
+            self.submit(job_id)
+        if recovered:
+            logger.info(f"Recovered {recovered} ingestion job(s) whose worker stopped")
+
+    def enqueue(self, user_id: int, filename: str, file_bytes: bytes, chunk_strategy: Optional[str] = None) -> int:
+        """Spool the upload, record a queued job and hand it to the pool. Returns the job id."""
+        return self.enqueue_many(user_id, [(filename, file_bytes)], chunk_strategy=chunk_strategy)[0]
+
+    def enqueue_many(
+        self,
+        user_id: int,
+        files: list[tuple[str, bytes]],
+        batch_id: Optional[str] = None,
+        chunk_strategy: Optional[str] = None,
+    ) -> list[int]:
+        """Spool several uploads and record their jobs in one transaction. Returns job ids in order."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        jobs = []
+        for filename, file_bytes in files:
+            spool_path = os.path.join(self.spool_dir, f"{uuid4()}-{os.path.basename(filename)}")
+            with open(spool_path, "wb") as f:
+                f.write(file_bytes)
+            jobs.append(IngestionJob(
+                user_id=user_id, filename=filename, spool_path=spool_path, batch_id=batch_id,
+                chunk_strategy=chunk_strategy,
+            ))
+
+        try:
+            with session_scope(self.session_factory) as db:
+                db.add_all(jobs)
+                db.commit()
+                job_ids = [job.id for job in jobs]
+        except Exception:
+            for job in jobs:
+                self._discard_spool(job.spool_path)
+            raise
+
+        for job_id in job_ids:
+            self.submit(job_id)
+        return job_ids
+
+    def submit(self, job_id: int):
+        self._get_executor().submit(self._run, job_id)
+
+    def _claim(self, db: Session, job_id: int) -> bool:
+        """Atomically move a job from queued to running, leased to this queue, so only one worker runs it."""
+        claimed = db.query(IngestionJob).filter(
+            IngestionJob.id == job_id, IngestionJob.status == "queued"
+        ).update(
+            {
+                "status": "running",
+                "stage": "starting",
+                "lease_owner": self.worker_id,
+                "lease_expires_at": datetime.utcnow() + self.lease,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        return claimed == 1
+
+    def _run(self, job_id: int):
+        with trace("ingestion_job", job_id=job_id), session_scope(self.session_factory) as db:
+            if not self._claim(db, job_id):
+                return
+            job = db.get(IngestionJob, job_id)
+
+            def report(stage: str, progress: float):
+                job.stage = stage
+                job.progress = progress
+                db.commit()
+
+            try:
+                with open(job.spool_path, "rb") as f:
+                    file_bytes = f.read()
+                # Only passed when requested, so handlers without the option keep working
+                options = {"chunk_strategy": job.chunk_strategy} if job.chunk_strategy else {}
+                result = self.handler(job.user_id, job.filename, file_bytes, progress_callback=report, **options)
+            except Exception as e:
+                logger.exception(f"Ingestion job {job_id} failed: {e}")
+                db.rollback()
+                job.status = "failed"
+                job.error = str(e)
+            else:
+                job.status = "completed"
+                job.stage = "completed"
+                job.progress = 1.0
+                job.document_id = result.get("document_id")
+                job.num_chunks = result.get("num_chunks")
+
+            self._discard_spool(job.spool_path)
+            job.spool_path = None
+            job.lease_owner = None
+            job.lease_expires_at = None
+            db.commit()
+
+    @staticmethod
+    def _discard_spool(path: Optional[str]):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+            # Without wait, running jobs lose their leases and are recovered by the next start
+            self._stopping.set()
+            self._heartbeat = None
+
+
+def job_to_dict(job: IngestionJob) -> dict:
+    return {
+        "id": job.id,
+        "batch_id": job.batch_id,
+        "filename": job.filename,
+        "chunk_strategy": job.chunk_strategy,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "error": job.error,
+        "document_id": job.document_id,
+        "num_chunks": job.num_chunks,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+ingestion_queue = IngestionQueue(SessionLocal)
@@ -0,0 +1,290 @@
+# server/app/services/metrics.py
+import bisect
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, Optional
+
+from ..config import TRACE_SLOW_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, from a cache hit to a slow model call or large ingestion stage
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    A Prometheus histogram with labels: cumulative bucket counts, sum and
+    count per label combination. Thread-safe; observe() is a lock and a
+    bisection, cheap enough for every stage of every request.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        # Only the first bucket the value falls in is counted; counts are made cumulative when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels) -> Optional[dict]:
+        """Count and sum for one label combination, or None if nothing was observed."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return None if series is None else {"count": series[-1], "sum": series[-2]}
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """
+    Histograms recorded on the hot path plus gauges read from callbacks at
+    scrape time, rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._histograms: list[Histogram] = []
+        self._gauges: list[tuple[str, str, Callable[[], Iterable[tuple[dict, float]]]]] = []
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self._histograms.append(histogram)
+        return histogram
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], Iterable[tuple[dict, float]]]):
+        """Register a gauge whose (labels, value) samples are read from callback on each scrape."""
+        self._gauges.append((name, documentation, callback))
+
+    def render(self) -> str:
+        lines = []
+        for histogram in self._histograms:
+            lines.extend(histogram.collect())
+        for name, documentation, callback in self._gauges:
+            try:
+                samples = list(callback())
+            except Exception as e:
+                logger.warning(f"Collecting {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_seconds = registry.histogram(
+    "rag_http_request_duration_seconds",
+    "Time to produce a response, per route; streamed bodies are timed to their first byte.",
+    ("method", "route", "status"),
+)
+stage_seconds = registry.histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in one stage of the chat or ingestion pipeline.",
+    ("pipeline", "stage"),
+)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "duration", "attributes")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Optional[dict] = None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.attributes = attributes or {}
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            **({"attributes": self.attributes} if self.attributes else {}),
+        }
+
+
+class Trace:
+    """The spans of one request or background job, sharing a W3C-compatible trace id."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {"trace_id": self.trace_id, "spans": [span.to_dict() for span in self.spans]}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    A child of the current span, or a span in a new trace when there is
+    none. The span is current inside the block, including in tasks and
+    worker threads started with a copy of this context.
+    """
+    parent = _current_span.get()
+    trace = parent.trace if parent is not None else Trace()
+    current = Span(trace, name, parent.span_id if parent is not None else None, attributes)
+    trace.add(current)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_span.reset(token)
+
+
+@contextmanager
+def trace(name: str, traceparent: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """
+    The root span of a request or job. A valid W3C traceparent header
+    continues the caller's trace. The finished trace is logged at INFO
+    when it took at least TRACE_SLOW_SECONDS, otherwise at DEBUG.
+    """
+    match = _TRACEPARENT.match(traceparent or "")
+    root_trace = Trace(match.group(1) if match else None)
+    root = Span(root_trace, name, match.group(2) if match else None, attributes)
+    root_trace.add(root)
+    token = _current_span.set(root)
+    start = time.perf_counter()
+    try:
+        yield root
+    finally:
+        root.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        level = logging.INFO if root.duration >= TRACE_SLOW_SECONDS else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, f"trace {json.dumps(root_trace.to_dict())}")
+
+
+@contextmanager
+def stage(pipeline: str, name: str, **attributes) -> Iterator[Span]:
+    """Time one pipeline stage into rag_stage_duration_seconds and record it as a span."""
+    start = time.perf_counter()
+    try:
+        with span(name, pipeline=pipeline, **attributes) as current:
+            yield current
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, pipeline=pipeline, stage=name)
+
+
+def record_stage(pipeline: str, name: str, seconds: float):
+    """Record a stage timed outside a with-block, such as one spread across a generator's steps."""
+    stage_seconds.observe(seconds, pipeline=pipeline, stage=name)
+    parent = _current_span.get()
+    if parent is not None:
+        finished = Span(parent.trace, name, parent.span_id, {"pipeline": pipeline})
+        finished.start -= seconds
+        finished.duration = seconds
+        parent.trace.add(finished)
+
+
+class TimedIterator:
+    """
+    Wraps a lazy iterator and accumulates the time spent producing its
+    items, recording it as one stage once the iterator is exhausted. Time
+    spent inside an inner TimedIterator passed as exclude is subtracted,
+    so stacked generators (extract feeding chunk) are timed separately.
+    """
+
+    def __init__(self, iterable: Iterable, pipeline: str, name: str, exclude: Optional["TimedIterator"] = None):
+        self._iterator = iter(iterable)
+        self.pipeline = pipeline
+        self.name = name
+        self.exclude = exclude
+        self.elapsed = 0.0
+        self._recorded = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            item = next(self._iterator)
+        except StopIteration:
+            self.elapsed += time.perf_counter() - start
+            self.finish()
+            raise
+        self.elapsed += time.perf_counter() - start
+        return item
+
+    def finish(self):
+        if self._recorded:
+            return
+        self._recorded = True
+        own = self.elapsed - (self.exclude.elapsed if self.exclude is not None else 0.0)
+        record_stage(self.pipeline, self.name, max(own, 0.0))
@@ -0,0 +1,91 @@
+# server/app/services/password_hasher.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from ..config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+
+
+class HashingPoolSaturated(RuntimeError):
+    """Raised instead of queueing when every hashing worker is busy and the queue is full."""
+
+
+def pool_size() -> int:
+    return PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+class PasswordHashingPool:
+    """
+    Runs password hashing and verification on a dedicated, fixed-size
+    thread pool (bcrypt releases the GIL while it works), so a burst of
+    logins waits here rather than in the threadpool that serves every
+    other sync route and dependency. At most max_workers + max_queue
+    calls are admitted at once; anything beyond that fails immediately
+    with HashingPoolSaturated so the caller can shed load.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _admit(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingPoolSaturated(
+                f"Password hashing pool saturated ({self.max_workers} workers, {self.max_queue} queued)"
+            )
+        with self._lock:
+            self.in_flight += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    async def run(self, fn: Callable, *args):
+        """Await fn(*args) on the pool; raises HashingPoolSaturated when no slot is free."""
+        self._admit()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # Released when the work finishes, even if the awaiting request was cancelled
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+password_hashing_pool = PasswordHashingPool(pool_size(), PASSWORD_HASH_MAX_QUEUE)
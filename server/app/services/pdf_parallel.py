@@ -0,0 +1,123 @@
+# server/app/services/pdf_parallel.py
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Iterator, Optional
+
+import pdfplumber
+
+from ..config import PDF_PARSE_WORKERS, PDF_PAGES_PER_TASK
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class _SharedBufferReader(io.RawIOBase):
+    """Seekable read-only file over a memoryview, so workers parse the shared PDF without copying it."""
+
+    def __init__(self, buf: memoryview):
+        self._buf = buf
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._buf) - self._pos))
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._buf)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def _extract_page_range(shm_name: str, size: int, start: int, stop: int) -> list[str]:
+    """Worker: attach to the shared PDF bytes and extract pages [start, stop)."""
+    shm = SharedMemory(name=shm_name)
+    buf = shm.buf[:size]
+    try:
+        with pdfplumber.open(io.BufferedReader(_SharedBufferReader(buf))) as pdf:
+            texts = []
+            for page in pdf.pages[start:stop]:
+                texts.append(page.extract_text() or "")
+                page.close()
+        return texts
+    finally:
+        buf.release()
+        shm.close()
+
+
+def pool_size() -> int:
+    return PDF_PARSE_WORKERS or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: ingestion runs on threads, and forking a threaded process is unsafe
+            _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+def iter_pdf_pages_parallel(
+    file_bytes: bytes,
+    num_pages: int,
+    on_progress: Optional[Callable[[float], None]] = None,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> Iterator[str]:
+    """
+    Yield page texts in order while worker processes extract page ranges.
+    The PDF is copied once into shared memory that every worker reads from,
+    and only about two ranges per worker are in flight at a time so the
+    pages buffered in the parent stay bounded.
+    """
+    pool = get_pool()
+    shm = SharedMemory(create=True, size=max(len(file_bytes), 1))
+    shm.buf[:len(file_bytes)] = file_bytes
+    ranges = deque((start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task))
+    in_flight: deque[Future] = deque()
+    max_in_flight = 2 * pool_size()
+    done_pages = 0
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < max_in_flight:
+                start, stop = ranges.popleft()
+                in_flight.append(pool.submit(_extract_page_range, shm.name, len(file_bytes), start, stop))
+            for text in in_flight.popleft().result():
+                yield text
+                done_pages += 1
+                if on_progress:
+                    on_progress(done_pages / num_pages)
+    finally:
+        for future in in_flight:
+            future.cancel()
+        shm.close()
+        shm.unlink()
@@ -1,32 +1,129 @@
 # app/services/pinecone_client.py
+import hashlib
 import pinecone
 import os
+import threading
+from typing import Optional
 from ..config import PINECONE_API_KEY, PINECONE_INDEX_NAME
+from .vector_store import get_vector_store
+from .vector_upserter import upsert_in_batches
 from uuid import uuid4
 from datetime import datetime
 
-pc = pinecone.Pinecone(PINECONE_API_KEY)
-index = pc.Index(PINECONE_INDEX_NAME)
 
-def upsert_documents(user_id: str, chunks: list[str], embeddings: list[list[float]], metadata: dict):
-    namespace = f"user-{user_id}"
+class _LazyIndex:
+    """
+    Stands in for pinecone.Index and connects on first use, so importing this
+    module (or running with the local vector store) needs no network access.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        with self._lock:
+            if self._index is None:
+                pc = pinecone.Pinecone(PINECONE_API_KEY)
+                self._index = pc.Index(PINECONE_INDEX_NAME)
+            return self._index
+
+    def upsert(self, *args, **kwargs):
+        return self._get().upsert(*args, **kwargs)
+
+    def query(self, *args, **kwargs):
+        return self._get().query(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._get().delete(*args, **kwargs)
+
+
+index = _LazyIndex()
+
+def user_namespace(user_id) -> str:
+    return f"user-{user_id}"
+
+def chunk_vector_id(document_id, text: str, occurrence: int = 0) -> str:
+    """
+    Id derived from the document and the chunk's content, so an unchanged
+    chunk keeps its id across re-uploads. occurrence tells repeated copies
+    of the same text within one document apart.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    suffix = f"-{occurrence}" if occurrence else ""
+    return f"doc-{document_id}-{digest}{suffix}"
+
+def chunk_vector_ids(document_id, chunks: list[str], occurrences: Optional[dict] = None) -> list[str]:
+    """Ids for a run of chunks; pass the same occurrences dict for every batch of one document."""
+    occurrences = {} if occurrences is None else occurrences
+    ids = []
+    for chunk in chunks:
+        seen = occurrences.get(chunk, 0)
+        ids.append(chunk_vector_id(document_id, chunk, seen))
+        occurrences[chunk] = seen + 1
+    return ids
+
+def upsert_documents(
+    user_id: str,
+    chunks: list[str],
+    embeddings: list[list[float]],
+    metadata: dict,
+    ids: Optional[list[str]] = None,
+    chunk_indexes: Optional[list[int]] = None,
+    chunk_metadata: Optional[list[dict]] = None,
+):
+    namespace = user_namespace(user_id)
     now = datetime.utcnow().isoformat()
+    document_id = metadata.get("document_id")
+    if not ids and document_id is not None:
+        ids = chunk_vector_ids(document_id, chunks)
     vectors = []
     for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-        vector_id = str(uuid4())
-        chunk_metadata = metadata.copy()
-        chunk_metadata.update({
-            "chunk_index": i,
+        vector_id = ids[i] if ids else str(uuid4())
+        vector_metadata = {**metadata, **chunk_metadata[i]} if chunk_metadata else metadata.copy()
+        vector_metadata.update({
+            "chunk_index": chunk_indexes[i] if chunk_indexes else i,
             "text": chunk,
             "timestamp": now
         })
-        vectors.append({"id": vector_id, "values": embedding, "metadata": chunk_metadata})
+        vectors.append({"id": vector_id, "values": embedding, "metadata": vector_metadata})
 
-    index.upsert(vectors=vectors, namespace=namespace)
+    upsert_in_batches(get_vector_store(), namespace, vectors)
     return namespace
 
 
 def query_similar_chunks(user_id: str, query_embedding: list[float], top_k: int = 5):
-    namespace = f"user-{user_id}"
-    results = index.query(vector=query_embedding, top_k=top_k, include_metadata=True, namespace=namespace)
-    return results["matches"]
+    namespace = user_namespace(user_id)
+    return get_vector_store().query(namespace, query_embedding, top_k=top_k)
+
+
+async def aquery_similar_chunks(user_id: str, query_embedding: list[float], top_k: int = 5):
+    namespace = user_namespace(user_id)
+    return await get_vector_store().aquery(namespace, query_embedding, top_k=top_k)
+
+
+def delete_document_vectors(user_id, document_id: int, filename: Optional[str] = None):
+    """
+    Delete a document's vectors by metadata, for documents indexed before
+    chunk manifests recorded their ids. Vectors written since the vector
+    store was added carry document_id; the original ingestion stored only
+    filename and user_id, so with filename those are matched too, but only
+    on vectors without a document_id: a later upload under the same name is
+    another document (copies uploaded twice under the original code are
+    indistinguishable and go together). Filter deletes fail on serverless
+    Pinecone indexes; see PineconeVectorStore.delete.
+    """
+    namespace = user_namespace(user_id)
+    store = get_vector_store()
+    store.delete(namespace, filter={"document_id": document_id})
+    if filename is not None:
+        store.delete(namespace, filter={"filename": filename, "user_id": user_id, "document_id": {"$exists": False}})
+
+
+# Pinecone accepts at most 1000 ids per delete request
+DELETE_BATCH_SIZE = 1000
+
+def delete_vectors(user_id: str, ids: list[str]):
+    namespace = user_namespace(user_id)
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        get_vector_store().delete(namespace, ids=ids[start:start + DELETE_BATCH_SIZE])
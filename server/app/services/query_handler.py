@@ -1,16 +1,25 @@
 # app/services/query_handler.py
-from app.services.bedrock_client import call_bedrock_model
 from ..models import ChatSession, ChatMessage
-from ..services.pinecone_client import query_similar_chunks
 from ..services.embedder import get_embeddings
-from ..database import get_db
+from ..services.answer_cache import answer_cache, documents_version
+from ..services.chat_history import EXCERPTS_HEADING, chat_history_builder
+from ..database import SessionLocal, new_async_session, session_scope
+from .metrics import record_stage, stage
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import AsyncIterator, Callable, Iterator, Optional, Union
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 def build_claude_prompt(system_prompt: str, chat_history: list, user_input: str) -> str:
     """
-    Claude on Bedrock now uses structured messages format.
-    We'll convert everything into a single user message.
-    TODO: Modify to support chat history
+    Flat single-message form of a Claude prompt. Chat turns use
+    build_claude_messages, which keeps the system/turn structure.
     """
     # Combine history into a flat prompt for now (or modify to support multiple messages)
     history_text = ""
@@ -24,6 +33,28 @@ def build_claude_prompt(system_prompt: str, chat_history: list, user_input: str)
     return full_text
 
 
+def build_claude_messages(
+    system_prompt: str, chat_history: list, user_input: str, context: str = "", summary: str = ""
+) -> dict:
+    """
+    Structured Messages API prompt. The system prompt is its own block so it
+    can be cached, followed by the excerpts of older turns. Retrieved context
+    changes with every question, so it travels in the final user turn and
+    leaves the system prompt and history as a reusable prefix.
+    """
+    system = [system_prompt]
+    if summary:
+        system.append(f"{EXCERPTS_HEADING}\n{summary}")
+    messages = [
+        {"role": turn["role"], "content": turn["content"]}
+        for turn in chat_history
+        if turn.get("content")
+    ]
+    final_input = f"Context:\n{context}\n\nQuestion: {user_input}" if context else user_input
+    messages.append({"role": "user", "content": final_input})
+    return {"system": system, "messages": messages}
+
+
 def build_titan_prompt(system_prompt: str, chat_history: list, user_input: str) -> str:
     """
     Titan uses a flat text prompt.
@@ -36,6 +67,208 @@ def build_titan_prompt(system_prompt: str, chat_history: list, user_input: str)
     history = "\n".join(history_parts)
     return f"{system_prompt}\n{history}\nUser: {user_input}\nAssistant:"
 
+class ChatStream:
+    """
+    Iterates over a model's text deltas and persists the assembled assistant
+    reply once, either when the stream completes or when it is cut short
+    (for example because the client disconnected).
+    """
+
+    def __init__(
+        self,
+        session_id: int,
+        deltas: Iterator[str],
+        session_factory=SessionLocal,
+        on_complete: Optional[Callable[[str], None]] = None,
+    ):
+        self.session_id = session_id
+        self.deltas = deltas
+        self.session_factory = session_factory
+        self.on_complete = on_complete
+        self.parts: list[str] = []
+        self.message_id: Optional[int] = None
+        self._finalized = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        try:
+            for delta in self.deltas:
+                if not self.parts:
+                    record_stage("chat", "model_first_token", time.perf_counter() - start)
+                self.parts.append(delta)
+                yield delta
+            # Only a reply that streamed to the end is handed on, never a cut-off one
+            if self.on_complete and self.text.strip():
+                self.on_complete(self.text)
+        finally:
+            self.finalize()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def finalize(self) -> Optional[int]:
+        """Save whatever has been generated so far; safe to call more than once."""
+        with self._lock:
+            if self._finalized:
+                return self.message_id
+            self._finalized = True
+            content = self.text
+            if not content.strip():
+                return None
+            with session_scope(self.session_factory) as db:
+                assistant_msg = ChatMessage(session_id=self.session_id, role="assistant", content=content)
+                db.add(assistant_msg)
+                with stage("chat", "db_commit"):
+                    db.commit()
+                self.message_id = assistant_msg.id
+            return self.message_id
+
+
+class AsyncChatStream:
+    """
+    ChatStream for the async request path: iterates an async stream of text
+    deltas and saves the reply through an AsyncSession.
+    """
+
+    def __init__(
+        self,
+        session_id: int,
+        deltas: AsyncIterator[str],
+        session_factory=new_async_session,
+        on_complete: Optional[Callable[[str], None]] = None,
+    ):
+        self.session_id = session_id
+        self.deltas = deltas
+        self.session_factory = session_factory
+        self.on_complete = on_complete
+        self.parts: list[str] = []
+        self.message_id: Optional[int] = None
+        self._finalized = False
+        self._lock = asyncio.Lock()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        try:
+            async for delta in self.deltas:
+                if not self.parts:
+                    record_stage("chat", "model_first_token", time.perf_counter() - start)
+                self.parts.append(delta)
+                yield delta
+            if self.on_complete and self.text.strip():
+                self.on_complete(self.text)
+        finally:
+            await self.finalize()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    async def finalize(self) -> Optional[int]:
+        """Save whatever has been generated so far; safe to call more than once."""
+        async with self._lock:
+            if self._finalized:
+                return self.message_id
+            self._finalized = True
+            content = self.text
+            if not content.strip():
+                return None
+            async with self.session_factory() as db:
+                assistant_msg = ChatMessage(session_id=self.session_id, role="assistant", content=content)
+                db.add(assistant_msg)
+                with stage("chat", "db_commit"):
+                    await db.commit()
+                self.message_id = assistant_msg.id
+            return self.message_id
+
+
+async def _aiter_once(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+def _start_turn(
+    db: Session, user_id: int, session_id: int, user_input: str, blocking: bool = True
+) -> tuple[list[dict], str]:
+    """
+    Assemble the session's token-budgeted history and save the new user
+    message. Returns the recent messages and the excerpts of older ones.
+    """
+    session = db.query(ChatSession).filter_by(id=session_id, user_id=user_id).first()
+    if not session:
+        raise ValueError("Session not found.")
+
+    with stage("chat", "history"):
+        chat_history, summary = chat_history_builder.build(db, session, blocking=blocking)
+
+    # Save user message (and the excerpts, if older turns were folded into them)
+    user_msg = ChatMessage(session_id=session_id, role="user", content=user_input)
+    db.add(user_msg)
+    # A new turn moves the session to the top of the listing and into the next `since` sync
+    session.updated_at = datetime.utcnow()
+    with stage("chat", "db_commit"):
+        db.commit()
+    return chat_history, summary
+
+
+def _build_prompt(
+    user_id: int,
+    model: str,
+    system_prompt: str,
+    chat_history: list[dict],
+    user_input: str,
+    enable_rag: bool,
+    retrieval_mode: str = "dense",
+    summary: str = "",
+) -> tuple[Union[str, dict], list[str]]:
+    """
+    Retrieve context and build the model prompt: structured messages for
+    Claude, flat text for Titan. Returns the prompt and the retrieved chunk ids.
+    """
+    context = ""
+    chunk_ids = []
+    if enable_rag:
+        from .retrieval import retrieve
+
+        matches = retrieve(user_id, user_input, top_k=4, mode=retrieval_mode)
+        context, chunk_ids = _context_from_matches(matches)
+
+    with stage("chat", "prompt_build"):
+        prompt = _compose_prompt(model, system_prompt, chat_history, user_input, context, summary)
+    return prompt, chunk_ids
+
+
+def _context_from_matches(matches: list[dict]) -> tuple[str, list[str]]:
+    context_chunks = [match["metadata"]["text"] for match in matches]
+    chunk_ids = [match.get("id") for match in matches]
+    return "\n".join(context_chunks), chunk_ids
+
+
+def _compose_prompt(
+    model: str, system_prompt: str, chat_history: list[dict], user_input: str, context: str, summary: str
+) -> Union[str, dict]:
+    if model == "claude":
+        return build_claude_messages(system_prompt, chat_history, user_input, context, summary)
+
+    final_prompt = system_prompt
+    if summary:
+        final_prompt += f"\n\n{EXCERPTS_HEADING}\n{summary}"
+    if context:
+        final_prompt += f"\n\nContext:\n{context}"
+
+    if model == "titan":
+        return build_titan_prompt(final_prompt, chat_history, user_input)
+    else:
+        raise ValueError("Unsupported model")
+
+
+def _save_reply(db: Session, session_id: int, content: str):
+    assistant_msg = ChatMessage(session_id=session_id, role="assistant", content=content)
+    db.add(assistant_msg)
+    with stage("chat", "db_commit"):
+        db.commit()
+
+
 def run_chat(
     db: Session,
     user_id: int,
@@ -44,64 +277,140 @@ def run_chat(
     system_prompt: str,
     user_input: str,
     enable_rag: bool = False,
+    stream: bool = False,
+    retrieval_mode: str = "dense",
 ):
+    """
+    Run one chat turn. Returns the full reply, or with stream=True a
+    ChatStream that yields text deltas and saves the reply when done.
+    retrieval_mode picks dense, sparse (BM25) or hybrid RAG retrieval.
+
+    The first RAG turn of a session is answered from the semantic answer
+    cache when a close enough question was already answered for this user
+    from the same documents; later turns depend on their history and always
+    go to the model, and turns without RAG skip the cache (and the query
+    embedding it needs).
+    """
     try:
-        session = db.query(ChatSession).filter_by(id=session_id, user_id=user_id).first()
-        if not session:
-            raise ValueError("Session not found.")
-
-        # Add null checks for content field
-        chat_history = []
-        messages = (db.query(ChatMessage)
-                    .filter_by(session_id=session_id)
-                    .order_by(ChatMessage.created_at)
-                    .all())
-        
-        for msg in messages:
-            # Skip messages with null/empty content
-            if msg.content is not None and msg.content.strip():
-                chat_history.append({
-                    "role": msg.role, 
-                    "content": msg.content
-                })
-
-        # Save user message
-        user_msg = ChatMessage(session_id=session_id, role="user", content=user_input)
-        db.add(user_msg)
-        db.commit()
+        chat_history, summary = _start_turn(db, user_id, session_id, user_input)
 
-        context = ""
-        if enable_rag:
-            from .embedder import get_embeddings
-            from .pinecone_client import query_similar_chunks
+        cache_key = None
+        if answer_cache is not None and enable_rag and not chat_history and not summary:
+            from .pinecone_client import user_namespace
 
-            query_embedding = get_embeddings([user_input])[0]
-            matches = query_similar_chunks(user_id, query_embedding, top_k=4)
-            context_chunks = [match["metadata"]["text"] for match in matches]
-            context = "\n".join(context_chunks)
+            # Read before retrieval, so an answer built from documents changed meanwhile is stored as stale
+            version = documents_version(db, user_id)
+            with stage("chat", "query_embedding"):
+                query_embedding = get_embeddings([user_input])[0]
+            cache_key = (
+                user_namespace(user_id),
+                answer_cache.scope(model, system_prompt, enable_rag, retrieval_mode),
+                query_embedding,
+            )
+            hit = answer_cache.lookup(*cache_key, version=version)
+            if hit is not None:
+                if stream:
+                    return ChatStream(session_id, iter([hit["answer"]]))
+                _save_reply(db, session_id, hit["answer"])
+                return hit["answer"]
 
-        final_prompt = f"{system_prompt}\n\nContext:\n{context}" if context else system_prompt
+        prompt, chunk_ids = _build_prompt(
+            user_id, model, system_prompt, chat_history, user_input, enable_rag, retrieval_mode, summary
+        )
 
-        if model == "claude":
-            prompt = build_claude_prompt(final_prompt, chat_history, user_input)
-        elif model == "titan":
-            prompt = build_titan_prompt(final_prompt, chat_history, user_input)
-        else:
-            raise ValueError("Unsupported model")
+        def remember(answer: str):
+            if cache_key is not None:
+                answer_cache.store(*cache_key, answer, chunk_ids, version=version)
+
+        if stream:
+            from .bedrock_client import stream_bedrock_model
+            return ChatStream(session_id, stream_bedrock_model(model, prompt), on_complete=remember)
 
         from .bedrock_client import call_bedrock_model
-        response = call_bedrock_model(model, prompt)
+        with stage("chat", "model_call", model=model):
+            response = call_bedrock_model(model, prompt)
 
         # Save assistant reply
-        assistant_msg = ChatMessage(session_id=session_id, role="assistant", content=response)
-        db.add(assistant_msg)
-        db.commit()
+        _save_reply(db, session_id, response)
+        remember(response)
 
         return response
     
     except Exception as e:
-        print(f"Error during chat run: {e}")
+        logger.exception(f"Error during chat run: {e}")
         raise RuntimeError(f"Error during chat run: {str(e)}") from e
 
 
 
+async def arun_chat(
+    db: AsyncSession,
+    user_id: int,
+    session_id: int,
+    model: str,
+    system_prompt: str,
+    user_input: str,
+    enable_rag: bool = False,
+    stream: bool = False,
+    retrieval_mode: str = "dense",
+):
+    """
+    Async counterpart of run_chat. Database work runs through the
+    AsyncSession and Bedrock calls go out on the async client, so a turn
+    waiting on the model holds no worker thread. Returns the full reply,
+    or with stream=True an AsyncChatStream.
+    """
+    try:
+        chat_history, summary = await db.run_sync(
+            _start_turn, user_id, session_id, user_input, blocking=False
+        )
+
+        cache_key = None
+        if answer_cache is not None and enable_rag and not chat_history and not summary:
+            from .embedder import aget_query_embedding
+            from .pinecone_client import user_namespace
+
+            version = await db.run_sync(documents_version, user_id)
+            with stage("chat", "query_embedding"):
+                query_embedding = await aget_query_embedding(user_input)
+            cache_key = (
+                user_namespace(user_id),
+                answer_cache.scope(model, system_prompt, enable_rag, retrieval_mode),
+                query_embedding,
+            )
+            hit = answer_cache.lookup(*cache_key, version=version)
+            if hit is not None:
+                if stream:
+                    return AsyncChatStream(session_id, _aiter_once(hit["answer"]))
+                await db.run_sync(_save_reply, session_id, hit["answer"])
+                return hit["answer"]
+
+        context = ""
+        chunk_ids = []
+        if enable_rag:
+            from .retrieval import aretrieve
+
+            matches = await aretrieve(user_id, user_input, top_k=4, mode=retrieval_mode)
+            context, chunk_ids = _context_from_matches(matches)
+        with stage("chat", "prompt_build"):
+            prompt = _compose_prompt(model, system_prompt, chat_history, user_input, context, summary)
+
+        def remember(answer: str):
+            if cache_key is not None:
+                answer_cache.store(*cache_key, answer, chunk_ids, version=version)
+
+        if stream:
+            from .bedrock_async import async_stream_bedrock_model
+            return AsyncChatStream(session_id, async_stream_bedrock_model(model, prompt), on_complete=remember)
+
+        from .bedrock_async import async_call_bedrock_model
+        with stage("chat", "model_call", model=model):
+            response = await async_call_bedrock_model(model, prompt)
+
+        await db.run_sync(_save_reply, session_id, response)
+        remember(response)
+
+        return response
+
+    except Exception as e:
+        logger.exception(f"Error during chat run: {e}")
+        raise RuntimeError(f"Error during chat run: {str(e)}") from e
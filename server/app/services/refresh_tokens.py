@@ -0,0 +1,218 @@
+# server/app/services/refresh_tokens.py
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from ..config import (
+    REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS,
+    REFRESH_TOKEN_SWEEP_BATCH,
+    REFRESH_REVOCATION_FILTER_ENABLED,
+    REFRESH_REVOCATION_FILTER_CAPACITY,
+    REFRESH_REVOCATION_FILTER_FP_RATE,
+)
+from ..database import SessionLocal, session_scope
+from ..models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# Each sync re-reads this much already-seen history, so revocations committed
+# late (or stamped by a worker with a slightly different clock) are not missed
+SYNC_OVERLAP = timedelta(minutes=5)
+
+
+class RevocationFilter:
+    """
+    Bloom filter of revoked refresh token ids. A miss proves the token was
+    not revoked as of the last sync, so a refresh can skip the database; a
+    hit (real or false positive) falls back to the database check.
+
+    Revocations made in this process are added immediately; those made by
+    other workers arrive with the next sync from the database.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = np.zeros(self.num_bits, dtype=bool)
+        self._lock = threading.Lock()
+        self.count = 0
+        # Until the first sync the filter knows nothing, so every check goes to the database
+        self.ready = False
+        self.synced_through: Optional[datetime] = None
+        # Ids revoked locally while a rebuild is reading the database
+        self._pending: Optional[list[str]] = None
+
+    def _positions(self, jti: str) -> list[int]:
+        # Double hashing: k positions from the two halves of one SHA-256 digest
+        digest = hashlib.sha256(jti.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    @staticmethod
+    def _set(bits: np.ndarray, positions: list[int]) -> bool:
+        """Set the positions; True if the id was not already (apparently) present."""
+        if bits[positions].all():
+            return False
+        bits[positions] = True
+        return True
+
+    def add(self, jti: str):
+        positions = self._positions(jti)
+        with self._lock:
+            self.count += self._set(self._bits, positions)
+            if self._pending is not None:
+                self._pending.append(jti)
+
+    def might_contain(self, jti: str) -> bool:
+        """False only when jti is certainly not revoked."""
+        positions = self._positions(jti)
+        with self._lock:
+            return not self.ready or bool(self._bits[positions].all())
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+    def sync(self, db, now: Optional[datetime] = None):
+        """
+        Add revocations recorded since the last sync. The first sync, and
+        any sync once the filter is over capacity, rebuilds it from every
+        unexpired revoked token and swaps it in whole.
+        """
+        now = now or datetime.utcnow()
+        rebuild = not self.ready or self.saturated
+        query = db.query(RefreshToken.jti, RefreshToken.revoked_at).filter(
+            RefreshToken.is_revoked == True, RefreshToken.expires_at > now
+        )
+        if not rebuild and self.synced_through is not None:
+            query = query.filter(RefreshToken.revoked_at > self.synced_through - SYNC_OVERLAP)
+
+        newest = None if rebuild else self.synced_through
+        bits = np.zeros(self.num_bits, dtype=bool) if rebuild else None
+        count = 0
+        if rebuild:
+            with self._lock:
+                self._pending = []
+        try:
+            for jti, revoked_at in query.yield_per(REFRESH_TOKEN_SWEEP_BATCH):
+                if rebuild:
+                    count += self._set(bits, self._positions(jti))
+                else:
+                    self.add(jti)
+                if revoked_at is not None and (newest is None or revoked_at > newest):
+                    newest = revoked_at
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            if rebuild:
+                for jti in self._pending:
+                    count += self._set(bits, self._positions(jti))
+                self._pending = None
+                self._bits = bits
+                self.count = count
+            self.synced_through = newest
+            self.ready = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "count": self.count,
+                "bits": self.num_bits,
+                "hashes": self.num_hashes,
+                "fill_ratio": float(self._bits.mean()),
+            }
+
+
+def sweep_refresh_tokens(db, batch_size: int = REFRESH_TOKEN_SWEEP_BATCH, delete_revoked: bool = True,
+                         now: Optional[datetime] = None) -> int:
+    """
+    Delete expired refresh tokens, and revoked ones when delete_revoked,
+    batch_size rows per transaction so the sweep never holds long locks.
+    Returns the number of rows deleted.
+    """
+    now = now or datetime.utcnow()
+    condition = RefreshToken.expires_at <= now
+    if delete_revoked:
+        condition = condition | (RefreshToken.is_revoked == True)
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in db.query(RefreshToken.id).filter(condition).limit(batch_size)]
+        if not ids:
+            return deleted
+        db.query(RefreshToken).filter(RefreshToken.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+
+
+class RefreshTokenSweeper:
+    """
+    Background thread that sweeps the refresh token table every interval
+    seconds and keeps the revocation filter in sync. With the filter on,
+    revoked tokens are kept until they expire, because the filter (and the
+    database fallback behind it) must still recognise them.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        interval: float = REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS,
+        revocation_filter: Optional[RevocationFilter] = None,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.revocation_filter = revocation_filter
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        with session_scope(self.session_factory) as db:
+            deleted = sweep_refresh_tokens(db, delete_revoked=self.revocation_filter is None)
+            if self.revocation_filter is not None:
+                self.revocation_filter.sync(db)
+        if deleted:
+            logger.info(f"Swept {deleted} refresh token(s)")
+        return deleted
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception(f"Refresh token sweep failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="refresh-token-sweeper", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+revocation_filter = (
+    RevocationFilter(REFRESH_REVOCATION_FILTER_CAPACITY, REFRESH_REVOCATION_FILTER_FP_RATE)
+    if REFRESH_REVOCATION_FILTER_ENABLED
+    else None
+)
+refresh_token_sweeper = RefreshTokenSweeper(SessionLocal, revocation_filter=revocation_filter)
@@ -0,0 +1,86 @@
+# server/app/services/retrieval.py
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from .bm25_index import keyword_index
+from .metrics import stage
+from ..config import RRF_K
+
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid")
+# Each retriever contributes this many candidates per requested result before fusion
+HYBRID_CANDIDATE_FACTOR = 3
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], k: int = RRF_K, top_k: int = 5) -> list[dict]:
+    """
+    Merge ranked match lists with reciprocal rank fusion: each match scores
+    sum(1 / (k + rank)) over the lists it appears in. Scores from different
+    retrievers are never compared directly, only ranks.
+    """
+    fused: dict[str, dict] = {}
+    for matches in result_lists:
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.setdefault(match["id"], {"id": match["id"], "score": 0.0, "metadata": match["metadata"]})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda m: m["score"], reverse=True)[:top_k]
+
+
+def dense_search(user_id, query: str, top_k: int) -> list[dict]:
+    from .embedder import get_embeddings
+    from .pinecone_client import query_similar_chunks
+
+    with stage("chat", "query_embedding"):
+        query_embedding = get_embeddings([query])[0]
+    with stage("chat", "vector_query"):
+        return query_similar_chunks(user_id, query_embedding, top_k=top_k)
+
+
+def sparse_search(user_id, query: str, top_k: int) -> list[dict]:
+    from .pinecone_client import user_namespace
+
+    with stage("chat", "keyword_query"):
+        return keyword_index.search(user_namespace(user_id), query, top_k=top_k)
+
+
+def retrieve(user_id, query: str, top_k: int = 4, mode: str = "dense") -> list[dict]:
+    """Retrieve context chunks by dense similarity, BM25, or both fused with RRF."""
+    if mode == "dense":
+        return dense_search(user_id, query, top_k)
+    if mode == "sparse":
+        return sparse_search(user_id, query, top_k)
+    if mode == "hybrid":
+        depth = top_k * HYBRID_CANDIDATE_FACTOR
+        # BM25 runs on the pool while this thread embeds the query and hits the vector store
+        sparse = _executor.submit(contextvars.copy_context().run, sparse_search, user_id, query, depth)
+        dense = dense_search(user_id, query, depth)
+        return reciprocal_rank_fusion([dense, sparse.result()], top_k=top_k)
+    raise ValueError(f"Unsupported retrieval mode: {mode}")
+
+
+async def adense_search(user_id, query: str, top_k: int) -> list[dict]:
+    from .embedder import aget_query_embedding
+    from .pinecone_client import aquery_similar_chunks
+
+    with stage("chat", "query_embedding"):
+        query_embedding = await aget_query_embedding(query)
+    with stage("chat", "vector_query"):
+        return await aquery_similar_chunks(user_id, query_embedding, top_k=top_k)
+
+
+async def aretrieve(user_id, query: str, top_k: int = 4, mode: str = "dense") -> list[dict]:
+    """Async counterpart of retrieve; BM25 is CPU-bound and runs on a worker thread."""
+    if mode == "dense":
+        return await adense_search(user_id, query, top_k)
+    if mode == "sparse":
+        return await asyncio.to_thread(sparse_search, user_id, query, top_k)
+    if mode == "hybrid":
+        depth = top_k * HYBRID_CANDIDATE_FACTOR
+        dense, sparse = await asyncio.gather(
+            adense_search(user_id, query, depth),
+            asyncio.to_thread(sparse_search, user_id, query, depth),
+        )
+        return reciprocal_rank_fusion([dense, sparse], top_k=top_k)
+    raise ValueError(f"Unsupported retrieval mode: {mode}")
@@ -25,4 +25,11 @@ def generate_presigned_url(key: str, expiration: int = 3600) -> str:
         ClientMethod="get_object",
         Params={"Bucket": S3_BUCKET_NAME, "Key": key},
         ExpiresIn=expiration
-    )
\ No newline at end of file
+    )
+
+
+def delete_document_from_s3(key: str):
+    try:
+        s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=key)
+    except (BotoCoreError, ClientError) as e:
+        raise RuntimeError(f"Failed to delete file from S3: {str(e)}")
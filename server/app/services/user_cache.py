@@ -0,0 +1,82 @@
+# server/app/services/user_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, inspect
+
+from ..config import USER_CACHE_ENABLED, USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS
+from ..models import User
+
+
+def _snapshot(user: User) -> User:
+    """A detached copy of the user's columns, safe to hand to any request or thread."""
+    return User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+
+
+class UserCache:
+    """
+    Authenticated users by id, so a request with a valid access token does
+    not have to load its user from the database. Entries expire after
+    ttl_seconds and the least recently used are evicted beyond max_entries.
+    Any flushed change to a user (deactivation, password change) or its
+    deletion drops the entry in this process; other workers see the change
+    once their entry expires.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[float, User]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            user = entry[1]
+        return _snapshot(user)
+
+    def put(self, user: User):
+        snapshot = _snapshot(user)
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+user_cache = UserCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS) if USER_CACHE_ENABLED else None
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User):
+    if user_cache is not None:
+        user_cache.invalidate(target.id)
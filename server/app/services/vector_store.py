@@ -0,0 +1,436 @@
+# server/app/services/vector_store.py
+import asyncio
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+from .ann_index import IVFIndex, normalize_rows
+from ..config import (
+    VECTOR_STORE_BACKEND,
+    LOCAL_VECTOR_STORE_DIR,
+    LOCAL_VECTOR_INDEX,
+    LOCAL_VECTOR_IVF_NLIST,
+    LOCAL_VECTOR_IVF_NPROBE,
+    LOCAL_VECTOR_IVF_MIN_ROWS,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes from several processes are not serialized
+    fcntl = None
+
+
+def matches_filter(metadata: dict, filter: dict) -> bool:
+    """Pinecone filter semantics for the subset the app uses: equality, and {"$exists": bool}."""
+    for key, condition in filter.items():
+        if isinstance(condition, dict) and "$exists" in condition:
+            if (key in metadata) != condition["$exists"]:
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class VectorStore(ABC):
+    """
+    Minimal vector store interface. Vectors are dicts of
+    {"id", "values", "metadata"}; matches are dicts of {"id", "score", "metadata"}.
+    """
+
+    @abstractmethod
+    def upsert(self, namespace: str, vectors: list[dict]):
+        ...
+
+    @abstractmethod
+    def query(self, namespace: str, vector: list[float], top_k: int = 5) -> list[dict]:
+        ...
+
+    async def aquery(self, namespace: str, vector: list[float], top_k: int = 5) -> list[dict]:
+        """Query from the event loop; by default the blocking query runs on a worker thread."""
+        return await asyncio.to_thread(self.query, namespace, vector, top_k=top_k)
+
+    @abstractmethod
+    def delete(self, namespace: str, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        """Delete vectors by id, or every vector whose metadata matches filter (see matches_filter)."""
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, namespace: str, vectors: list[dict]):
+        self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def query(self, namespace: str, vector: list[float], top_k: int = 5) -> list[dict]:
+        results = self.index.query(vector=vector, top_k=top_k, include_metadata=True, namespace=namespace)
+        return results["matches"]
+
+    def delete(self, namespace: str, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        if ids:
+            self.index.delete(ids=ids, namespace=namespace)
+        if filter:
+            # Serverless indexes reject deletes by metadata filter, and vectors from before chunk
+            # manifests have no ids to delete by, so a rejection must stop the caller rather than
+            # leave the vectors behind
+            try:
+                self.index.delete(filter=filter, namespace=namespace)
+            except Exception as e:
+                raise RuntimeError(
+                    f"Pinecone rejected deleting vectors matching {filter} in {namespace} "
+                    f"(serverless indexes do not support deletes by metadata filter): {e}"
+                ) from e
+
+
+class _Namespace:
+    """
+    One namespace of the local store, kept in three files:
+      vectors.f32  raw float32 rows (L2-normalized), memory-mapped for queries
+      meta.jsonl   append-only log of {"row", "id", "metadata"} / {"row", "deleted"} records
+      header.json  {"dim": d}
+    Replaying the log on load rebuilds the id -> row map, the live-row mask and metadata.
+    With an IVF index attached, exact search is used until the namespace
+    reaches min_train_rows live rows, after which queries go through the index.
+
+    Several workers may share the files. Every operation first applies what
+    was appended to the log since its stored offset (reloading from scratch
+    if compaction replaced the log), so rows are always numbered from the
+    same state. Writers hold an exclusive lock on a sidecar file and readers
+    a shared one, so nobody reads the files while they are being rewritten.
+    """
+
+    # Rewrite the files once more than this fraction of rows are dead
+    COMPACT_RATIO = 0.5
+    # Retrain the IVF quantizer once the namespace has grown this much since training
+    RETRAIN_GROWTH = 4
+
+    def __init__(self, path: str, ivf: Optional[IVFIndex] = None, min_train_rows: int = 0):
+        self.path = path
+        self.ivf = ivf
+        self.min_train_rows = min_train_rows
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.meta_path = os.path.join(path, "meta.jsonl")
+        self.header_path = os.path.join(path, "header.json")
+        self.lock_path = os.path.join(path, "lock")
+        self.lock = threading.RLock()
+        self.dim: Optional[int] = None
+        self._reset()
+
+    def _reset(self, inode: Optional[int] = None):
+        self.ids: list[Optional[str]] = []
+        self.metadata: list[Optional[dict]] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.row_of: dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        # How far into the log this process has read
+        self.inode = inode
+        self.offset = 0
+
+    @contextmanager
+    def file_lock(self, exclusive: bool):
+        """Exclusive across processes for writes, shared for reads."""
+        if fcntl is None or (not exclusive and not os.path.isdir(self.path)):
+            yield
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def sync(self):
+        """Apply log records appended since the last sync; reload if the log was replaced or truncated."""
+        if self.dim is None:
+            if not os.path.exists(self.header_path):
+                return
+            with open(self.header_path) as f:
+                self.dim = json.load(f)["dim"]
+        try:
+            f = open(self.meta_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            # fstat the open file, so a log swapped in by compaction is never read at the old offset
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                self._reset(stat.st_ino)
+            if stat.st_size == self.offset:
+                return
+            f.seek(self.offset)
+            data = f.read()
+        # A record still being written is left for the next sync
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+        self.offset += end
+        if self.ivf is not None:
+            # Other workers may have assigned, retrained or remapped the index
+            self.ivf.load(len(self.ids), self.matrix)
+
+    def _apply(self, record: dict):
+        row = record["row"]
+        while len(self.ids) <= row:
+            self.ids.append(None)
+            self.metadata.append(None)
+        if len(self.alive) < len(self.ids):
+            self.alive = np.concatenate([self.alive, np.zeros(len(self.ids) - len(self.alive), dtype=bool)])
+        if record.get("deleted"):
+            if self.ids[row] is not None:
+                self.row_of.pop(self.ids[row], None)
+            self.ids[row] = None
+            self.metadata[row] = None
+            self.alive[row] = False
+        else:
+            self.ids[row] = record["id"]
+            self.metadata[row] = record.get("metadata") or {}
+            self.alive[row] = True
+            self.row_of[record["id"]] = row
+
+    def matrix(self) -> np.ndarray:
+        rows = len(self.ids)
+        if self.dim is None or rows == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._matrix
+
+    def _write_log(self, records: list[dict]):
+        # Called synced and under the exclusive lock, so the log ends where this process stopped reading
+        with open(self.meta_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            self.offset = f.tell()
+        if self.inode is None:
+            self.inode = os.stat(self.meta_path).st_ino
+        for record in records:
+            self._apply(record)
+
+    def upsert(self, vectors: list[dict]):
+        if not vectors:
+            return
+        values = normalize_rows(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+        if self.dim is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.dim = values.shape[1]
+            with open(self.header_path, "w") as f:
+                json.dump({"dim": self.dim}, f)
+        if values.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension {values.shape[1]} does not match namespace dimension {self.dim}")
+
+        # Drop rows appended by an upsert that crashed before logging them
+        expected = len(self.ids) * self.dim * 4
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) > expected:
+            os.truncate(self.vectors_path, expected)
+
+        # Last write wins for ids repeated within one batch
+        latest = {vector["id"]: (vector, row_values) for vector, row_values in zip(vectors, values)}
+
+        records = []
+        overwrites = []
+        appended = []
+        next_row = len(self.ids)
+        for vector, row_values in latest.values():
+            row = self.row_of.get(vector["id"])
+            if row is None:
+                row = next_row
+                next_row += 1
+                appended.append(row_values)
+            else:
+                overwrites.append((row, row_values))
+            records.append({"row": row, "id": vector["id"], "metadata": vector.get("metadata") or {}})
+
+        if overwrites:
+            matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(len(self.ids), self.dim))
+            for row, row_values in overwrites:
+                matrix[row] = row_values
+            matrix.flush()
+            del matrix
+        if appended:
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.asarray(appended, dtype="<f4").tobytes())
+        self._matrix = None
+        self._write_log(records)
+        self._update_index(records, [row_values for _, row_values in latest.values()])
+
+    def _update_index(self, records: list[dict], values: list[np.ndarray]):
+        if self.ivf is None:
+            return
+        live = int(self.alive.sum())
+        if not self.ivf.is_trained:
+            if live >= self.min_train_rows:
+                self.ivf.train(self.matrix(), self.alive)
+        elif live > self.RETRAIN_GROWTH * self.ivf.trained_rows:
+            self.ivf.train(self.matrix(), self.alive)
+        else:
+            self.ivf.add([record["row"] for record in records], np.asarray(values, dtype=np.float32))
+
+    def query(self, vector: list[float], top_k: int, nprobe: Optional[int] = None, exact: bool = False) -> list[dict]:
+        matrix = self.matrix()
+        live = int(self.alive.sum())
+        if live == 0 or top_k <= 0:
+            return []
+        q = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+
+        if self.ivf is not None and self.ivf.is_trained and not exact:
+            rows = self.ivf.candidates(q, nprobe)
+            # Sorted rows make the memmap gather read the file front to back
+            rows = np.sort(rows[self.alive[rows]])
+            if len(rows) == 0:
+                return []
+            scores = matrix[rows] @ q
+        else:
+            rows = None
+            scores = matrix @ q
+            scores[~self.alive[:len(scores)]] = -np.inf
+
+        k = min(top_k, len(scores), live)
+        # argpartition is O(n); only the k winners get fully sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        hits = top if rows is None else rows[top]
+        return [
+            {"id": self.ids[row], "score": float(score), "metadata": self.metadata[row]}
+            for row, score in zip(hits, scores[top])
+        ]
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        rows = set()
+        for vector_id in ids or []:
+            if vector_id in self.row_of:
+                rows.add(self.row_of[vector_id])
+        if filter:
+            for row, metadata in enumerate(self.metadata):
+                if metadata is not None and matches_filter(metadata, filter):
+                    rows.add(row)
+        if not rows:
+            return
+        self._write_log([{"row": row, "deleted": True} for row in sorted(rows)])
+        if len(self.ids) and (1 - self.alive.sum() / len(self.ids)) > self.COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the namespace with only live rows."""
+        keep = np.flatnonzero(self.alive)
+        vectors = np.array(self.matrix()[keep]) if len(keep) else np.zeros((0, self.dim), dtype=np.float32)
+        records = [{"row": new_row, "id": self.ids[row], "metadata": self.metadata[row]} for new_row, row in enumerate(keep)]
+        self._matrix = None
+
+        tmp_vectors = self.vectors_path + ".tmp"
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_vectors, "wb") as f:
+            f.write(vectors.astype("<f4").tobytes())
+        with open(tmp_meta, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_meta, self.meta_path)
+
+        stat = os.stat(self.meta_path)
+        self._reset(stat.st_ino)
+        self.offset = stat.st_size
+        for record in records:
+            self._apply(record)
+        if self.ivf is not None:
+            self.ivf.remap(keep)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store: per-namespace float32 matrices in memory-mapped
+    files, scored by cosine similarity with vectorized top-k. Workers on one
+    host can share a directory. Suited to small tenants and offline tests.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        index_type: str = "exact",
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_train_rows: int = 10000,
+    ):
+        if index_type not in ("exact", "ivf"):
+            raise ValueError(f"Unsupported local vector index: {index_type}")
+        self.root_dir = root_dir
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_rows = min_train_rows
+        self._namespaces: dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def _namespace(self, namespace: str) -> _Namespace:
+        with self._lock:
+            if namespace not in self._namespaces:
+                safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in namespace)
+                path = os.path.join(self.root_dir, safe_name)
+                ivf = IVFIndex(path, nlist=self.nlist, nprobe=self.nprobe) if self.index_type == "ivf" else None
+                ns = self._namespaces[namespace] = _Namespace(path, ivf=ivf, min_train_rows=self.min_train_rows)
+                with ns.file_lock(exclusive=False):
+                    ns.sync()
+            return self._namespaces[namespace]
+
+    def upsert(self, namespace: str, vectors: list[dict]):
+        ns = self._namespace(namespace)
+        with ns.lock, ns.file_lock(exclusive=True):
+            ns.sync()
+            ns.upsert(vectors)
+
+    def query(
+        self,
+        namespace: str,
+        vector: list[float],
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+    ) -> list[dict]:
+        """Top-k by cosine similarity. nprobe overrides the IVF probe count; exact bypasses the index."""
+        ns = self._namespace(namespace)
+        with ns.lock, ns.file_lock(exclusive=False):
+            ns.sync()
+            return ns.query(vector, top_k, nprobe=nprobe, exact=exact)
+
+    def build_index(self, namespace: str):
+        """Train (or retrain) the namespace's IVF index now instead of waiting for min_train_rows."""
+        ns = self._namespace(namespace)
+        with ns.lock, ns.file_lock(exclusive=True):
+            ns.sync()
+            if ns.ivf is not None and ns.alive.any():
+                ns.ivf.train(ns.matrix(), ns.alive)
+
+    def delete(self, namespace: str, ids: Optional[list[str]] = None, filter: Optional[dict] = None):
+        ns = self._namespace(namespace)
+        with ns.lock, ns.file_lock(exclusive=True):
+            ns.sync()
+            ns.delete(ids=ids, filter=filter)
+
+
+_vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Return the configured vector store, creating it on first use."""
+    global _vector_store
+    with _vector_store_lock:
+        if _vector_store is None:
+            if VECTOR_STORE_BACKEND == "local":
+                _vector_store = LocalVectorStore(
+                    LOCAL_VECTOR_STORE_DIR,
+                    index_type=LOCAL_VECTOR_INDEX,
+                    nlist=LOCAL_VECTOR_IVF_NLIST,
+                    nprobe=LOCAL_VECTOR_IVF_NPROBE,
+                    min_train_rows=LOCAL_VECTOR_IVF_MIN_ROWS,
+                )
+            elif VECTOR_STORE_BACKEND == "pinecone":
+                from .pinecone_client import index
+                _vector_store = PineconeVectorStore(index)
+            else:
+                raise ValueError(f"Unsupported vector store backend: {VECTOR_STORE_BACKEND}")
+        return _vector_store
@@ -0,0 +1,125 @@
+# server/app/services/vector_upserter.py
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+
+from .vector_store import VectorStore
+from ..config import (
+    VECTOR_UPSERT_BATCH_SIZE,
+    VECTOR_UPSERT_MAX_BYTES,
+    VECTOR_UPSERT_MAX_WORKERS,
+    VECTOR_UPSERT_MAX_RETRIES,
+    VECTOR_UPSERT_RETRY_BASE_DELAY,
+    VECTOR_UPSERT_RETRY_MAX_DELAY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Shared by every ingestion job, so total in-flight upsert requests stay bounded
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=VECTOR_UPSERT_MAX_WORKERS, thread_name_prefix="upsert")
+        return _executor
+
+
+def vector_size(vector: dict) -> int:
+    """Approximate bytes a vector adds to a JSON upsert request."""
+    return len(json.dumps(vector, separators=(",", ":")).encode("utf-8"))
+
+
+def iter_batches(
+    vectors: list[dict],
+    max_vectors: int = VECTOR_UPSERT_BATCH_SIZE,
+    max_bytes: int = VECTOR_UPSERT_MAX_BYTES,
+) -> Iterator[list[dict]]:
+    """Split vectors into batches that respect both a vector count and a serialized size limit."""
+    batch, batch_bytes = [], 0
+    for vector in vectors:
+        size = vector_size(vector)
+        if batch and (len(batch) >= max_vectors or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        # A single oversized vector still goes out alone; the store rejects it with a clear error
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Throttling (429), server errors (5xx) and dropped or timed out
+    connections. Anything else, such as a rejected vector or a dimension
+    mismatch, fails the same way when resent.
+    """
+    # Pinecone API errors carry the HTTP status
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, Urllib3HTTPError))
+
+
+def _upsert_with_retry(store: VectorStore, namespace: str, batch: list[dict], max_retries: int):
+    """Vector ids are fixed before the first attempt, so resending a batch overwrites rather than duplicates."""
+    attempt = 0
+    while True:
+        try:
+            return store.upsert(namespace, batch)
+        except Exception as e:
+            if attempt >= max_retries or not is_transient(e):
+                raise
+            delay = random.uniform(0, min(VECTOR_UPSERT_RETRY_MAX_DELAY, VECTOR_UPSERT_RETRY_BASE_DELAY * (2 ** attempt)))
+            logger.warning(f"Upsert of {len(batch)} vectors to {namespace} failed ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def upsert_in_batches(
+    store: VectorStore,
+    namespace: str,
+    vectors: list[dict],
+    max_vectors: int = VECTOR_UPSERT_BATCH_SIZE,
+    max_bytes: int = VECTOR_UPSERT_MAX_BYTES,
+    max_retries: int = VECTOR_UPSERT_MAX_RETRIES,
+) -> dict:
+    """
+    Upsert vectors as size-bounded batches sent concurrently on the shared
+    upsert pool. Raises the first batch error once every batch has finished
+    or given up. Returns counts and throughput in vectors/second.
+    """
+    start = time.perf_counter()
+    batches = list(iter_batches(vectors, max_vectors, max_bytes))
+    if len(batches) <= 1:
+        for batch in batches:
+            _upsert_with_retry(store, namespace, batch, max_retries)
+    else:
+        futures = [_get_executor().submit(_upsert_with_retry, store, namespace, batch, max_retries) for batch in batches]
+        errors = [future.exception() for future in futures]
+        first_error = next((e for e in errors if e is not None), None)
+        if first_error is not None:
+            raise first_error
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "vectors": len(vectors),
+        "batches": len(batches),
+        "seconds": elapsed,
+        "vectors_per_second": len(vectors) / elapsed if elapsed > 0 else float("inf"),
+    }
+    logger.info(
+        f"Upserted {stats['vectors']} vectors in {stats['batches']} batches to {namespace} "
+        f"in {elapsed:.2f}s ({stats['vectors_per_second']:.0f} vectors/s)"
+    )
+    return stats
@@ -0,0 +1,92 @@
+# server/benchmarks/ann_recall.py
+"""
+Recall@k and latency of the local IVF index against exact search.
+
+Run from server/:
+    python -m benchmarks.ann_recall --vectors 200000 --dim 256 --nprobe 1 4 8 16 32
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.vector_store import LocalVectorStore
+
+
+def make_dataset(num_vectors: int, dim: int, num_clusters: int, seed: int = 0) -> np.ndarray:
+    """Gaussian blobs around random centres, roughly how document embeddings cluster by topic."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, size=num_vectors)
+    return centres[labels] + 0.5 * rng.normal(size=(num_vectors, dim)).astype(np.float32)
+
+
+def percentile_ms(samples: list[float], pct: float) -> float:
+    return float(np.percentile(samples, pct) * 1000)
+
+
+def run(num_vectors: int, dim: int, num_clusters: int, num_queries: int, top_k: int, nlist: int, nprobes: list[int]) -> dict:
+    data = make_dataset(num_vectors, dim, num_clusters)
+    rng = np.random.default_rng(1)
+    queries = data[rng.integers(0, num_vectors, size=num_queries)] + 0.1 * rng.normal(size=(num_queries, dim)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalVectorStore(root, index_type="ivf", nlist=nlist, min_train_rows=num_vectors + 1)
+        for start in range(0, num_vectors, 10000):
+            batch = data[start:start + 10000]
+            store.upsert("bench", [{"id": str(start + i), "values": v, "metadata": {}} for i, v in enumerate(batch)])
+        build_start = time.perf_counter()
+        store.build_index("bench")
+        build_seconds = time.perf_counter() - build_start
+
+        exact_ids, exact_times = [], []
+        for q in queries:
+            t = time.perf_counter()
+            matches = store.query("bench", q, top_k=top_k, exact=True)
+            exact_times.append(time.perf_counter() - t)
+            exact_ids.append({m["id"] for m in matches})
+
+        results = {
+            "vectors": num_vectors,
+            "dim": dim,
+            "top_k": top_k,
+            "nlist": len(store._namespace("bench").ivf.centroids),
+            "build_seconds": build_seconds,
+            "exact": {"p50_ms": percentile_ms(exact_times, 50), "p95_ms": percentile_ms(exact_times, 95)},
+            "ivf": [],
+        }
+        for nprobe in nprobes:
+            times, recalls = [], []
+            for q, truth in zip(queries, exact_ids):
+                t = time.perf_counter()
+                matches = store.query("bench", q, top_k=top_k, nprobe=nprobe)
+                times.append(time.perf_counter() - t)
+                recalls.append(len(truth & {m["id"] for m in matches}) / len(truth))
+            results["ivf"].append({
+                "nprobe": nprobe,
+                f"recall@{top_k}": float(np.mean(recalls)),
+                "p50_ms": percentile_ms(times, 50),
+                "p95_ms": percentile_ms(times, 95),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = sqrt(vectors)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    results = run(args.vectors, args.dim, args.clusters, args.queries, args.top_k, args.nlist, args.nprobe)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
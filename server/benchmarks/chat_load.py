@@ -0,0 +1,155 @@
+# server/benchmarks/chat_load.py
+"""
+Throughput of the sync and async chat paths under concurrent requests.
+
+Bedrock is replaced by a fixed delay, so the numbers show how many turns a
+single worker keeps in flight while waiting on the model, not model speed.
+The sync path runs run_chat in a `def` handler (one threadpool thread per
+request); the async path awaits arun_chat on the event loop. Both use a
+temporary SQLite database.
+
+Run from server/ with the usual .env in place:
+    python -m benchmarks.chat_load --requests 400 --concurrency 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, async_database_url
+from app.models import ChatSession, User
+from app.services import bedrock_async, bedrock_client, query_handler
+
+
+def _fast_sqlite(dbapi_connection, connection_record):
+    # Keep per-commit fsyncs from dominating; the benchmark is about waiting on the model
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+def make_app(database_url: str) -> FastAPI:
+    sync_engine = create_engine(database_url, connect_args={"check_same_thread": False}, pool_size=50)
+    # SQLite takes one writer at a time; a single async connection queues writes instead of busy-retrying them
+    async_engine = create_async_engine(async_database_url(database_url), pool_size=1, max_overflow=0)
+    for target in (sync_engine, async_engine.sync_engine):
+        event.listen(target, "connect", _fast_sqlite)
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+    AsyncSession = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    def sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.post("/sync/{session_id}")
+    def sync_chat(session_id: int, db=Depends(sync_db)):
+        return {"response": query_handler.run_chat(db, 1, session_id, "claude", "Be brief.", "Hello?")}
+
+    @app.post("/async/{session_id}")
+    async def async_chat(session_id: int, db=Depends(async_db)):
+        return {"response": await query_handler.arun_chat(db, 1, session_id, "claude", "Be brief.", "Hello?")}
+
+    Base.metadata.create_all(sync_engine)
+    return app, SyncSession, async_engine
+
+
+def seed(SyncSession, num_sessions: int):
+    db = SyncSession()
+    db.add(User(id=1, email="bench@example.com", first_name="Bench", last_name="User", hashed_password="x"))
+    db.add_all(ChatSession(id=i, user_id=1, title=f"bench {i}") for i in range(1, num_sessions + 1))
+    db.commit()
+    db.close()
+
+
+def stub_bedrock(latency: float):
+    def call_bedrock_model(model_key, prompt):
+        time.sleep(latency)
+        return "stub reply"
+
+    async def async_call_bedrock_model(model_key, prompt):
+        await asyncio.sleep(latency)
+        return "stub reply"
+
+    bedrock_client.call_bedrock_model = call_bedrock_model
+    bedrock_async.async_call_bedrock_model = async_call_bedrock_model
+    # Every turn would otherwise be a first turn and embed the question for the answer cache
+    query_handler.answer_cache = None
+
+
+async def load(app: FastAPI, path: str, num_requests: int, concurrency: int, num_sessions: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(client: httpx.AsyncClient, i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(f"/{path}/{i % num_sessions + 1}")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(num_requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": num_requests,
+        "seconds": elapsed,
+        "requests_per_second": num_requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+async def compare(app: FastAPI, async_engine, num_requests: int, concurrency: int) -> dict:
+    try:
+        return {
+            "sync": await load(app, "sync", num_requests, concurrency, concurrency),
+            "async": await load(app, "async", num_requests, concurrency, concurrency),
+        }
+    finally:
+        await async_engine.dispose()
+
+
+def run(num_requests: int, concurrency: int, latency: float) -> dict:
+    stub_bedrock(latency)
+    with tempfile.TemporaryDirectory() as root:
+        app, SyncSession, async_engine = make_app(f"sqlite:///{os.path.join(root, 'bench.db')}")
+        # One session per in-flight request, so turns never queue on the same session
+        seed(SyncSession, concurrency)
+        results = asyncio.run(compare(app, async_engine, num_requests, concurrency))
+        return {"concurrency": concurrency, "model_latency_s": latency, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated model latency in seconds")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.requests, args.concurrency, args.latency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# server/benchmarks/chunking.py
+"""
+Chunks per second and megabytes per second for each chunking strategy on
+large synthetic documents.
+
+The text mixes headings, prose paragraphs and pipe tables and is fed to the
+chunker line by line, as text uploads are. Each size is run in turn, so
+throughput that falls as the text grows shows super-linear cost. If
+LangChain happens to be installed, its RecursiveCharacterTextSplitter is
+timed on the same text (sized in characters at the same ratio) for
+comparison; it is not a dependency.
+
+Run from server/ with the usual .env in place:
+    python -m benchmarks.chunking --sizes-mb 1 4 16 --chunk-size 128
+"""
+import argparse
+import json
+import random
+import time
+
+from app.config import CHARS_PER_TOKEN
+from app.services.chunker import CHUNK_STRATEGIES, iter_chunks
+
+WORDS = [
+    "policy", "retrieval", "customer", "invoice", "latency", "contract", "region", "schedule", "vector",
+    "account", "quarter", "approval", "renewal", "storage", "pipeline", "request", "summary", "release",
+]
+
+
+def make_lines(rng: random.Random, size_bytes: int) -> list[str]:
+    lines = []
+    length = 0
+    section = 0
+    while length < size_bytes:
+        section += 1
+        block = [f"## Section {section}", ""]
+        for _ in range(rng.randint(2, 6)):
+            # Wrapped prose, one paragraph per blank-line-separated run
+            for _ in range(rng.randint(3, 12)):
+                block.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))).capitalize() + ".")
+            block.append("")
+        if rng.random() < 0.3:
+            block.append("| item | owner | status |")
+            block.append("|---|---|---|")
+            block.extend(f"| {rng.choice(WORDS)} {i} | {rng.choice(WORDS)} | {rng.choice(WORDS)} |"
+                         for i in range(rng.randint(5, 60)))
+            block.append("")
+        lines.extend(block)
+        length += sum(len(line) + 1 for line in block)
+    return lines
+
+
+def _langchain_splitter(chunk_size: int, chunk_overlap: int):
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        return None
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size * CHARS_PER_TOKEN, chunk_overlap=chunk_overlap * CHARS_PER_TOKEN
+    )
+
+
+def run(sizes_mb: list[float], chunk_size: int, chunk_overlap: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    langchain = _langchain_splitter(chunk_size, chunk_overlap)
+    results = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "runs": []}
+    for size_mb in sizes_mb:
+        lines = make_lines(rng, int(size_mb * 1024 * 1024))
+        megabytes = sum(len(line) + 1 for line in lines) / (1024 * 1024)
+        timings = {}
+        for strategy in CHUNK_STRATEGIES:
+            start = time.perf_counter()
+            num_chunks = sum(1 for _ in iter_chunks(iter(lines), strategy, chunk_size=chunk_size, chunk_overlap=chunk_overlap))
+            timings[strategy] = (num_chunks, time.perf_counter() - start)
+        if langchain is not None:
+            start = time.perf_counter()
+            num_chunks = len(langchain.split_text("\n".join(lines)))
+            timings["langchain_recursive"] = (num_chunks, time.perf_counter() - start)
+        for name, (num_chunks, elapsed) in timings.items():
+            results["runs"].append({
+                "strategy": name,
+                "megabytes": round(megabytes, 2),
+                "chunks": num_chunks,
+                "seconds": elapsed,
+                "chunks_per_second": num_chunks / elapsed,
+                "megabytes_per_second": megabytes / elapsed,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--chunk-size", type=int, default=128, help="Tokens per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=12, help="Tokens of overlap")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.sizes_mb, args.chunk_size, args.chunk_overlap, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# server/benchmarks/compare.py
+"""
+Compare two benchmark suite results and flag regressions.
+
+Throughputs (*_per_second) should not fall and latencies (*_ms) and memory
+(*_mb) should not rise by more than --tolerance. Exits 1 if any did, so it
+can gate a change in CI:
+    python -m benchmarks.compare before.json after.json --tolerance 0.1
+"""
+import argparse
+import json
+import sys
+
+
+def flatten(tree: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def direction(path: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if the value is informational."""
+    if path.endswith("_per_second"):
+        return 1
+    if path.endswith(("_ms", "_mb")):
+        return -1
+    return 0
+
+
+def compare(before: dict, after: dict, tolerance: float) -> list[dict]:
+    old, new = flatten(before["results"]), flatten(after["results"])
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        sign = direction(path)
+        if not sign or not old[path]:
+            continue
+        change = (new[path] - old[path]) / old[path]
+        rows.append({
+            "metric": path,
+            "before": old[path],
+            "after": new[path],
+            "change": change,
+            "regression": sign * change < -tolerance,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change allowed before flagging")
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    rows = compare(before, after, args.tolerance)
+
+    if args.json:
+        print(json.dumps({"before": before["meta"], "after": after["meta"], "metrics": rows}, indent=2))
+    else:
+        print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:<50} {row['before']:>12.2f} {row['after']:>12.2f} {row['change']:>+8.1%} {flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# server/benchmarks/fakes.py
+"""
+In-process stand-ins for Bedrock, Pinecone and S3 with configurable latency
+and throttling, so the server can be benchmarked without AWS or Pinecone.
+
+They are installed below the app's own client code (the boto3 clients, the
+Pinecone index and the async Bedrock HTTP transport), so request building,
+response parsing, retries and backoff all run as they do in production.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import unquote
+
+import httpx
+import numpy as np
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError
+
+from app.config import BEDROCK_MODEL_EMBEDDING
+from app.services import bedrock_async, bedrock_client, s3_client, vector_store
+
+
+class LatencyModel:
+    """
+    Log-normal service latency around a median, with an independent chance of
+    each call being throttled. jitter is the sigma of the underlying normal:
+    0 gives a constant latency, 0.5 a p99 about 3x the median.
+    """
+
+    def __init__(self, median: float, jitter: float = 0.0, throttle_rate: float = 0.0, seed: int = 0):
+        self.median = median
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+
+    def draw(self) -> tuple[float, bool]:
+        """Latency for the next call, and whether it is throttled."""
+        with self._lock:
+            self.calls += 1
+            latency = self.median * math.exp(self.jitter * self._random.gauss(0.0, 1.0)) if self.median else 0.0
+            throttled = self._random.random() < self.throttle_rate
+            self.throttled += throttled
+        return latency, throttled
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "throttled": self.throttled}
+
+
+def fake_embedding(text: str, dim: int) -> list[float]:
+    """A deterministic unit vector per text, so identical texts embed identically."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def _client_error(code: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": "Rate exceeded"}}, operation)
+
+
+class _Responder:
+    """Model responses shared by the sync and async Bedrock fakes."""
+
+    def __init__(self, generation: LatencyModel, embedding: LatencyModel, dim: int, reply_words: int):
+        self.generation = generation
+        self.embedding = embedding
+        self.dim = dim
+        self.reply = " ".join(["benchmark"] * reply_words)
+
+    def latency_model(self, model_id: str) -> LatencyModel:
+        return self.embedding if model_id == BEDROCK_MODEL_EMBEDDING else self.generation
+
+    def respond(self, model_id: str, body: dict) -> dict:
+        if model_id == BEDROCK_MODEL_EMBEDDING:
+            return {"embedding": fake_embedding(body["inputText"], self.dim), "inputTextTokenCount": 0}
+        if "claude" in model_id:
+            return {
+                "content": [{"type": "text", "text": self.reply}],
+                "usage": {"input_tokens": 0, "output_tokens": len(self.reply.split())},
+            }
+        return {"results": [{"outputText": self.reply}]}
+
+
+class FakeBedrockRuntime:
+    """The invoke_model surface of a boto3 bedrock-runtime client."""
+
+    def __init__(self, responder: _Responder):
+        self.responder = responder
+
+    def invoke_model(self, body: str, modelId: str, **kwargs) -> dict:
+        latency, throttled = self.responder.latency_model(modelId).draw()
+        time.sleep(latency)
+        if throttled:
+            raise _client_error("ThrottlingException", "InvokeModel")
+        response = self.responder.respond(modelId, json.loads(body))
+        return {"body": io.BytesIO(json.dumps(response).encode("utf-8"))}
+
+
+def fake_bedrock_transport(responder: _Responder) -> httpx.AsyncBaseTransport:
+    """An httpx transport answering AsyncBedrockClient.invoke the way the Bedrock HTTP API does."""
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        # Paths look like /model/{quoted model id}/invoke
+        model_id = unquote(request.url.raw_path.decode().split("/")[2])
+        latency, throttled = responder.latency_model(model_id).draw()
+        await asyncio.sleep(latency)
+        if throttled:
+            return httpx.Response(
+                429, headers={"x-amzn-errortype": "ThrottlingException:http://internal.amazon.com/coral/"},
+                json={"message": "Rate exceeded"},
+            )
+        return httpx.Response(200, json=responder.respond(model_id, json.loads(request.content)))
+
+    return httpx.MockTransport(handle)
+
+
+class FakeThrottled(Exception):
+    """What the Pinecone client raises on HTTP 429; the upserter retries any exception."""
+
+
+class FakePineconeIndex:
+    """The upsert/query/delete surface of pinecone.Index, held in memory with exact cosine search."""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self._namespaces: dict[str, dict[str, tuple[np.ndarray, dict]]] = {}
+        self._matrices: dict[str, tuple[list[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _call(self):
+        latency, throttled = self.latency.draw()
+        time.sleep(latency)
+        if throttled:
+            raise FakeThrottled("(429) Too Many Requests")
+
+    def upsert(self, vectors: list[dict], namespace: str = ""):
+        self._call()
+        with self._lock:
+            rows = self._namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                rows[vector["id"]] = (np.asarray(vector["values"], dtype=np.float32), vector.get("metadata", {}))
+            self._matrices.pop(namespace, None)
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector: list[float], top_k: int = 5, namespace: str = "", include_metadata: bool = False, **kwargs):
+        self._call()
+        with self._lock:
+            rows = self._namespaces.get(namespace, {})
+            if namespace not in self._matrices:
+                ids = list(rows)
+                matrix = np.stack([rows[i][0] for i in ids]) if ids else np.zeros((0, len(vector)), dtype=np.float32)
+                self._matrices[namespace] = (ids, matrix)
+            ids, matrix = self._matrices[namespace]
+            scores = matrix @ np.asarray(vector, dtype=np.float32)
+            top = np.argsort(-scores)[:top_k]
+            matches = [
+                {"id": ids[i], "score": float(scores[i]), "metadata": rows[ids[i]][1] if include_metadata else {}}
+                for i in top
+            ]
+        return {"matches": matches, "namespace": namespace}
+
+    def delete(self, ids: Optional[list[str]] = None, filter: Optional[dict] = None, namespace: str = ""):
+        self._call()
+        with self._lock:
+            rows = self._namespaces.get(namespace, {})
+            doomed = set(ids or [])
+            if filter:
+                doomed |= {i for i, (_, metadata) in rows.items() if all(metadata.get(k) == v for k, v in filter.items())}
+            for vector_id in doomed:
+                rows.pop(vector_id, None)
+            self._matrices.pop(namespace, None)
+        return {}
+
+
+class FakeS3:
+    """The put_object/delete_object surface of a boto3 S3 client; objects are counted, not kept."""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.objects: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, operation: str):
+        latency, throttled = self.latency.draw()
+        time.sleep(latency)
+        if throttled:
+            raise _client_error("SlowDown", operation)
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs):
+        self._call("PutObject")
+        with self._lock:
+            self.objects[Key] = len(Body)
+        return {}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs):
+        self._call("DeleteObject")
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: dict, ExpiresIn: int = 3600) -> str:
+        return f"https://{Params['Bucket']}.s3.fake/{Params['Key']}?expires={ExpiresIn}"
+
+
+class FakeServices:
+    """The fakes for one benchmark run, with their latency models."""
+
+    def __init__(
+        self,
+        generation: LatencyModel,
+        embedding: LatencyModel,
+        vectors: LatencyModel,
+        storage: LatencyModel,
+        dim: int = 1024,
+        reply_words: int = 120,
+    ):
+        self.latencies = {"generation": generation, "embedding": embedding, "vectors": vectors, "storage": storage}
+        self.responder = _Responder(generation, embedding, dim, reply_words)
+        self.bedrock = FakeBedrockRuntime(self.responder)
+        self.pinecone = FakePineconeIndex(vectors)
+        self.s3 = FakeS3(storage)
+
+    def stats(self) -> dict:
+        return {name: model.stats() for name, model in self.latencies.items()}
+
+
+@contextmanager
+def installed(fakes: FakeServices):
+    """Route the app's Bedrock, Pinecone and S3 calls to fakes for the duration of the block."""
+    saved = (bedrock_client.client, bedrock_async._client, vector_store._vector_store, s3_client.s3_client)
+    bedrock_client.client = fakes.bedrock
+    bedrock_async._client = bedrock_async.AsyncBedrockClient(
+        transport=fake_bedrock_transport(fakes.responder), credentials=Credentials("bench", "bench")
+    )
+    vector_store._vector_store = vector_store.PineconeVectorStore(fakes.pinecone)
+    s3_client.s3_client = fakes.s3
+    try:
+        yield fakes
+    finally:
+        bedrock_client.client, bedrock_async._client, vector_store._vector_store, s3_client.s3_client = saved
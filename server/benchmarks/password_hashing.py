@@ -0,0 +1,64 @@
+# server/benchmarks/password_hashing.py
+"""
+Password verifications (logins) per second for each bcrypt cost and pool size.
+
+Each configuration runs a burst of concurrent verifications through a
+PasswordHashingPool, as the login route does. Divide by the worker count
+for logins/second per core; it should stay flat while workers <= cores.
+
+Run from server/ with the usual .env in place:
+    python -m benchmarks.password_hashing --rounds 10 12 --workers 1 2 4 --logins 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from passlib.context import CryptContext
+
+from app.services.password_hasher import PasswordHashingPool
+
+
+async def burst(pool: PasswordHashingPool, context: CryptContext, hashed: str, num_logins: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(pool.run(context.verify, "benchmark-password", hashed) for _ in range(num_logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return elapsed
+
+
+def run(rounds: list[int], workers: list[int], num_logins: int) -> dict:
+    results = {"cpus": os.cpu_count(), "logins": num_logins, "runs": []}
+    for cost in rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=cost)
+        hashed = context.hash("benchmark-password")
+        for size in workers:
+            # Queue deep enough for the whole burst, so nothing is shed while measuring
+            pool = PasswordHashingPool(max_workers=size, max_queue=num_logins)
+            try:
+                elapsed = asyncio.run(burst(pool, context, hashed, num_logins))
+            finally:
+                pool.shutdown()
+            results["runs"].append({
+                "rounds": cost,
+                "workers": size,
+                "logins_per_second": num_logins / elapsed,
+                # Workers beyond the CPU count add no hashing capacity
+                "logins_per_second_per_core": num_logins / elapsed / min(size, os.cpu_count() or 1),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rounds, args.workers, args.logins), indent=2))
+
+
+if __name__ == "__main__":
+    main()
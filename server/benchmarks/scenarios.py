@@ -0,0 +1,190 @@
+# server/benchmarks/scenarios.py
+"""
+Scenario drivers for the offline benchmark suite. Each one runs against
+whatever fakes are installed and the database in DATABASE_URL, and returns
+a JSON-serialisable dict of results.
+"""
+import asyncio
+import random
+import resource
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+
+from app.auth import create_access_token, token_claims
+from app.database import create_tables, get_async_engine, session_scope
+from app.main import app
+from app.models import ChatSession, User
+from app.services import metrics
+from app.services.document_processor import process_and_store_document
+
+BENCH_USER_ID = 1
+VOCABULARY = [
+    "retrieval", "vector", "embedding", "session", "latency", "throughput", "document", "chunk", "index",
+    "query", "model", "prompt", "context", "cache", "token", "stream", "upload", "storage", "search",
+    "answer", "ranking", "pipeline", "worker", "batch", "request", "response", "database", "commit",
+]
+
+
+class StageSamples:
+    """Collects every stage duration recorded while active, for exact percentiles."""
+
+    def __init__(self):
+        self.samples: dict[tuple[str, str], list[float]] = defaultdict(list)
+        self._observe = None
+
+    def __enter__(self):
+        self._observe = observe = metrics.stage_seconds.observe
+
+        def record(value: float, **labels):
+            self.samples[(labels.get("pipeline", ""), labels.get("stage", ""))].append(value)
+            observe(value, **labels)
+
+        metrics.stage_seconds.observe = record
+        return self
+
+    def __exit__(self, *exc):
+        metrics.stage_seconds.observe = self._observe
+
+    def summary(self, pipeline: str) -> dict:
+        return {stage: distribution(values) for (name, stage), values in sorted(self.samples.items()) if name == pipeline}
+
+
+def distribution(seconds: list[float]) -> dict:
+    if not seconds:
+        return {"count": 0}
+    values = np.asarray(seconds) * 1000
+    return {
+        "count": len(seconds),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def seed_user():
+    create_tables()
+    with session_scope() as db:
+        if db.get(User, BENCH_USER_ID) is None:
+            db.add(User(id=BENCH_USER_ID, email="bench@example.com", first_name="Bench", last_name="User",
+                        hashed_password="x"))
+            db.commit()
+
+
+def make_document(rng: random.Random, size_bytes: int) -> bytes:
+    words = []
+    length = 0
+    while length < size_bytes:
+        sentence = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        words.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(words).encode("utf-8")
+
+
+def ingestion(num_docs: int, doc_kb: int, concurrency: int, seed: int = 0) -> dict:
+    """Ingest num_docs synthetic text documents, concurrency at a time, as ingestion workers do."""
+    seed_user()
+    rng = random.Random(seed)
+    documents = [(f"bench-{i}.txt", make_document(rng, doc_kb * 1024)) for i in range(num_docs)]
+    rss_before = peak_rss_mb()
+
+    def ingest(document: tuple[str, bytes]) -> dict:
+        filename, file_bytes = document
+        return process_and_store_document(BENCH_USER_ID, filename, file_bytes)
+
+    failures = 0
+    num_chunks = 0
+    with StageSamples() as stages, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(ingest, document) for document in documents]
+        for future in futures:
+            try:
+                num_chunks += future.result()["num_chunks"]
+            except Exception:
+                failures += 1
+        elapsed = time.perf_counter() - start
+
+    return {
+        "documents": num_docs,
+        "document_kb": doc_kb,
+        "concurrency": concurrency,
+        "failures": failures,
+        "seconds": elapsed,
+        "docs_per_second": (num_docs - failures) / elapsed,
+        "chunks_per_second": num_chunks / elapsed,
+        "chunks": num_chunks,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": peak_rss_mb() - rss_before,
+        "stages": stages.summary("ingestion"),
+    }
+
+
+async def _chat_load(num_requests: int, concurrency: int, session_ids: list[int], body: dict, token: str) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(client: httpx.AsyncClient, i: int):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            # Distinct questions, so neither the embedding nor the answer cache short-circuits a turn
+            question = f"Question {i}: how is {VOCABULARY[i % len(VOCABULARY)]} handled?"
+            payload = {**body, "session_id": session_ids[i % len(session_ids)], "user_input": question}
+            response = await client.post("/chat/", json=payload, headers={"Authorization": f"Bearer {token}"})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures += 1
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(one(client, i) for i in range(num_requests)))
+            elapsed = time.perf_counter() - start
+    finally:
+        # aiosqlite connections run on their own threads and would keep the process alive
+        await get_async_engine().dispose()
+    return elapsed, latencies, failures
+
+
+def chat(num_requests: int, concurrency: int, num_sessions: int, model: str = "claude",
+         enable_rag: bool = True, retrieval_mode: str = "dense") -> dict:
+    """Send num_requests chat turns through the async /chat/ route, concurrency at a time."""
+    seed_user()
+    with session_scope() as db:
+        sessions = [ChatSession(user_id=BENCH_USER_ID, title=f"bench {i}") for i in range(num_sessions)]
+        db.add_all(sessions)
+        db.commit()
+        session_ids = [session.id for session in sessions]
+        token = create_access_token(token_claims(db.get(User, BENCH_USER_ID)))
+
+    body = {"model": model, "system_prompt": "Answer briefly.", "enable_rag": enable_rag, "retrieval_mode": retrieval_mode}
+    with StageSamples() as stages:
+        elapsed, latencies, failures = asyncio.run(_chat_load(num_requests, concurrency, session_ids, body, token))
+
+    return {
+        "requests": num_requests,
+        "concurrency": concurrency,
+        "sessions": num_sessions,
+        "model": model,
+        "enable_rag": enable_rag,
+        "retrieval_mode": retrieval_mode,
+        "failures": failures,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "latency": distribution(latencies),
+        "stages": stages.summary("chat"),
+    }
@@ -0,0 +1,138 @@
+# server/benchmarks/suite.py
+"""
+Offline benchmark suite: ingestion and chat throughput and per-stage latency
+with Bedrock, Pinecone and S3 replaced by in-process fakes.
+
+Each run uses a throwaway SQLite database (or --database-url) and writes
+JSON tagged with the git commit, so runs can be compared across commits:
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json
+    python -m benchmarks.compare before.json after.json
+
+Run from server/ with the usual .env in place; its AWS and Pinecone
+settings are never used.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+
+def git_commit() -> dict:
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def configure_environment(workdir: str, database_url: str):
+    """Point the app at scratch storage; must run before any app module reads its config."""
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}?timeout=30"
+    os.environ["BM25_INDEX_DIR"] = os.path.join(workdir, "bm25_index")
+    os.environ["INGESTION_SPOOL_DIR"] = os.path.join(workdir, "spool")
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+
+def _fast_sqlite(dbapi_connection, connection_record):
+    # Let ingestion workers and chat turns write concurrently without per-commit fsyncs
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+def run(args: argparse.Namespace) -> dict:
+    from sqlalchemy import event
+
+    from app import database
+    from benchmarks import scenarios
+    from benchmarks.fakes import FakeServices, LatencyModel, installed
+
+    if database.engine.dialect.name == "sqlite":
+        event.listen(database.engine, "connect", _fast_sqlite)
+        event.listen(database.get_async_engine().sync_engine, "connect", _fast_sqlite)
+
+    def latency(median: float, seed: int) -> LatencyModel:
+        return LatencyModel(median, args.jitter, args.throttle_rate, seed=args.seed + seed)
+
+    fakes = FakeServices(
+        generation=latency(args.model_latency, 1),
+        embedding=latency(args.embed_latency, 2),
+        vectors=latency(args.vector_latency, 3),
+        storage=latency(args.s3_latency, 4),
+        dim=args.dim,
+    )
+    results = {}
+    with installed(fakes):
+        if "ingestion" in args.scenarios:
+            results["ingestion"] = scenarios.ingestion(args.docs, args.doc_kb, args.ingest_concurrency, seed=args.seed)
+        if "chat" in args.scenarios:
+            results["chat"] = scenarios.chat(
+                args.requests, args.chat_concurrency, args.sessions,
+                enable_rag=not args.no_rag, retrieval_mode=args.retrieval_mode,
+            )
+    results["fake_calls"] = fakes.stats()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=["ingestion", "chat"], default=["ingestion", "chat"])
+    parser.add_argument("--output", help="write results here instead of stdout")
+    parser.add_argument("--database-url", help="benchmark against this database instead of a scratch SQLite file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show the app's retry and error logs")
+    fakes = parser.add_argument_group("fake services (seconds are medians of a log-normal)")
+    fakes.add_argument("--model-latency", type=float, default=0.5)
+    fakes.add_argument("--embed-latency", type=float, default=0.03)
+    fakes.add_argument("--vector-latency", type=float, default=0.02)
+    fakes.add_argument("--s3-latency", type=float, default=0.05)
+    fakes.add_argument("--jitter", type=float, default=0.3, help="log-normal sigma; 0 for constant latency")
+    fakes.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls rejected as throttled")
+    fakes.add_argument("--dim", type=int, default=1024, help="embedding dimension")
+    ingestion = parser.add_argument_group("ingestion")
+    ingestion.add_argument("--docs", type=int, default=40)
+    ingestion.add_argument("--doc-kb", type=int, default=64)
+    ingestion.add_argument("--ingest-concurrency", type=int, default=4)
+    chat = parser.add_argument_group("chat")
+    chat.add_argument("--requests", type=int, default=400)
+    chat.add_argument("--chat-concurrency", type=int, default=50)
+    chat.add_argument("--sessions", type=int, default=50)
+    chat.add_argument("--retrieval-mode", choices=["dense", "sparse", "hybrid"], default="dense")
+    chat.add_argument("--no-rag", action="store_true")
+    args = parser.parse_args()
+    # Throttled calls are expected here; their retries and failures are counted in the results instead
+    logging.getLogger("app").setLevel(logging.WARNING if args.verbose else logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as workdir:
+        configure_environment(workdir, args.database_url)
+        report = {
+            "meta": {
+                **git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": vars(args),
+            },
+            "results": run(args),
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# server/migrations/helpers.py
+"""
+Idempotent schema steps for revisions. The app also runs create_all on
+startup, which creates missing tables whole but never alters existing ones,
+so a revision may find its table absent (create_all will make it later) or
+already up to date (create_all made it); both are skipped.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def has_table(table: str) -> bool:
+    return _inspector().has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    inspector = _inspector()
+    return inspector.has_table(table) and column in {c["name"] for c in inspector.get_columns(table)}
+
+
+def has_index(table: str, name: str) -> bool:
+    inspector = _inspector()
+    return inspector.has_table(table) and name in {i["name"] for i in inspector.get_indexes(table)}
+
+
+def add_column(table: str, column: sa.Column):
+    if has_table(table) and not has_column(table, column.name):
+        op.add_column(table, column)
+
+
+def drop_column(table: str, column: str):
+    if has_column(table, column):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
+
+
+def create_index(name: str, table: str, columns: list[str], unique: bool = False):
+    if has_table(table) and not has_index(table, name):
+        op.create_index(name, table, columns, unique=unique)
+
+
+def drop_index(name: str, table: str):
+    if has_index(table, name):
+        op.drop_index(name, table_name=table)
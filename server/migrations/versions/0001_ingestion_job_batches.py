@@ -0,0 +1,24 @@
+"""Bulk upload batches: ingestion_jobs.batch_id
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, create_index, drop_column, drop_index
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("ingestion_jobs", sa.Column("batch_id", sa.String(36)))
+    create_index("ix_ingestion_jobs_batch_id", "ingestion_jobs", ["batch_id"])
+
+
+def downgrade():
+    drop_index("ix_ingestion_jobs_batch_id", "ingestion_jobs")
+    drop_column("ingestion_jobs", "batch_id")
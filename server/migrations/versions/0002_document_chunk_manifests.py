@@ -0,0 +1,34 @@
+"""Re-upload diffing: documents.content_hash and the document_chunks manifest
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import add_column, drop_column, has_table
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("documents", sa.Column("content_hash", sa.String(64)))
+    if not has_table("document_chunks"):
+        op.create_table(
+            "document_chunks",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("document_id", sa.Integer, sa.ForeignKey("documents.id"), nullable=False, index=True),
+            sa.Column("vector_id", sa.String, nullable=False),
+            sa.Column("chunk_index", sa.Integer, nullable=False),
+            sa.UniqueConstraint("document_id", "vector_id"),
+        )
+
+
+def downgrade():
+    if has_table("document_chunks"):
+        op.drop_table("document_chunks")
+    drop_column("documents", "content_hash")
@@ -0,0 +1,24 @@
+"""History summarisation: chat_sessions.summary and summary_through_id
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, drop_column
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("chat_sessions", sa.Column("summary", sa.Text))
+    add_column("chat_sessions", sa.Column("summary_through_id", sa.Integer))
+
+
+def downgrade():
+    drop_column("chat_sessions", "summary_through_id")
+    drop_column("chat_sessions", "summary")
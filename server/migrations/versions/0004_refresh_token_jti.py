@@ -0,0 +1,52 @@
+"""Refresh tokens stored by jti
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Tokens issued before this revision carry no jti and cannot be matched to a
+row, so the old table is dropped and recreated empty: users sign in again.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from migrations.helpers import has_column, has_table
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _create_refresh_tokens(*columns: sa.Column):
+    op.create_table(
+        "refresh_tokens",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        *columns,
+        sa.Column("is_revoked", sa.Boolean, default=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def upgrade():
+    if has_column("refresh_tokens", "jti"):
+        return
+    if has_table("refresh_tokens"):
+        op.drop_table("refresh_tokens")
+    _create_refresh_tokens(
+        sa.Column("jti", sa.String(32), unique=True, index=True, nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False, index=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False, index=True),
+        sa.Column("revoked_at", sa.DateTime(timezone=True), index=True),
+    )
+
+
+def downgrade():
+    if not has_column("refresh_tokens", "jti"):
+        return
+    op.drop_table("refresh_tokens")
+    _create_refresh_tokens(
+        sa.Column("token", sa.Text, unique=True, index=True, nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
@@ -0,0 +1,22 @@
+"""Chat listing indexes on (user_id, updated_at) and (session_id, created_at)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from migrations.helpers import create_index, drop_index
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index("ix_chat_sessions_user_id_updated_at", "chat_sessions", ["user_id", "updated_at"])
+    create_index("ix_chat_messages_session_id_created_at", "chat_messages", ["session_id", "created_at"])
+
+
+def downgrade():
+    drop_index("ix_chat_messages_session_id_created_at", "chat_messages")
+    drop_index("ix_chat_sessions_user_id_updated_at", "chat_sessions")
@@ -0,0 +1,22 @@
+"""Background document deletes: documents.deleting_at
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, drop_column
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("documents", sa.Column("deleting_at", sa.DateTime))
+
+
+def downgrade():
+    drop_column("documents", "deleting_at")
@@ -0,0 +1,24 @@
+"""Chunking strategies: documents.chunk_strategy and ingestion_jobs.chunk_strategy
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, drop_column
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("documents", sa.Column("chunk_strategy", sa.String(32)))
+    add_column("ingestion_jobs", sa.Column("chunk_strategy", sa.String(32)))
+
+
+def downgrade():
+    drop_column("ingestion_jobs", "chunk_strategy")
+    drop_column("documents", "chunk_strategy")
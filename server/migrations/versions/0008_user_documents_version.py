@@ -0,0 +1,22 @@
+"""Answer cache invalidation across workers: users.documents_version
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, drop_column
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("users", sa.Column("documents_version", sa.Integer, nullable=False, server_default="0"))
+
+
+def downgrade():
+    drop_column("users", "documents_version")
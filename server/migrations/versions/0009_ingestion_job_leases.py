@@ -0,0 +1,24 @@
+"""Ingestion job leases: ingestion_jobs.lease_owner and lease_expires_at
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, drop_column
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("ingestion_jobs", sa.Column("lease_owner", sa.String(36)))
+    add_column("ingestion_jobs", sa.Column("lease_expires_at", sa.DateTime))
+
+
+def downgrade():
+    drop_column("ingestion_jobs", "lease_expires_at")
+    drop_column("ingestion_jobs", "lease_owner")
@@ -0,0 +1,120 @@
+# tests/test_answer_cache.py
+from unittest.mock import patch
+
+from app.services.answer_cache import SemanticAnswerCache
+
+
+def make_cache(**kwargs):
+    options = {"threshold": 0.95, "max_entries": 3, "ttl_seconds": 3600}
+    options.update(kwargs)
+    return SemanticAnswerCache(**options)
+
+
+SCOPE = SemanticAnswerCache.scope("claude", "System", True, "dense")
+
+
+class TestSemanticAnswerCache:
+    """Test cases for the semantic answer cache."""
+
+    def test_similar_query_hits(self):
+        cache = make_cache()
+        cache.store("user-1", SCOPE, [1.0, 0.0], "Answer", ["doc-1-a"])
+
+        hit = cache.lookup("user-1", SCOPE, [0.99, 0.05])
+        assert hit["answer"] == "Answer"
+        assert hit["chunk_ids"] == ["doc-1-a"]
+        assert hit["similarity"] > 0.95
+
+    def test_dissimilar_query_misses(self):
+        cache = make_cache()
+        cache.store("user-1", SCOPE, [1.0, 0.0], "Answer", [])
+        assert cache.lookup("user-1", SCOPE, [0.6, 0.8]) is None
+
+    def test_entries_are_scoped_by_namespace_and_settings(self):
+        cache = make_cache()
+        cache.store("user-1", SCOPE, [1.0, 0.0], "Answer", [])
+
+        assert cache.lookup("user-2", SCOPE, [1.0, 0.0]) is None
+        other_model = SemanticAnswerCache.scope("titan", "System", True, "dense")
+        assert cache.lookup("user-1", other_model, [1.0, 0.0]) is None
+        other_prompt = SemanticAnswerCache.scope("claude", "Be terse.", True, "dense")
+        assert cache.lookup("user-1", other_prompt, [1.0, 0.0]) is None
+
+    def test_invalidate_drops_namespace(self):
+        cache = make_cache()
+        cache.store("user-1", SCOPE, [1.0, 0.0], "Answer", [])
+        cache.store("user-2", SCOPE, [1.0, 0.0], "Other", [])
+        cache.invalidate("user-1")
+
+        assert cache.lookup("user-1", SCOPE, [1.0, 0.0]) is None
+        assert cache.lookup("user-2", SCOPE, [1.0, 0.0])["answer"] == "Other"
+        assert cache.stats()["invalidations"] == 1
+
+    def test_newer_documents_version_drops_namespace(self):
+        cache = make_cache()
+        cache.store("user-1", SCOPE, [1.0, 0.0], "Answer", [], version=1)
+        assert cache.lookup("user-1", SCOPE, [1.0, 0.0], version=1)["answer"] == "Answer"
+
+        # Another worker changed the user's documents
+        assert cache.lookup("user-1", SCOPE, [1.0, 0.0], version=2) is None
+        assert cache.stats()["invalidations"] == 1
+        assert cache.stats()["entries"] == 0
+
+    def test_answer_from_stale_documents_is_not_stored(self):
+        cache = make_cache()
+        cache.store("user-1", SCOPE, [1.0, 0.0], "Fresh", [], version=2)
+        cache.store("user-1", SCOPE, [0.0, 1.0], "Stale", [], version=1)
+
+        assert cache.lookup("user-1", SCOPE, [0.0, 1.0], version=2) is None
+        assert cache.lookup("user-1", SCOPE, [1.0, 0.0], version=2)["answer"] == "Fresh"
+
+    def test_oldest_entries_evicted_past_limit(self):
+        cache = make_cache(max_entries=2)
+        cache.store("user-1", SCOPE, [1.0, 0.0, 0.0], "x", [])
+        cache.store("user-1", SCOPE, [0.0, 1.0, 0.0], "y", [])
+        cache.store("user-1", SCOPE, [0.0, 0.0, 1.0], "z", [])
+
+        assert cache.lookup("user-1", SCOPE, [1.0, 0.0, 0.0]) is None
+        assert cache.lookup("user-1", SCOPE, [0.0, 0.0, 1.0])["answer"] == "z"
+        assert cache.stats()["entries"] == 2
+
+    def test_expired_entries_are_ignored(self):
+        cache = make_cache(ttl_seconds=10)
+        with patch("app.services.answer_cache.time.time", return_value=1000.0):
+            cache.store("user-1", SCOPE, [1.0, 0.0], "Answer", [])
+        with patch("app.services.answer_cache.time.time", return_value=1011.0):
+            assert cache.lookup("user-1", SCOPE, [1.0, 0.0]) is None
+
+    def test_least_recently_used_namespaces_evicted_past_total_limit(self):
+        cache = make_cache(max_entries=2, max_total_entries=10)
+        for user in range(20):
+            cache.store(f"user-{user}", SCOPE, [1.0, 0.0], "Answer", [])
+            cache.store(f"user-{user}", SCOPE, [0.0, 1.0], "Answer", [])
+            # user-0 stays recently used
+            cache.lookup("user-0", SCOPE, [1.0, 0.0])
+
+        stats = cache.stats()
+        assert stats["entries"] <= 10
+        assert stats["namespaces"] == 5
+        assert stats["evictions"] == 15
+        assert cache.lookup("user-0", SCOPE, [1.0, 0.0]) is not None
+        assert cache.lookup("user-19", SCOPE, [1.0, 0.0]) is not None
+        assert cache.lookup("user-1", SCOPE, [1.0, 0.0]) is None
+
+    def test_idle_namespaces_expire_on_later_stores(self):
+        cache = make_cache(ttl_seconds=10)
+        with patch("app.services.answer_cache.time.time", return_value=1000.0):
+            cache.store("idle", SCOPE, [1.0, 0.0], "Answer", [])
+        with patch("app.services.answer_cache.time.time", return_value=1011.0):
+            cache.store("active", SCOPE, [1.0, 0.0], "Answer", [])
+
+        assert cache.stats()["namespaces"] == 1
+        assert cache.stats()["entries"] == 1
+
+    def test_hit_rate(self):
+        cache = make_cache()
+        cache.store("user-1", SCOPE, [1.0, 0.0], "Answer", [])
+        cache.lookup("user-1", SCOPE, [1.0, 0.0])
+        cache.lookup("user-1", SCOPE, [0.0, 1.0])
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
@@ -0,0 +1,85 @@
+# tests/test_archive_reader.py
+import io
+import tarfile
+import zipfile
+
+from app.services.archive_reader import is_archive, iter_upload_members
+
+
+def make_zip(files: dict) -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+def make_tar(files: dict, mode: str = "w:gz") -> io.BytesIO:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    return buf
+
+
+class NonSeekable(io.RawIOBase):
+    """Forward-only stream, like a request body, to check tar members are streamed."""
+
+    def __init__(self, data: bytes):
+        self._inner = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._inner.readinto(b)
+
+
+class TestArchiveReader:
+    """Test cases for reading documents out of bulk uploads."""
+
+    def test_zip_members_are_read_and_filtered(self):
+        archive = make_zip({
+            "docs/a.pdf": b"pdf bytes",
+            "docs/b.txt": b"text",
+            "image.png": b"png",
+            "__MACOSX/docs/._a.pdf": b"fork",
+            ".DS_Store": b"junk",
+        })
+        members = list(iter_upload_members("batch.zip", archive))
+
+        assert [(m.filename, m.data) for m in members if m.data] == [("docs/a.pdf", b"pdf bytes"), ("docs/b.txt", b"text")]
+        assert [(m.filename, m.error) for m in members if m.data is None] == [("image.png", "Unsupported file type.")]
+
+    def test_tar_is_streamed_without_seeking(self):
+        raw = make_tar({"one.txt": b"1", "two.docx": b"2"}).getvalue()
+        members = list(iter_upload_members("batch.tar.gz", io.BufferedReader(NonSeekable(raw))))
+        assert [(m.filename, m.data) for m in members] == [("one.txt", b"1"), ("two.docx", b"2")]
+
+    def test_path_traversal_members_are_dropped(self):
+        archive = make_tar({"../../etc/evil.txt": b"x", "ok.txt": b"y"}, mode="w")
+        assert [m.filename for m in iter_upload_members("batch.tar", archive)] == ["ok.txt"]
+
+    def test_oversized_member_is_skipped(self):
+        archive = make_zip({"big.txt": b"x" * 11, "small.txt": b"x" * 10})
+        members = {m.filename: m for m in iter_upload_members("batch.zip", archive, max_bytes=10)}
+        assert members["big.txt"].data is None
+        assert "exceeds" in members["big.txt"].error
+        assert members["small.txt"].data == b"x" * 10
+
+    def test_plain_file_is_a_single_member(self):
+        assert list(iter_upload_members("notes.txt", io.BytesIO(b"hello")))[0].data == b"hello"
+        assert list(iter_upload_members("photo.jpg", io.BytesIO(b"x")))[0].error == "Unsupported file type."
+
+    def test_corrupt_archive_is_reported(self):
+        members = list(iter_upload_members("broken.zip", io.BytesIO(b"not a zip")))
+        assert members[0].data is None
+        assert members[0].error.startswith("Unreadable archive")
+
+    def test_is_archive(self):
+        assert is_archive("a.ZIP") and is_archive("a.tar.gz") and is_archive("a.tgz")
+        assert not is_archive("a.pdf")
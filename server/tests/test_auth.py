@@ -15,6 +15,7 @@ from server.app.main import app
 from server.app.database import Base, get_db
 from server.app.models import User, RefreshToken
 from server.app.auth import get_password_hash, verify_password
+from server.app.services.user_cache import user_cache
 
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -39,6 +40,9 @@ client = TestClient(app)
 def setup_database():
     """Create tables before each test and drop after"""
     Base.metadata.create_all(bind=engine)
+    # Ids are reused once the tables are recreated
+    if user_cache is not None:
+        user_cache.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -181,6 +185,20 @@ class TestUserLogin:
         assert response.status_code == 401
         assert "Incorrect email or password" in response.json()["detail"]
     
+    def test_login_sheds_load_when_hashing_pool_is_full(self, registered_user, sample_user_data):
+        """Test that logins get 429 instead of queueing when the hashing pool is saturated"""
+        from unittest.mock import patch
+        from server.app.services.password_hasher import HashingPoolSaturated
+
+        with patch("server.app.routes.auth.aauthenticate_user", side_effect=HashingPoolSaturated("full")):
+            response = client.post("/auth/login", json={
+                "email": sample_user_data["email"],
+                "password": sample_user_data["password"]
+            })
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
     def test_login_nonexistent_user(self, setup_database):
         """Test login with non-existent user"""
         login_data = {
@@ -226,6 +244,51 @@ class TestAuthenticatedEndpoints:
         assert data["first_name"] == sample_user_data["first_name"]
         assert data["last_name"] == sample_user_data["last_name"]
     
+    def login(self, sample_user_data):
+        response = client.post("/auth/login", json={
+            "email": sample_user_data["email"],
+            "password": sample_user_data["password"]
+        })
+        return response.json()["access_token"]
+
+    def test_access_token_carries_user_id(self, registered_user, sample_user_data):
+        """Test that access tokens name the user by primary key"""
+        from jose import jwt
+        from server.app.config import SECRET_KEY, ALGORITHM
+
+        payload = jwt.decode(self.login(sample_user_data), SECRET_KEY, algorithms=[ALGORITHM])
+        assert payload["uid"] == registered_user["id"]
+        assert payload["sub"] == sample_user_data["email"]
+
+    def test_repeat_requests_use_user_cache(self, registered_user, sample_user_data):
+        """Test that authenticated requests after the first are served from the user cache"""
+        if user_cache is None:
+            pytest.skip("user cache disabled")
+        headers = {"Authorization": f"Bearer {self.login(sample_user_data)}"}
+        client.get("/auth/me", headers=headers)
+        hits = user_cache.stats()["hits"]
+
+        response = client.get("/auth/me", headers=headers)
+
+        assert response.status_code == 200
+        assert user_cache.stats()["hits"] == hits + 1
+
+    def test_deactivated_user_is_not_served_from_cache(self, registered_user, sample_user_data):
+        """Test that deactivating a user drops their cached entry"""
+        headers = {"Authorization": f"Bearer {self.login(sample_user_data)}"}
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+        db = TestingSessionLocal()
+        try:
+            db.get(User, registered_user["id"]).is_active = False
+            db.commit()
+        finally:
+            db.close()
+
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Inactive user"
+
     def test_get_current_user_without_token(self, setup_database):
         """Test getting current user info without token"""
         response = client.get("/auth/me")
@@ -90,3 +90,121 @@ def main():
 
 if __name__ == "__main__":
     main()
+
+
+class TestStreamBedrockModel:
+    """Test cases for response streaming."""
+
+    def test_claude_stream_yields_content_deltas(self):
+        from unittest.mock import patch
+        from app.services import bedrock_client
+
+        events = [
+            {"type": "message_start", "message": {}},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hello"}},
+            {"type": "content_block_delta", "delta": {"type": "text_delta", "text": " world"}},
+            {"type": "message_stop"},
+        ]
+        body = [{"chunk": {"bytes": json.dumps(event).encode()}} for event in events]
+
+        with patch.object(bedrock_client.client, "invoke_model_with_response_stream", return_value={"body": body}) as mock_stream:
+            assert list(bedrock_client.stream_bedrock_model("claude", "Hi")) == ["Hello", " world"]
+            request = json.loads(mock_stream.call_args.kwargs["body"])
+            assert request["messages"][0]["content"][0]["text"] == "Hi"
+
+    def test_titan_stream_yields_output_text(self):
+        from unittest.mock import patch
+        from app.services import bedrock_client
+
+        chunks = [{"outputText": "Pong", "index": 0}, {"outputText": "!", "index": 0}]
+        body = [{"chunk": {"bytes": json.dumps(chunk).encode()}} for chunk in chunks]
+
+        with patch.object(bedrock_client.client, "invoke_model_with_response_stream", return_value={"body": body}):
+            assert list(bedrock_client.stream_bedrock_model("titan", "Ping")) == ["Pong", "!"]
+
+    def test_fake_stream_needs_no_client(self):
+        from unittest.mock import patch
+        from app.services import bedrock_client
+
+        with patch.object(bedrock_client, "BEDROCK_FAKE_STREAM", True), \
+                patch.object(bedrock_client.client, "invoke_model_with_response_stream") as mock_stream:
+            text = "".join(bedrock_client.stream_bedrock_model("claude", "User: hi"))
+
+        assert text == "[fake stream] You said: User: hi"
+        mock_stream.assert_not_called()
+
+
+class TestStructuredPrompts:
+    """Test cases for Messages API payloads and prompt caching."""
+
+    PROMPT = {
+        "system": ["You are a testing bot.", "Summary of earlier conversation:\nUser: hi"],
+        "messages": [
+            {"role": "assistant", "content": "orphaned reply"},
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello!"},
+            {"role": "user", "content": "What is your name?"},
+        ],
+    }
+
+    def build(self, model_id, caching="auto"):
+        from unittest.mock import patch
+        from app.services import bedrock_client
+
+        with patch.object(bedrock_client, "BEDROCK_PROMPT_CACHING", caching):
+            return json.loads(bedrock_client._build_request(model_id, self.PROMPT))
+
+    def test_claude_request_keeps_system_and_turns(self):
+        request = self.build("anthropic.claude-instant-v1")
+
+        assert [block["text"] for block in request["system"]] == self.PROMPT["system"]
+        assert [m["role"] for m in request["messages"]] == ["user", "assistant", "user"]
+        assert request["messages"][-1]["content"][0]["text"] == "What is your name?"
+        assert "cache_control" not in json.dumps(request)
+
+    def test_cache_breakpoints_on_supported_models(self):
+        request = self.build("us.anthropic.claude-3-7-sonnet-20250219-v1:0")
+
+        assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in request["system"][1]
+        # History prefix is cached up to the turn before the new question
+        assert request["messages"][1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in request["messages"][-1]["content"][-1]
+
+    def test_caching_can_be_forced_off(self):
+        request = self.build("anthropic.claude-3-7-sonnet-20250219-v1:0", caching="off")
+        assert "cache_control" not in json.dumps(request)
+
+    def test_consecutive_same_role_turns_are_merged(self):
+        from app.services import bedrock_client
+
+        turns = bedrock_client._claude_messages([
+            {"role": "user", "content": "a"},
+            {"role": "user", "content": "b"},
+            {"role": "assistant", "content": ""},
+        ])
+        assert turns == [{"role": "user", "content": [{"type": "text", "text": "a\n\nb"}]}]
+
+    def test_titan_gets_flattened_transcript(self):
+        request = self.build("amazon.titan-text-express-v1")
+        assert request["inputText"].startswith("You are a testing bot.")
+        assert request["inputText"].endswith("Assistant: Hello!\nUser: What is your name?")
+
+    def test_call_parses_text_blocks(self):
+        import io
+        from unittest.mock import patch
+        from app.services import bedrock_client
+
+        body = {"content": [{"type": "text", "text": "I am "}, {"type": "text", "text": "a bot."}],
+                "usage": {"input_tokens": 5, "cache_read_input_tokens": 900}}
+        with patch.object(bedrock_client.client, "invoke_model", return_value={"body": io.BytesIO(json.dumps(body).encode())}):
+            assert bedrock_client.call_bedrock_model("claude", self.PROMPT) == "I am a bot."
+
+    def test_titan_call_reads_results(self):
+        import io
+        from unittest.mock import patch
+        from app.services import bedrock_client
+
+        body = {"results": [{"outputText": "Pong"}]}
+        with patch.object(bedrock_client.client, "invoke_model", return_value={"body": io.BytesIO(json.dumps(body).encode())}):
+            assert bedrock_client.call_bedrock_model("titan", "Ping") == "Pong"
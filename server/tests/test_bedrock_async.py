@@ -0,0 +1,130 @@
+# tests/test_bedrock_async.py
+import asyncio
+import base64
+import json
+import struct
+import zlib
+
+import httpx
+import pytest
+from botocore.credentials import Credentials
+
+from app.services.bedrock_async import AsyncBedrockClient
+from app.services.bedrock_client import BedrockThrottlingError
+
+
+def encode_event(headers: dict, payload: bytes) -> bytes:
+    """One AWS event-stream message with string-valued headers."""
+    encoded_headers = b""
+    for name, value in headers.items():
+        name, value = name.encode(), value.encode()
+        encoded_headers += struct.pack("!B", len(name)) + name + struct.pack("!BH", 7, len(value)) + value
+    total_length = 12 + len(encoded_headers) + len(payload) + 4
+    prelude = struct.pack("!II", total_length, len(encoded_headers))
+    message = prelude + struct.pack("!I", zlib.crc32(prelude)) + encoded_headers + payload
+    return message + struct.pack("!I", zlib.crc32(message))
+
+
+def chunk_event(body: dict) -> bytes:
+    payload = json.dumps({"bytes": base64.b64encode(json.dumps(body).encode()).decode()}).encode()
+    return encode_event({":message-type": "event", ":event-type": "chunk"}, payload)
+
+
+def make_client(handler) -> AsyncBedrockClient:
+    return AsyncBedrockClient(
+        region="us-east-1",
+        transport=httpx.MockTransport(handler),
+        credentials=Credentials("AKIDEXAMPLE", "secret"),
+    )
+
+
+class TestAsyncBedrockClient:
+    """Test cases for Bedrock calls made over the async HTTP client."""
+
+    def test_invoke_signs_and_parses_json(self):
+        seen = {}
+
+        def handler(request: httpx.Request):
+            seen["url"] = str(request.url)
+            seen["auth"] = request.headers.get("authorization", "")
+            seen["body"] = json.loads(request.content)
+            return httpx.Response(200, json={"embedding": [0.1, 0.2]})
+
+        async def scenario():
+            client = make_client(handler)
+            try:
+                return await client.invoke("amazon.titan-embed-text-v1", json.dumps({"inputText": "hi"}))
+            finally:
+                await client.aclose()
+
+        result = asyncio.run(scenario())
+
+        assert result == {"embedding": [0.1, 0.2]}
+        assert seen["url"] == "https://bedrock-runtime.us-east-1.amazonaws.com/model/amazon.titan-embed-text-v1/invoke"
+        assert seen["auth"].startswith("AWS4-HMAC-SHA256 Credential=AKIDEXAMPLE/")
+        assert seen["body"] == {"inputText": "hi"}
+
+    def test_throttling_maps_to_throttling_error(self):
+        def handler(request):
+            return httpx.Response(
+                429, headers={"x-amzn-errortype": "ThrottlingException:http://internal"}, json={"message": "slow down"}
+            )
+
+        async def scenario():
+            client = make_client(handler)
+            try:
+                await client.invoke("amazon.titan-embed-text-v1", "{}")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(BedrockThrottlingError):
+            asyncio.run(scenario())
+
+    def test_other_errors_raise_runtime_error(self):
+        def handler(request):
+            return httpx.Response(400, headers={"x-amzn-errortype": "ValidationException"}, json={"message": "bad"})
+
+        async def scenario():
+            client = make_client(handler)
+            try:
+                await client.invoke("amazon.titan-embed-text-v1", "{}")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(RuntimeError, match="ValidationException: bad"):
+            asyncio.run(scenario())
+
+    def test_invoke_stream_decodes_event_stream(self):
+        events = [{"outputText": "Pong"}, {"outputText": "!"}]
+        body = b"".join(chunk_event(event) for event in events)
+
+        def handler(request):
+            assert request.url.path.endswith("/invoke-with-response-stream")
+            return httpx.Response(200, content=body)
+
+        async def scenario():
+            client = make_client(handler)
+            try:
+                return [chunk async for chunk in client.invoke_stream("amazon.titan-text-express-v1", "{}")]
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(scenario()) == events
+
+    def test_invoke_stream_raises_on_exception_event(self):
+        body = chunk_event({"outputText": "Po"}) + encode_event(
+            {":message-type": "exception", ":exception-type": "throttlingException"},
+            json.dumps({"message": "slow down"}).encode(),
+        )
+
+        async def scenario():
+            client = make_client(lambda request: httpx.Response(200, content=body))
+            received = []
+            try:
+                async for chunk in client.invoke_stream("amazon.titan-text-express-v1", "{}"):
+                    received.append(chunk)
+            finally:
+                await client.aclose()
+
+        with pytest.raises(BedrockThrottlingError):
+            asyncio.run(scenario())
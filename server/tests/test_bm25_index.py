@@ -0,0 +1,122 @@
+# tests/test_bm25_index.py
+import numpy as np
+import pytest
+
+from app.services.bm25_index import BM25Index, KeywordIndexStore, tokenize, decode_varints, _encode_varint
+
+
+class TestTokenize:
+    def test_identifiers_kept_whole_and_split(self):
+        assert tokenize("Error ERR-1042 on v2.3") == ["error", "err-1042", "err", "1042", "on", "v2.3", "v2", "3"]
+
+    def test_varint_roundtrip(self):
+        values = [0, 1, 127, 128, 300, 16384, 2 ** 32 - 1]
+        buf = bytearray()
+        for v in values:
+            _encode_varint(v, buf)
+        assert decode_varints(buf).tolist() == values
+
+
+class TestBM25Index:
+    """Test cases for the incremental BM25 index."""
+
+    @pytest.fixture
+    def index(self):
+        index = BM25Index()
+        index.add("a", "The pump failed with error code E-4471 during startup.")
+        index.add("b", "Routine maintenance for the pump: check seals and bearings.")
+        index.add("c", "Part number 88-1203-A replaces the old impeller.")
+        return index
+
+    def test_exact_identifier_ranks_first(self, index):
+        matches = index.search("what does E-4471 mean", top_k=3)
+        assert matches[0]["id"] == "a"
+
+    def test_part_number_query(self, index):
+        assert index.search("88-1203-A", top_k=1)[0]["id"] == "c"
+
+    def test_rarer_terms_score_higher(self, index):
+        matches = index.search("pump seals", top_k=2)
+        assert [m["id"] for m in matches] == ["b", "a"]
+
+    def test_no_match_returns_empty(self, index):
+        assert index.search("zebra", top_k=3) == []
+
+    def test_delete_and_readd(self, index):
+        index.delete(ids=["a"])
+        assert index.search("E-4471", top_k=3) == []
+
+        index.add("a", "E-4471 is now documented here.")
+        assert index.search("E-4471", top_k=1)[0]["metadata"]["text"] == "E-4471 is now documented here."
+
+    def test_delete_by_filter(self):
+        index = BM25Index()
+        index.add("1", "alpha", {"text": "alpha", "document_id": 1})
+        index.add("2", "alpha beta", {"text": "alpha beta", "document_id": 2})
+        assert index.delete(filter={"document_id": 1}) == 1
+        assert [m["id"] for m in index.search("alpha")] == ["2"]
+
+    def test_postings_are_delta_encoded(self):
+        index = BM25Index()
+        for i in range(1000):
+            index.add(str(i), "common")
+        postings = index.postings["common"]
+        # Consecutive docs give gaps of 1, one byte each
+        assert len(postings.gaps) == 1000
+        docs, freqs = postings.decode()
+        assert np.array_equal(docs, np.arange(1000))
+
+
+class TestKeywordIndexStore:
+    def test_log_replay_restores_index(self, tmp_path):
+        store = KeywordIndexStore(str(tmp_path))
+        store.add("user-1", ["x", "y"], [{"text": "reset code 0xDEAD"}, {"text": "unrelated"}])
+        store.delete("user-1", ids=["y"])
+
+        reloaded = KeywordIndexStore(str(tmp_path))
+        assert [m["id"] for m in reloaded.search("user-1", "0xdead unrelated")] == ["x"]
+        assert reloaded.search("user-2", "0xdead") == []
+
+    def test_appends_from_another_worker_are_picked_up(self, tmp_path):
+        writer = KeywordIndexStore(str(tmp_path))
+        reader = KeywordIndexStore(str(tmp_path))
+        writer.add("user-1", ["a"], [{"text": "alpha report"}])
+        assert [m["id"] for m in reader.search("user-1", "report")] == ["a"]
+
+        writer.add("user-1", ["b"], [{"text": "beta report"}])
+        writer.delete("user-1", ids=["a"])
+        assert [m["id"] for m in reader.search("user-1", "report")] == ["b"]
+
+    def test_partial_record_waits_for_the_next_sync(self, tmp_path):
+        store = KeywordIndexStore(str(tmp_path))
+        store.add("user-1", ["a"], [{"text": "alpha"}])
+        log = tmp_path / "user-1.jsonl"
+        record = '{"id": "b", "metadata": {"text": "alpha beta"}}\n'
+        with open(log, "a") as f:
+            f.write(record[:10])
+        assert [m["id"] for m in store.search("user-1", "beta")] == []
+        with open(log, "a") as f:
+            f.write(record[10:])
+        assert [m["id"] for m in store.search("user-1", "beta")] == ["b"]
+
+    def test_tombstones_past_the_threshold_compact_the_log(self, tmp_path):
+        store = KeywordIndexStore(str(tmp_path))
+        store.COMPACT_MIN_TOMBSTONES = 4
+        reader = KeywordIndexStore(str(tmp_path))
+        ids = [str(i) for i in range(10)]
+        store.add("user-1", ids, [{"text": f"shared term{i}"} for i in range(10)])
+        assert len(reader.search("user-1", "shared", top_k=20)) == 10
+
+        store.delete("user-1", ids=ids[:4])
+        assert len((tmp_path / "user-1.jsonl").read_text().splitlines()) == 11
+        store.delete("user-1", ids=ids[4:6])
+
+        # 6 of 10 slots were tombstones: postings and the log now hold only live documents
+        index = store._get("user-1").index
+        assert len(index.ids) == index.num_docs == 4
+        assert len((tmp_path / "user-1.jsonl").read_text().splitlines()) == 4
+        assert sorted(m["id"] for m in store.search("user-1", "shared", top_k=20)) == ids[6:]
+        # A worker that read the old log reloads the rewritten one
+        assert sorted(m["id"] for m in reader.search("user-1", "shared", top_k=20)) == ids[6:]
+        reader.add("user-1", ["10"], [{"text": "shared again"}])
+        assert len(store.search("user-1", "shared", top_k=20)) == 5
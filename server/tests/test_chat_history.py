@@ -0,0 +1,165 @@
+# tests/test_chat_history.py
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import ChatMessage, ChatSession
+from app.services.chat_history import ChatHistoryBuilder, estimate_tokens
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def chat(db):
+    chat = ChatSession(user_id=1, title="t")
+    db.add(chat)
+    db.commit()
+    return chat
+
+
+def add_messages(db, chat, *contents):
+    for i, content in enumerate(contents):
+        db.add(ChatMessage(session_id=chat.id, role="user" if i % 2 == 0 else "assistant", content=content))
+    db.commit()
+
+
+def message(n):
+    # 40 characters, i.e. 10 estimated tokens
+    return f"message {n:02d} ".ljust(40, ".")
+
+
+class TestChatHistoryBuilder:
+    """Test cases for token-budgeted chat history assembly."""
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 1
+        assert estimate_tokens("x" * 40) == 10
+
+    def test_short_history_is_kept_verbatim(self, db, chat):
+        add_messages(db, chat, "hi", "hello", "", "how are you?")
+        history, summary = ChatHistoryBuilder(100, 50, 10).build(db, chat)
+
+        assert [m["content"] for m in history] == ["hi", "hello", "how are you?"]
+        assert summary == ""
+
+    def test_older_messages_fold_into_excerpts(self, db, chat):
+        add_messages(db, chat, *[message(n) for n in range(6)])
+        history, summary = ChatHistoryBuilder(30, 100, 10).build(db, chat)
+
+        assert [m["content"] for m in history] == [message(3), message(4), message(5)]
+        assert summary.splitlines()[0].startswith("User: message 00")
+        assert len(summary.splitlines()) == 3
+        # The summary is left on the session for the caller to commit
+        assert chat.summary == summary
+        assert chat.summary_through_id is not None
+
+    def test_summary_is_capped(self, db, chat):
+        add_messages(db, chat, *[message(n) for n in range(10)])
+        _, summary = ChatHistoryBuilder(20, 25, 10).build(db, chat)
+        assert [line.split()[2] for line in summary.splitlines()] == ["06", "07"]
+
+    def test_cached_window_only_reads_new_messages(self, db, chat, engine):
+        builder = ChatHistoryBuilder(1000, 100, 10)
+        add_messages(db, chat, "one", "two")
+        builder.build(db, chat)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            add_messages(db, chat, "three")
+            statements.clear()
+            history, _ = builder.build(db, chat)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert [m["content"] for m in history] == ["one", "two", "three"]
+        selects = [s for s in statements if "FROM chat_messages" in s]
+        assert len(selects) == 1
+        assert "chat_messages.id >" in selects[0]
+
+    def test_window_rebuilt_when_summary_moved_elsewhere(self, db, chat):
+        builder = ChatHistoryBuilder(30, 100, 10)
+        add_messages(db, chat, *[message(n) for n in range(3)])
+        builder.build(db, chat)
+
+        # Another worker folded messages into the summary
+        chat.summary = "User: earlier"
+        chat.summary_through_id = chat.summary_through_id or 1
+        db.commit()
+        history, summary = builder.build(db, chat)
+
+        assert summary.startswith("User: earlier")
+        assert all(m["content"] != message(0) for m in history)
+
+    def test_forget_drops_cached_window(self, db, chat):
+        builder = ChatHistoryBuilder(1000, 100, 10)
+        add_messages(db, chat, "one")
+        builder.build(db, chat)
+        builder.forget(chat.id)
+        assert builder._windows == {}
+
+    def test_non_blocking_build_skips_cache_when_session_busy(self, db, chat):
+        builder = ChatHistoryBuilder(1000, 100, 10)
+        add_messages(db, chat, "one", "two")
+        lock = builder._session_lock(chat.id)
+        with lock:
+            history, _ = builder.build(db, chat, blocking=False)
+
+        assert [m["content"] for m in history] == ["one", "two"]
+        assert builder._windows == {}
+
+    def test_evicting_a_busy_session_keeps_its_lock(self, db, chat):
+        builder = ChatHistoryBuilder(1000, 100, 1)
+        other = ChatSession(user_id=1, title="other")
+        db.add(other)
+        db.commit()
+        add_messages(db, chat, "one")
+        add_messages(db, other, "two")
+        builder.build(db, chat)
+        lock = builder._session_lock(chat.id)
+
+        with lock:
+            # Caching the other session evicts this one while a turn still holds its lock
+            builder.build(db, other)
+            assert builder._session_lock(chat.id) is lock
+            builder._release_session_lock(chat.id)
+
+        assert chat.id in builder._locks
+        builder._release_session_lock(chat.id)
+        # The last turn using an evicted session's lock discards it
+        assert chat.id not in builder._locks
+
+    def test_lock_of_an_evicted_session_is_discarded_after_the_turn(self, db, chat):
+        builder = ChatHistoryBuilder(1000, 100, 1)
+        other = ChatSession(user_id=1, title="other")
+        db.add(other)
+        db.commit()
+        add_messages(db, chat, "one")
+        add_messages(db, other, "two")
+        original_result = builder._result
+
+        def evict_then_result(session, window):
+            if session.id == chat.id:
+                # Another turn caches its session, evicting this one, before this turn lets go of its lock
+                builder.build(db, other)
+                assert chat.id not in builder._windows and chat.id in builder._locks
+            return original_result(session, window)
+
+        builder._result = evict_then_result
+        builder.build(db, chat)
+
+        assert set(builder._locks) == {other.id}
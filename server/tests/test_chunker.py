@@ -0,0 +1,153 @@
+# tests/test_chunker.py
+import io
+import time
+
+import docx
+import pytest
+
+from app.services.chunker import estimated_tokens, iter_blocks, iter_chunks, split_text
+from app.services.document_processor import iter_docx_paragraphs
+
+
+def _prose(sentences: int, word: str = "policy") -> str:
+    return " ".join(f"Sentence {i} about the {word} applies here." for i in range(sentences))
+
+
+class TestSplitText:
+    """Test cases for the native recursive splitter."""
+
+    def test_chunks_fit_and_keep_every_word(self):
+        text = "\n\n".join(_prose(12, f"topic{i}") for i in range(20))
+        chunks = split_text(text, 64, 8)
+
+        assert all(estimated_tokens(chunk) <= 64 for chunk in chunks)
+        joined = " ".join(chunks)
+        assert all(f"topic{i}" in joined for i in range(20))
+
+    def test_neighbouring_chunks_overlap(self):
+        chunks = split_text(" ".join(f"w{i}" for i in range(400)), 32, 8)
+
+        assert len(chunks) > 2
+        assert chunks[0].split()[-1] in chunks[1].split()[:8]
+
+    def test_unbreakable_text_is_cut_between_characters(self):
+        chunks = split_text("x" * 1000, 50, 0)
+        assert "".join(chunks) == "x" * 1000
+        assert all(estimated_tokens(chunk) <= 50 for chunk in chunks)
+
+    def test_cost_is_linear_in_text_length(self):
+        small, large = _prose(2_000), _prose(20_000)
+        start = time.perf_counter()
+        split_text(small, 128, 12)
+        small_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        split_text(large, 128, 12)
+        large_seconds = time.perf_counter() - start
+
+        # 10x the text: a quadratic splitter would take ~100x as long
+        assert large_seconds < small_seconds * 30 + 0.05
+
+
+class TestStructuredChunks:
+    """Test cases for heading, page, paragraph and table aware chunking."""
+
+    def test_headings_start_chunks_and_become_sections(self):
+        text = "# Guide\nIntro text.\n## Install\nRun the installer.\n## Usage\nCall the API.\n# Appendix\nNotes."
+        chunks = list(iter_chunks(text.split("\n"), "structured"))
+
+        assert [chunk.text for chunk in chunks] == [
+            "Guide\n\nIntro text.",
+            "Install\n\nRun the installer.",
+            "Usage\n\nCall the API.",
+            "Appendix\n\nNotes.",
+        ]
+        assert [chunk.metadata["section"] for chunk in chunks] == [
+            "Guide", "Guide > Install", "Guide > Usage", "Appendix"
+        ]
+
+    def test_consecutive_headings_stay_with_the_content(self):
+        chunks = list(iter_chunks(["# Guide", "## Install", "Run it."], "structured"))
+        assert [chunk.text for chunk in chunks] == ["Guide\n\nInstall\n\nRun it."]
+
+    def test_small_paragraphs_are_packed_and_large_ones_kept_whole(self):
+        paragraphs = ["Short one.", "Short two.", _prose(8)]
+        chunks = list(iter_chunks("\n\n".join(paragraphs).split("\n"), "structured", chunk_size=86))
+
+        assert chunks[0].text == "Short one.\n\nShort two."
+        assert chunks[1].text == paragraphs[2]
+
+    def test_long_paragraph_is_split_at_sentences(self):
+        chunks = list(iter_chunks([_prose(60)], "structured", chunk_size=64, chunk_overlap=8))
+
+        assert len(chunks) > 1
+        assert all(estimated_tokens(chunk.text) <= 64 for chunk in chunks)
+        assert all(chunk.text.startswith("Sentence") for chunk in chunks)
+
+    def test_pages_are_recorded(self):
+        pages = [_prose(6, "first"), _prose(6, "second"), _prose(6, "third")]
+        chunks = list(iter_chunks(pages, "structured", unit="page", chunk_size=80))
+
+        assert [(chunk.metadata["page_start"], chunk.metadata["page_end"]) for chunk in chunks] == [(1, 1), (2, 2), (3, 3)]
+        merged = list(iter_chunks(pages, "structured", unit="page", chunk_size=1000))
+        assert merged[0].metadata == {"page_start": 1, "page_end": 3}
+
+    def test_tables_are_split_between_rows_with_the_header_repeated(self):
+        rows = ["| id | description |", "|---|---|"] + [f"| {i} | {'detail ' * 6}|" for i in range(40)]
+        chunks = list(iter_chunks(["Before the table."] + rows, "structured", chunk_size=64))
+
+        tables = [chunk.text for chunk in chunks if chunk.text.startswith("| id |")]
+        assert len(tables) > 1
+        assert all(table.split("\n")[1] == "|---|---|" for table in tables)
+        body_rows = [row for table in tables for row in table.split("\n")[2:]]
+        assert body_rows == rows[2:]
+
+    def test_long_headings_are_kept_and_fit(self):
+        heading = " ".join(f"heading{i}" for i in range(35))
+        paragraph = _prose(11)
+        chunks = list(iter_chunks([f"# {heading}", paragraph], "structured", chunk_size=128, chunk_overlap=12))
+
+        joined = " ".join(chunk.text for chunk in chunks)
+        assert all(f"heading{i}" in joined for i in range(35))
+        assert all(f"Sentence {i} " in joined for i in range(11))
+        assert all(estimated_tokens(chunk.text) <= 128 for chunk in chunks)
+
+        chunks = list(iter_chunks([f"# {heading}", "Body text."], "structured", chunk_size=32))
+        joined = " ".join(chunk.text for chunk in chunks)
+        assert all(f"heading{i}" in joined for i in range(35))
+        assert all(estimated_tokens(chunk.text) <= 32 for chunk in chunks)
+        assert chunks[-1].text.endswith("Body text.")
+
+    def test_blocks_detect_tables_and_caps_headings(self):
+        blocks = list(iter_blocks(["OVERVIEW", "Some text.", "a\tb", "c\td", "More text."]))
+        assert [block.kind for block in blocks] == ["heading", "paragraph", "table", "paragraph"]
+
+    def test_recursive_strategy_carries_no_metadata(self):
+        chunks = list(iter_chunks(["# Guide", _prose(40)], "recursive", chunk_size=64))
+        assert len(chunks) > 1
+        assert all(chunk.metadata == {} for chunk in chunks)
+
+    def test_unknown_strategy_raises(self):
+        with pytest.raises(ValueError, match="Unknown chunking strategy"):
+            iter_chunks(["text"], "semantic")
+
+
+class TestDocxStructure:
+    """Test cases for structure-preserving DOCX extraction."""
+
+    def test_headings_and_tables_survive_extraction(self):
+        document = docx.Document()
+        document.add_heading("Pricing", level=1)
+        document.add_paragraph("Plans are billed monthly.")
+        table = document.add_table(rows=2, cols=2)
+        for row, cells in zip(table.rows, [("Plan", "Price"), ("Team", "$10")]):
+            for cell, text in zip(row.cells, cells):
+                cell.text = text
+        buffer = io.BytesIO()
+        document.save(buffer)
+
+        segments = list(iter_docx_paragraphs(buffer.getvalue()))
+        assert segments == ["# Pricing", "Plans are billed monthly.", "| Plan | Price |\n| Team | $10 |"]
+
+        chunks = list(iter_chunks(segments, "structured", unit="paragraph"))
+        assert chunks[0].metadata["section"] == "Pricing"
+        assert chunks[0].text.endswith("| Plan | Price |\n| Team | $10 |")
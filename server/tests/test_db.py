@@ -42,8 +42,69 @@ def main():
     if not test_database_connection():
         print("\n❌ Fix database connection issues first!")
         return
-    
-    
+
+
+class TestConnectionPool:
+    """Test cases for pool configuration, pool metrics and session scopes."""
+
+    def make_engine(self, tmp_path, pool_size=1, max_overflow=1, timeout=0.05):
+        from unittest.mock import patch
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import QueuePool
+        from app import database
+
+        metrics = database.PoolMetrics("test")
+        url = f"sqlite:///{tmp_path / 'pool.db'}"
+        with patch.object(database, "DB_POOL_SIZE", pool_size), \
+                patch.object(database, "DB_MAX_OVERFLOW", max_overflow), \
+                patch.object(database, "DB_POOL_TIMEOUT", timeout):
+            options = database._engine_options(url, QueuePool, metrics)
+        engine = create_engine(url, **options)
+        metrics.attach(engine)
+        return engine, metrics
+
+    def test_checkouts_overflow_and_timeouts_are_counted(self, tmp_path):
+        import pytest
+        from sqlalchemy import exc
+
+        engine, metrics = self.make_engine(tmp_path)
+        first = engine.connect()
+        second = engine.connect()  # beyond pool_size, opened as overflow
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        stats = metrics.snapshot()
+        assert stats["checkouts"] == 3
+        assert stats["connects"] == 2
+        assert stats["overflow_events"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["checked_out"] == 2
+        assert stats["wait_seconds_max"] >= 0.05
+
+        first.close()
+        second.close()
+        assert metrics.snapshot()["checked_out"] == 0
+        engine.dispose()
+
+    def test_in_memory_sqlite_keeps_default_pool(self):
+        from sqlalchemy.pool import QueuePool
+        from app import database
+
+        assert database._engine_options("sqlite://", QueuePool, database.PoolMetrics("m")) == {}
+
+    def test_session_scope_rolls_back_and_closes(self):
+        import pytest
+        from unittest.mock import MagicMock
+        from app.database import session_scope
+
+        db = MagicMock()
+        with pytest.raises(ValueError):
+            with session_scope(lambda: db):
+                raise ValueError("boom")
+
+        db.rollback.assert_called_once()
+        db.close.assert_called_once()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+# tests/test_document_deletion.py
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Document, DocumentChunk, IngestionJob, User
+from app.services.document_deletion import DocumentDeleter
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'documents.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def stores():
+    with patch("app.services.document_deletion.delete_vectors") as delete_vectors, \
+            patch("app.services.document_deletion.delete_document_vectors") as delete_document_vectors, \
+            patch("app.services.document_deletion.delete_document_from_s3") as delete_from_s3, \
+            patch("app.services.document_deletion.keyword_index") as keyword_index, \
+            patch("app.services.document_deletion.DELETE_BATCH_SIZE", 2):
+        yield {
+            "delete_vectors": delete_vectors,
+            "delete_document_vectors": delete_document_vectors,
+            "delete_from_s3": delete_from_s3,
+            "keyword_index": keyword_index,
+        }
+
+
+def add_document(db, num_chunks, deleting=False):
+    document = Document(
+        user_id=1,
+        filename="doc.txt",
+        file_path="uploads/1/doc.txt",
+        deleting_at=datetime.utcnow() if deleting else None,
+    )
+    db.add(document)
+    db.flush()
+    db.bulk_insert_mappings(
+        DocumentChunk,
+        [{"document_id": document.id, "vector_id": f"v{i}", "chunk_index": i} for i in range(num_chunks)],
+    )
+    db.add(IngestionJob(user_id=1, filename="doc.txt", status="completed", document_id=document.id))
+    db.commit()
+    return document
+
+
+class TestDocumentDeleter:
+    """Test cases for document deletion across the vector store, S3 and database."""
+
+    def test_small_document_is_purged_in_request(self, session_factory, stores):
+        db = session_factory()
+        document = add_document(db, 5)
+        document_id = document.id
+        deleter = DocumentDeleter(session_factory, async_min_chunks=100)
+
+        assert deleter.delete(db, document) is True
+
+        batches = [call.args[1] for call in stores["delete_vectors"].call_args_list]
+        assert batches == [["v0", "v1"], ["v2", "v3"], ["v4"]]
+        stores["delete_from_s3"].assert_called_once_with("uploads/1/doc.txt")
+        stores["keyword_index"].delete.assert_called_once_with("user-1", filter={"document_id": document_id})
+        assert db.query(Document).count() == 0
+        assert db.query(DocumentChunk).count() == 0
+        assert db.query(IngestionJob.document_id).scalar() is None
+        db.close()
+
+    def test_delete_bumps_the_users_documents_version(self, session_factory, stores):
+        db = session_factory()
+        db.add(User(id=1, email="a@example.com", first_name="A", last_name="B", hashed_password="x"))
+        db.commit()
+        document = add_document(db, 1)
+
+        DocumentDeleter(session_factory).delete(db, document)
+
+        # Answer caches in every worker compare against this and drop the user's entries
+        assert db.query(User.documents_version).filter_by(id=1).scalar() == 1
+        db.close()
+
+    def test_document_without_manifest_is_deleted_by_filter(self, session_factory, stores):
+        db = session_factory()
+        document = add_document(db, 0)
+        document_id = document.id
+
+        DocumentDeleter(session_factory).delete(db, document)
+
+        stores["delete_vectors"].assert_not_called()
+        stores["delete_document_vectors"].assert_called_once_with(1, document_id, "doc.txt")
+        db.close()
+
+    def test_failed_purge_keeps_the_row(self, session_factory, stores):
+        stores["delete_from_s3"].side_effect = RuntimeError("Failed to delete file from S3")
+        db = session_factory()
+        document = add_document(db, 3)
+
+        with pytest.raises(RuntimeError):
+            DocumentDeleter(session_factory).delete(db, document)
+        db.rollback()
+
+        assert db.query(Document).count() == 1
+        assert db.query(DocumentChunk).count() == 3
+        db.close()
+
+    def test_large_document_is_purged_in_background(self, session_factory, stores):
+        db = session_factory()
+        document = add_document(db, 5)
+        deleter = DocumentDeleter(session_factory, async_min_chunks=3)
+
+        assert deleter.delete(db, document) is False
+        assert document.deleting_at is not None
+        deleter.shutdown(wait=True)
+
+        db.expire_all()
+        assert db.query(Document).count() == 0
+        assert stores["delete_vectors"].call_count == 3
+        db.close()
+
+    def test_start_resumes_marked_documents(self, session_factory, stores):
+        db = session_factory()
+        add_document(db, 2, deleting=True)
+        add_document(db, 2)
+        db.close()
+        deleter = DocumentDeleter(session_factory)
+
+        deleter.start()
+        deleter.shutdown(wait=True)
+
+        db = session_factory()
+        assert db.query(Document).count() == 1
+        assert db.query(Document.deleting_at).scalar() is None
+        db.close()
@@ -7,7 +7,18 @@ import pytest
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from server.app.database import create_tables, SessionLocal
-from server.app.services.document_processor import extract_text, process_and_store_document
+from unittest.mock import patch, MagicMock
+from uuid import uuid4
+from server.app.models import DocumentChunk
+from server.app.services.pinecone_client import chunk_vector_ids
+from server.app.services.chunker import estimated_tokens, split_text
+from server.app.services.document_processor import (
+    extract_text,
+    iter_chunks,
+    iter_pdf_pages,
+    iter_text_segments,
+    process_and_store_document,
+)
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
@@ -31,24 +42,351 @@ def test_docx():
 
 def test_document_upload_flow():
     from server.app.services.document_processor import process_and_store_document
-    from server.app.database import SessionLocal
 
     BASE_DIR = Path(__file__).resolve().parents[1] 
     file_path = BASE_DIR / "samples" / "customer_interviews.pdf"
     filename = "customer_interviews.pdf"
     file_bytes = file_path.read_bytes()
 
-    db = SessionLocal()
     response = process_and_store_document(
         user_id=1,
         filename="customer_interviews.pdf",
         file_bytes=file_bytes,
-        db=db
     )
     assert "document_id" in response
     assert response["num_chunks"] > 0
 
 
+def test_pdf_pages_stream_with_progress():
+    BASE_DIR = Path(__file__).resolve().parents[1]
+    file_bytes = (BASE_DIR / "samples" / "customer_interviews.pdf").read_bytes()
+    fractions = []
+    pages = list(iter_pdf_pages(file_bytes, on_progress=fractions.append))
+    assert "\n".join(pages).strip() == extract_text(file_bytes, "customer_interviews.pdf")
+    assert len(fractions) == len(pages)
+    assert fractions[-1] == 1.0
+
+
+def test_parallel_pdf_pages_match_serial():
+    from server.app.services import pdf_parallel
+
+    BASE_DIR = Path(__file__).resolve().parents[1]
+    file_bytes = (BASE_DIR / "samples" / "customer_interviews.pdf").read_bytes()
+    serial = list(iter_pdf_pages(file_bytes, parallel_min_pages=0))
+    fractions = []
+    try:
+        parallel = list(pdf_parallel.iter_pdf_pages_parallel(file_bytes, len(serial), fractions.append, pages_per_task=1))
+    finally:
+        pdf_parallel.shutdown_pool()
+    assert parallel == serial
+    assert fractions[-1] == 1.0
+
+
+@patch("server.app.services.document_processor.iter_pdf_pages_parallel", return_value=iter(["p1", "p2", "p3"]))
+def test_pdf_pages_use_process_pool_above_threshold(mock_parallel):
+    BASE_DIR = Path(__file__).resolve().parents[1]
+    file_bytes = (BASE_DIR / "samples" / "customer_interviews.pdf").read_bytes()
+    assert list(iter_pdf_pages(file_bytes, parallel_min_pages=2)) == ["p1", "p2", "p3"]
+    assert mock_parallel.call_args.args[1] == 3
+
+
+def test_txt_segments():
+    text = "first line\nsecond line\n"
+    assert list(iter_text_segments(text.encode(), "notes.txt")) == ["first line", "second line"]
+
+
+def test_unsupported_format_raises():
+    with pytest.raises(ValueError):
+        iter_text_segments(b"data", "image.png")
+
+
+def test_iter_chunks_matches_whole_text_split():
+    segments = [f"Paragraph {i}: " + " ".join(f"word{i}_{j}" for j in range(40)) for i in range(200)]
+    streamed = [chunk.text for chunk in iter_chunks(iter(segments), "recursive", chunk_size=125, chunk_overlap=12)]
+    whole = split_text("\n".join(segments), 125, 12)
+
+    assert all(estimated_tokens(chunk) <= 125 for chunk in streamed)
+    # Every word lands in some chunk, and chunk count stays close to a whole-text split
+    joined = " ".join(streamed)
+    assert all(f"word{i}_39" in joined for i in range(200))
+    assert abs(len(streamed) - len(whole)) <= len(whole) // 10 + 1
+
+
+def test_iter_chunks_empty():
+    assert list(iter_chunks(iter(["", "  "]))) == []
+
+
+def _segments(n):
+    return iter([f"segment {i} " + "text " * 150 for i in range(n)])
+
+
+def _unique_name(suffix=".txt"):
+    # Re-ingest is keyed on (user, filename), so each test uses a fresh name
+    return f"{uuid4()}{suffix}"
+
+
+@patch("server.app.services.document_processor.INGESTION_CHUNK_BATCH", 4)
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upsert_documents")
+@patch("server.app.services.document_processor.get_embeddings")
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/doc.txt")
+@patch("server.app.services.document_processor.iter_text_segments")
+def test_pipeline_upserts_in_batches(mock_segments, mock_s3, mock_embed, mock_upsert, mock_keywords):
+    mock_segments.return_value = _segments(10)
+    mock_embed.side_effect = lambda chunks: [[0.1] for _ in chunks]
+    stages = []
+
+    result = process_and_store_document(
+        user_id=1, filename=_unique_name(), file_bytes=b"x",
+        progress_callback=lambda stage, progress: stages.append(stage),
+    )
+
+    assert all(len(call.args[0]) <= 4 for call in mock_embed.call_args_list)
+    assert mock_upsert.call_count == mock_embed.call_count > 1
+    chunk_indexes = [i for call in mock_upsert.call_args_list for i in call.kwargs["chunk_indexes"]]
+    assert chunk_indexes == list(range(result["num_chunks"]))
+    assert result["added"] == result["num_chunks"]
+    assert stages[0] == "uploading" and stages[-1] == "finalizing"
+
+
+@patch("server.app.services.document_processor.delete_document_from_s3")
+@patch("server.app.services.document_processor.delete_vectors")
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upsert_documents")
+@patch("server.app.services.document_processor.get_embeddings", side_effect=RuntimeError("throttled"))
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/doc.txt")
+@patch("server.app.services.document_processor.iter_text_segments")
+def test_pipeline_failure_cleans_up(
+    mock_segments, mock_s3, mock_embed, mock_upsert, mock_keywords, mock_delete_vectors, mock_delete_s3
+):
+    mock_segments.return_value = _segments(3)
+
+    with pytest.raises(RuntimeError):
+        process_and_store_document(user_id=1, filename=_unique_name(), file_bytes=b"x")
+
+    mock_delete_vectors.assert_called_once()
+    mock_keywords.delete.assert_called_once()
+    mock_delete_s3.assert_called_once_with("uploads/1/doc.txt")
+
+
+@patch("server.app.services.document_processor.delete_document_from_s3")
+@patch("server.app.services.document_processor.delete_vectors")
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/empty.txt")
+def test_pipeline_rejects_empty_document(mock_s3, mock_keywords, mock_delete_vectors, mock_delete_s3):
+    with pytest.raises(ValueError, match="No extractable text"):
+        process_and_store_document(user_id=1, filename=_unique_name(), file_bytes=b"   \n")
+    mock_delete_s3.assert_called_once()
+
+
+def _paragraphs(*names):
+    # Each paragraph is longer than half a chunk, so it always becomes its own chunk
+    return "\n\n".join(f"{name} " + "policy " * 60 for name in names).encode()
+
+
+@patch("server.app.services.document_processor.delete_document_from_s3")
+@patch("server.app.services.document_processor.delete_vectors")
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upsert_documents")
+@patch("server.app.services.document_processor.get_embeddings")
+@patch("server.app.services.document_processor.upload_document_to_s3")
+def test_reupload_only_indexes_changed_chunks(
+    mock_s3, mock_embed, mock_upsert, mock_keywords, mock_delete_vectors, mock_delete_s3
+):
+    mock_s3.side_effect = ["uploads/1/v1.txt", "uploads/1/v2.txt"]
+    mock_embed.side_effect = lambda chunks: [[0.1] for _ in chunks]
+    filename = _unique_name()
+
+    first = process_and_store_document(user_id=1, filename=filename, file_bytes=_paragraphs("alpha", "beta", "gamma"))
+    first_ids = mock_upsert.call_args.kwargs["ids"]
+    mock_embed.reset_mock()
+    mock_upsert.reset_mock()
+
+    second = process_and_store_document(
+        user_id=1, filename=filename, file_bytes=_paragraphs("alpha", "beta-revised", "gamma", "delta")
+    )
+
+    assert second["document_id"] == first["document_id"]
+    assert (first["added"], second["added"], second["removed"]) == (3, 2, 1)
+    embedded = [chunk.split()[0] for call in mock_embed.call_args_list for chunk in call.args[0]]
+    assert embedded == ["beta-revised", "delta"]
+    assert mock_upsert.call_args.kwargs["chunk_indexes"] == [1, 3]
+    mock_delete_vectors.assert_called_once_with("1", [first_ids[1]])
+    mock_delete_s3.assert_called_once_with("uploads/1/v1.txt")
+
+    db = SessionLocal()
+    try:
+        stored = db.query(DocumentChunk).filter_by(document_id=first["document_id"]).order_by(DocumentChunk.chunk_index).all()
+    finally:
+        db.close()
+    assert [row.vector_id for row in stored][0] == first_ids[0]
+    assert len(stored) == 4
+
+
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upsert_documents")
+@patch("server.app.services.document_processor.get_embeddings")
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/same.txt")
+def test_identical_reupload_is_skipped(mock_s3, mock_embed, mock_upsert, mock_keywords):
+    mock_embed.side_effect = lambda chunks: [[0.1] for _ in chunks]
+    filename = _unique_name()
+    content = _paragraphs("alpha", "beta")
+
+    first = process_and_store_document(user_id=1, filename=filename, file_bytes=content)
+    second = process_and_store_document(user_id=1, filename=filename, file_bytes=content)
+
+    assert mock_s3.call_count == 1
+    assert mock_upsert.call_count == 1
+    assert second["num_chunks"] == first["num_chunks"] == 2
+    assert second["added"] == 0
+
+
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upsert_documents")
+@patch("server.app.services.document_processor.get_embeddings")
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/guide.txt")
+def test_structured_chunks_carry_sections_into_metadata(mock_s3, mock_embed, mock_upsert, mock_keywords):
+    mock_embed.side_effect = lambda chunks: [[0.1] for _ in chunks]
+    content = b"# Guide\nIntro.\n\n## Install\nRun the installer.\n"
+
+    process_and_store_document(user_id=1, filename=_unique_name(), file_bytes=content)
+
+    assert mock_upsert.call_args.args[1] == ["Guide\n\nIntro.", "Install\n\nRun the installer."]
+    assert mock_upsert.call_args.kwargs["chunk_metadata"] == [{"section": "Guide"}, {"section": "Guide > Install"}]
+    keyword_metadata = mock_keywords.add.call_args.args[2]
+    assert keyword_metadata[1]["section"] == "Guide > Install"
+
+
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upsert_documents")
+@patch("server.app.services.document_processor.get_embeddings")
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/same.txt")
+def test_new_chunk_strategy_rechunks_identical_bytes(mock_s3, mock_embed, mock_upsert, mock_keywords):
+    mock_embed.side_effect = lambda chunks: [[0.1] for _ in chunks]
+    filename = _unique_name()
+    content = _paragraphs("alpha", "beta")
+
+    process_and_store_document(user_id=1, filename=filename, file_bytes=content, chunk_strategy="structured")
+    process_and_store_document(user_id=1, filename=filename, file_bytes=content, chunk_strategy="structured")
+    assert mock_s3.call_count == 1
+    process_and_store_document(user_id=1, filename=filename, file_bytes=content, chunk_strategy="recursive")
+    assert mock_s3.call_count == 2
+
+    with pytest.raises(ValueError, match="Unknown chunking strategy"):
+        process_and_store_document(user_id=1, filename=filename, file_bytes=content, chunk_strategy="semantic")
+    assert mock_s3.call_count == 2
+
+
+def _legacy_document(store, filename):
+    from server.app.models import Document
+
+    # Shaped like the original ingestion: uuid ids, no document_id and no manifest rows
+    legacy_ids = [str(uuid4()) for _ in range(3)]
+    store.upsert("user-1", [
+        {"id": vector_id, "values": [1.0, 0.0], "metadata": {"filename": filename, "user_id": 1, "text": f"old {i}"}}
+        for i, vector_id in enumerate(legacy_ids)
+    ])
+    db = SessionLocal()
+    try:
+        document = Document(user_id=1, filename=filename, file_path="uploads/1/old.txt", pinecone_namespace="user-1")
+        db.add(document)
+        db.commit()
+        return document.id, legacy_ids
+    finally:
+        db.close()
+
+
+@patch("server.app.services.document_deletion.delete_document_from_s3")
+@patch("server.app.services.document_deletion.keyword_index")
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.get_embeddings")
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/legacy.txt")
+def test_reupload_replaces_vectors_from_before_manifests(
+    mock_s3, mock_embed, mock_keywords, mock_purged_keywords, mock_delete_s3, tmp_path
+):
+    from server.app.models import Document
+    from server.app.services import vector_store
+
+    mock_embed.side_effect = lambda chunks: [[1.0, 0.0] for _ in chunks]
+    filename = _unique_name()
+    store = vector_store.LocalVectorStore(str(tmp_path))
+    legacy_document_id, legacy_ids = _legacy_document(store, filename)
+
+    with patch.object(vector_store, "_vector_store", store):
+        result = process_and_store_document(user_id=1, filename=filename, file_bytes=_paragraphs("alpha"))
+        matches = store.query("user-1", [1.0, 0.0], top_k=10)
+
+    assert [match["id"] for match in matches if match["id"] in legacy_ids] == []
+    assert len(matches) == result["num_chunks"] == 1
+    mock_delete_s3.assert_called_once_with("uploads/1/old.txt")
+    db = SessionLocal()
+    try:
+        assert db.query(Document).filter_by(user_id=1, filename=filename).one().id == result["document_id"]
+        assert result["document_id"] != legacy_document_id
+    finally:
+        db.close()
+
+
+@patch("server.app.services.document_processor.delete_document_from_s3")
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.get_embeddings", side_effect=RuntimeError("throttled"))
+@patch("server.app.services.document_processor.upload_document_to_s3", return_value="uploads/1/legacy.txt")
+def test_failed_reupload_keeps_vectors_from_before_manifests(mock_s3, mock_embed, mock_keywords, mock_delete_s3, tmp_path):
+    from server.app.models import Document
+    from server.app.services import vector_store
+
+    filename = _unique_name()
+    store = vector_store.LocalVectorStore(str(tmp_path))
+    legacy_document_id, legacy_ids = _legacy_document(store, filename)
+
+    with patch.object(vector_store, "_vector_store", store):
+        with pytest.raises(RuntimeError):
+            process_and_store_document(user_id=1, filename=filename, file_bytes=_paragraphs("alpha"))
+        matches = store.query("user-1", [1.0, 0.0], top_k=10)
+
+    assert sorted(match["id"] for match in matches) == sorted(legacy_ids)
+    mock_keywords.delete.assert_called_once_with("user-1", ids=[])
+    db = SessionLocal()
+    try:
+        assert [document.id for document in db.query(Document).filter_by(filename=filename)] == [legacy_document_id]
+    finally:
+        db.close()
+
+
+@patch("server.app.services.document_processor.bump_documents_version")
+@patch("server.app.services.document_processor.delete_document_from_s3")
+@patch("server.app.services.document_processor.delete_vectors")
+@patch("server.app.services.document_processor.keyword_index")
+@patch("server.app.services.document_processor.upsert_documents")
+@patch("server.app.services.document_processor.get_embeddings")
+@patch("server.app.services.document_processor.upload_document_to_s3")
+def test_failed_reupload_keeps_the_chunks_it_would_remove(
+    mock_s3, mock_embed, mock_upsert, mock_keywords, mock_delete_vectors, mock_delete_s3, mock_bump
+):
+    mock_s3.side_effect = ["uploads/1/v1.txt", "uploads/1/v2.txt"]
+    mock_embed.side_effect = lambda chunks: [[0.1] for _ in chunks]
+    mock_bump.side_effect = [None, RuntimeError("database is locked")]
+    filename = _unique_name()
+
+    process_and_store_document(user_id=1, filename=filename, file_bytes=_paragraphs("alpha", "beta"))
+    first_ids = mock_upsert.call_args.kwargs["ids"]
+    with pytest.raises(RuntimeError):
+        process_and_store_document(user_id=1, filename=filename, file_bytes=_paragraphs("alpha"))
+
+    # Only the failed run's own (here, no) vectors are cleaned up; beta stays in the manifest and the store
+    deleted = [vector_id for call in mock_delete_vectors.call_args_list for vector_id in call.args[1]]
+    assert first_ids[1] not in deleted
+    mock_keywords.delete.assert_called_once_with("user-1", ids=[])
+
+
+def test_chunk_ids_hash_content_and_number_repeats():
+    ids = chunk_vector_ids(7, ["same", "other", "same"])
+    assert ids[0] != ids[2]
+    assert ids[0].startswith("doc-7-") and ids[2].endswith("-1")
+    assert chunk_vector_ids(7, ["other"]) == [ids[1]]
+    assert chunk_vector_ids(8, ["other"]) != [ids[1]]
+
+
 if __name__ == "__main__":
     test_pdf()
     test_docx()
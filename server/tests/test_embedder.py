@@ -1,14 +1,30 @@
 # tests/test_embedder.py
+import threading
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 from botocore.exceptions import BotoCoreError, ClientError
 
+from app.services.bedrock_client import BedrockThrottlingError
 from app.services.embedder import get_embeddings
 
 
+@pytest.fixture(autouse=True)
+def no_embedding_cache():
+    """Exercise the embedding engine directly; the cache has its own tests."""
+    with patch('app.services.embedder.embedding_cache', None):
+        yield
+
+
 class TestGetEmbeddings:
     """Test cases for the get_embeddings function."""
 
+    @pytest.fixture(autouse=True)
+    def serial_embedder(self):
+        """These cases pin the serial path, where call order is deterministic."""
+        with patch('app.services.embedder.EMBEDDING_MAX_WORKERS', 1):
+            yield
+
     @patch('app.services.embedder.call_embedding_model')
     def test_get_embeddings_single_chunk(self, mock_call_embedding_model):
         """Test get_embeddings with a single text chunk."""
@@ -252,4 +268,100 @@ class TestGetEmbeddings:
         
         # Verify chunks were called in correct order
         for i, call in enumerate(mock_call_embedding_model.call_args_list):
-            assert call[0][0] == f"Chunk {i}"
\ No newline at end of file
+            assert call[0][0] == f"Chunk {i}"
+
+
+class TestConcurrentEmbeddings:
+    """Test cases for the concurrent embedding engine."""
+
+    @patch('app.services.embedder.call_embedding_model')
+    def test_concurrent_preserves_order(self, mock_call_embedding_model):
+        """Results come back in input order even when calls finish out of order."""
+        # Arrange
+        chunks = [f"Chunk {i}" for i in range(20)]
+
+        def fake_embed(text):
+            i = int(text.split()[1])
+            time.sleep(0.001 * (20 - i))  # later chunks finish first
+            return [float(i)]
+
+        mock_call_embedding_model.side_effect = fake_embed
+
+        # Act
+        result = get_embeddings(chunks, max_workers=8)
+
+        # Assert
+        assert result == [[float(i)] for i in range(20)]
+        assert mock_call_embedding_model.call_count == 20
+
+    @patch('app.services.embedder.EMBEDDING_BATCH_SIZE', 4)
+    @patch('app.services.embedder.call_embedding_model')
+    def test_concurrency_is_bounded(self, mock_call_embedding_model):
+        """No more than max_workers calls are in flight at once, across batches."""
+        # Arrange
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+
+        def fake_embed(text):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight -= 1
+            return [0.0]
+
+        mock_call_embedding_model.side_effect = fake_embed
+
+        # Act
+        result = get_embeddings([f"chunk {i}" for i in range(10)], max_workers=3)
+
+        # Assert
+        assert len(result) == 10
+        assert 1 < peak <= 3
+
+    @patch('app.services.embedder.time.sleep')
+    @patch('app.services.embedder.call_embedding_model')
+    def test_throttled_calls_are_retried(self, mock_call_embedding_model, mock_sleep):
+        """Throttling errors are retried with backoff and then succeed."""
+        # Arrange
+        mock_call_embedding_model.side_effect = [
+            BedrockThrottlingError("throttled"),
+            BedrockThrottlingError("throttled"),
+            [0.1, 0.2],
+        ]
+
+        # Act
+        result = get_embeddings(["chunk"])
+
+        # Assert
+        assert result == [[0.1, 0.2]]
+        assert mock_call_embedding_model.call_count == 3
+        assert mock_sleep.call_count == 2
+
+    @patch('app.services.embedder.EMBEDDING_MAX_RETRIES', 2)
+    @patch('app.services.embedder.time.sleep')
+    @patch('app.services.embedder.call_embedding_model')
+    def test_throttling_gives_up_after_max_retries(self, mock_call_embedding_model, mock_sleep):
+        """Persistent throttling is surfaced once the retry budget is spent."""
+        # Arrange
+        mock_call_embedding_model.side_effect = BedrockThrottlingError("throttled")
+
+        # Act & Assert
+        with pytest.raises(BedrockThrottlingError):
+            get_embeddings(["chunk"])
+
+        assert mock_call_embedding_model.call_count == 3
+        assert mock_sleep.call_count == 2
+
+    @patch('app.services.embedder.call_embedding_model')
+    def test_non_throttling_errors_are_not_retried(self, mock_call_embedding_model):
+        """Other failures propagate from the pool without retrying."""
+        # Arrange
+        mock_call_embedding_model.side_effect = RuntimeError("Failed to get embedding: bad input")
+
+        # Act & Assert
+        with pytest.raises(RuntimeError, match="bad input"):
+            get_embeddings(["a", "b", "c"], max_workers=2)
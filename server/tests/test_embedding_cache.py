@@ -0,0 +1,136 @@
+# tests/test_embedding_cache.py
+import asyncio
+import threading
+
+import pytest
+from unittest.mock import patch
+
+from app.services.embedding_cache import EmbeddingCache, normalize_text
+from app.services.embedder import aget_query_embedding, get_embeddings
+
+
+@pytest.fixture
+def cache():
+    return EmbeddingCache(model_id="test-model", max_bytes=1024 * 1024)
+
+
+class TestEmbeddingCache:
+    """Test cases for the EmbeddingCache class."""
+
+    def test_normalize_text_collapses_whitespace(self):
+        assert normalize_text("  Hello \n\t world  ") == "Hello world"
+
+    def test_key_depends_on_model_and_normalized_text(self, cache):
+        other = EmbeddingCache(model_id="other-model", max_bytes=1024)
+        assert cache.key("hello  world") == cache.key("hello world")
+        assert cache.key("hello world") != cache.key("hello there")
+        assert cache.key("hello world") != other.key("hello world")
+
+    def test_miss_then_hit(self, cache):
+        assert cache.get_many(["a", "b"]) == [None, None]
+        cache.put_many(["a"], [[0.5, 0.25]])
+
+        assert cache.get_many(["a", "b"]) == [[0.5, 0.25], None]
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 3
+
+    def test_lru_eviction_respects_byte_limit(self):
+        # Each 2-dim float32 vector is 8 bytes, so only two fit
+        cache = EmbeddingCache(model_id="m", max_bytes=16)
+        cache.put_many(["a", "b"], [[1.0, 1.0], [2.0, 2.0]])
+        cache.get_many(["a"])  # touch "a" so "b" is least recently used
+        cache.put_many(["c"], [[3.0, 3.0]])
+
+        assert cache.get_many(["a", "b", "c"]) == [[1.0, 1.0], None, [3.0, 3.0]]
+        assert cache.stats()["memory_bytes"] <= 16
+        assert cache.stats()["evictions"] == 1
+
+    def test_sqlite_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        first = EmbeddingCache(model_id="m", max_bytes=1024, sqlite_path=path)
+        first.put_many(["persisted"], [[0.5, 0.75]])
+
+        second = EmbeddingCache(model_id="m", max_bytes=1024, sqlite_path=path)
+        assert second.get_many(["persisted"]) == [[0.5, 0.75]]
+        assert second.stats()["disk_hits"] == 1
+
+    def test_sqlite_tier_trims_to_byte_limit(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        cache = EmbeddingCache(model_id="m", max_bytes=1024, sqlite_path=path, disk_max_bytes=16)
+        cache.put_many(["a", "b", "c"], [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+
+        rows = cache._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        assert rows == 2
+
+    def test_sqlite_size_is_tracked_without_scanning(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        EmbeddingCache(model_id="m", max_bytes=1024, sqlite_path=path).put_many(["a"], [[1.0, 1.0]])
+        cache = EmbeddingCache(model_id="m", max_bytes=1024, sqlite_path=path, disk_max_bytes=32)
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+
+        cache.put_many(["b", "c"], [[2.0, 2.0], [3.0, 3.0]])
+        cache.put_many(["a"], [[1.0, 1.0, 1.0]])  # replaced with a larger vector
+        assert not any("SUM(" in statement for statement in statements)
+        assert cache.stats()["disk_bytes"] == 28
+
+        # Past the limit the real total is summed once, then rows are trimmed
+        cache.put_many(["d"], [[4.0, 4.0]])
+        assert sum("SUM(" in statement for statement in statements) == 1
+        total = cache._conn.execute("SELECT SUM(LENGTH(vector)) FROM embeddings").fetchone()[0]
+        assert cache.stats()["disk_bytes"] == total <= 32
+
+
+class TestCachedGetEmbeddings:
+    """Test cases for get_embeddings with the cache in front."""
+
+    @patch('app.services.embedder.call_embedding_model')
+    def test_only_misses_reach_bedrock(self, mock_call_embedding_model, cache):
+        mock_call_embedding_model.side_effect = lambda text: [float(len(text))]
+
+        with patch('app.services.embedder.embedding_cache', cache):
+            first = get_embeddings(["one", "three"], max_workers=1)
+            second = get_embeddings(["three", "fives", "one"], max_workers=1)
+
+        assert first == [[3.0], [5.0]]
+        assert second == [[5.0], [5.0], [3.0]]
+        assert [call.args[0] for call in mock_call_embedding_model.call_args_list] == ["one", "three", "fives"]
+
+    @patch('app.services.embedder.call_embedding_model')
+    def test_duplicates_within_a_call_embedded_once(self, mock_call_embedding_model, cache):
+        mock_call_embedding_model.return_value = [0.5]
+
+        with patch('app.services.embedder.embedding_cache', cache):
+            result = get_embeddings(["header", "header ", "body", "header"], max_workers=1)
+
+        assert result == [[0.5]] * 4
+        assert mock_call_embedding_model.call_count == 2
+
+
+class TestCachedQueryEmbedding:
+    """Test cases for aget_query_embedding with the cache in front."""
+
+    def test_sqlite_tier_is_used_off_the_event_loop(self, tmp_path):
+        cache = EmbeddingCache(model_id="m", max_bytes=1024, sqlite_path=str(tmp_path / "embeddings.db"))
+        loop_thread = threading.get_ident()
+        sqlite_threads = []
+        cache._conn.set_trace_callback(lambda statement: sqlite_threads.append(threading.get_ident()))
+
+        async def fake_embed(text):
+            return [0.5, 0.25]
+
+        with patch("app.services.embedder.embedding_cache", cache), \
+             patch("app.services.embedder.aembed_with_retry", fake_embed):
+            assert asyncio.run(aget_query_embedding("query")) == [0.5, 0.25]
+            sqlite_threads.clear()
+            # Now in the memory tier: served inline without touching SQLite
+            assert asyncio.run(aget_query_embedding("query")) == [0.5, 0.25]
+            assert sqlite_threads == []
+
+            cache._memory.clear()
+            assert asyncio.run(aget_query_embedding("query")) == [0.5, 0.25]
+
+        assert sqlite_threads and loop_thread not in sqlite_threads
+        assert cache.stats()["disk_hits"] == 1
+        assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 1)
@@ -0,0 +1,190 @@
+# tests/test_ingestion_queue.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import IngestionJob
+from app.services.ingestion_queue import IngestionQueue
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.drop_all(bind=engine)
+
+
+def make_queue(session_factory, tmp_path, handler):
+    return IngestionQueue(session_factory, handler=handler, max_workers=2, spool_dir=str(tmp_path / "spool"))
+
+
+def get_job(session_factory, job_id):
+    db = session_factory()
+    try:
+        return db.get(IngestionJob, job_id)
+    finally:
+        db.close()
+
+
+class TestIngestionQueue:
+    """Test cases for the background ingestion queue."""
+
+    def test_successful_job_reports_progress_and_result(self, session_factory, tmp_path):
+        seen = {}
+
+        def handler(user_id, filename, file_bytes, progress_callback=None):
+            seen["args"] = (user_id, filename, file_bytes)
+            progress_callback("embedding", 0.5)
+            return {"document_id": None, "num_chunks": 7}
+
+        queue = make_queue(session_factory, tmp_path, handler)
+        job_id = queue.enqueue(1, "doc.pdf", b"payload")
+        queue.shutdown(wait=True)
+
+        job = get_job(session_factory, job_id)
+        assert seen["args"] == (1, "doc.pdf", b"payload")
+        assert job.status == "completed"
+        assert job.stage == "completed"
+        assert job.progress == 1.0
+        assert job.num_chunks == 7
+        assert job.spool_path is None
+        assert list((tmp_path / "spool").iterdir()) == []
+
+    def test_enqueue_many_records_batch(self, session_factory, tmp_path):
+        processed = []
+
+        def handler(user_id, filename, file_bytes, progress_callback=None):
+            processed.append((filename, file_bytes))
+            return {"num_chunks": 1}
+
+        queue = make_queue(session_factory, tmp_path, handler)
+        job_ids = queue.enqueue_many(1, [("a.pdf", b"a"), ("b.txt", b"b")], batch_id="batch-1")
+        queue.shutdown(wait=True)
+
+        jobs = [get_job(session_factory, job_id) for job_id in job_ids]
+        assert [job.filename for job in jobs] == ["a.pdf", "b.txt"]
+        assert all(job.batch_id == "batch-1" and job.status == "completed" for job in jobs)
+        assert sorted(processed) == [("a.pdf", b"a"), ("b.txt", b"b")]
+
+    def test_failed_job_records_error(self, session_factory, tmp_path):
+        def handler(user_id, filename, file_bytes, progress_callback=None):
+            raise ValueError("No extractable text found.")
+
+        queue = make_queue(session_factory, tmp_path, handler)
+        job_id = queue.enqueue(1, "empty.pdf", b"")
+        queue.shutdown(wait=True)
+
+        job = get_job(session_factory, job_id)
+        assert job.status == "failed"
+        assert "No extractable text" in job.error
+
+    def test_enqueue_returns_before_ingestion_finishes(self, session_factory, tmp_path):
+        release = threading.Event()
+
+        def handler(user_id, filename, file_bytes, progress_callback=None):
+            release.wait(timeout=5)
+            return {"num_chunks": 1}
+
+        queue = make_queue(session_factory, tmp_path, handler)
+        job_id = queue.enqueue(1, "slow.pdf", b"x")
+        assert get_job(session_factory, job_id).status in ("queued", "running")
+
+        release.set()
+        queue.shutdown(wait=True)
+        assert get_job(session_factory, job_id).status == "completed"
+
+    def test_start_recovers_queued_and_expired_jobs(self, session_factory, tmp_path):
+        spool = tmp_path / "spool"
+        spool.mkdir()
+        names = ("queued.pdf", "stale.pdf", "active.pdf", "expired.pdf", "leased.pdf")
+        paths = []
+        for name in names:
+            path = spool / name
+            path.write_bytes(b"data")
+            paths.append(str(path))
+
+        db = session_factory()
+        now = datetime.utcnow()
+        long_ago = now - timedelta(hours=1)
+        db.add_all([
+            IngestionJob(id=1, user_id=1, filename="queued.pdf", spool_path=paths[0], status="queued"),
+            # Recorded before leases: judged by their last progress report
+            IngestionJob(id=2, user_id=1, filename="stale.pdf", spool_path=paths[1], status="running", updated_at=long_ago),
+            IngestionJob(id=3, user_id=1, filename="active.pdf", spool_path=paths[2], status="running"),
+            IngestionJob(
+                id=4, user_id=1, filename="expired.pdf", spool_path=paths[3], status="running",
+                lease_owner="gone", lease_expires_at=now - timedelta(seconds=1),
+            ),
+            # A long step without progress reports, while its worker keeps renewing the lease
+            IngestionJob(
+                id=5, user_id=1, filename="leased.pdf", spool_path=paths[4], status="running", updated_at=long_ago,
+                lease_owner="busy", lease_expires_at=now + timedelta(minutes=1),
+            ),
+        ])
+        db.commit()
+        db.close()
+
+        processed = []
+
+        def handler(user_id, filename, file_bytes, progress_callback=None):
+            processed.append(filename)
+            return {"num_chunks": 1}
+
+        queue = make_queue(session_factory, tmp_path, handler)
+        queue.start()
+        queue.shutdown(wait=True)
+
+        assert sorted(processed) == ["expired.pdf", "queued.pdf", "stale.pdf"]
+        assert get_job(session_factory, 3).status == "running"
+        assert get_job(session_factory, 5).status == "running"
+
+    def test_running_job_keeps_its_lease(self, session_factory, tmp_path):
+        release = threading.Event()
+        started = threading.Event()
+
+        def handler(user_id, filename, file_bytes, progress_callback=None):
+            started.set()
+            release.wait(5)
+            return {"num_chunks": 1}
+
+        queue = IngestionQueue(
+            session_factory, handler=handler, spool_dir=str(tmp_path / "spool"), lease=timedelta(seconds=0.3)
+        )
+        job_id = queue.enqueue(1, "slow.pdf", b"x")
+        assert started.wait(5)
+        first_lease = get_job(session_factory, job_id).lease_expires_at
+        time.sleep(0.5)
+
+        # Past the first lease, but renewed by the heartbeat, so another worker leaves it alone
+        other = make_queue(session_factory, tmp_path, handler)
+        other.lease = timedelta(seconds=0.3)
+        other.start()
+        job = get_job(session_factory, job_id)
+        assert job.status == "running"
+        assert job.lease_expires_at > first_lease
+
+        release.set()
+        queue.shutdown(wait=True)
+        other.shutdown(wait=True)
+        job = get_job(session_factory, job_id)
+        assert (job.status, job.lease_owner) == ("completed", None)
+
+    def test_job_is_only_claimed_once(self, session_factory, tmp_path):
+        calls = []
+
+        def handler(user_id, filename, file_bytes, progress_callback=None):
+            calls.append(filename)
+            return {"num_chunks": 1}
+
+        queue = make_queue(session_factory, tmp_path, handler)
+        job_id = queue.enqueue(1, "doc.pdf", b"x")
+        queue.submit(job_id)
+        queue.shutdown(wait=True)
+
+        assert calls == ["doc.pdf"]
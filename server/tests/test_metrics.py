@@ -0,0 +1,111 @@
+# tests/test_metrics.py
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import metrics
+from app.services.metrics import Histogram, MetricsRegistry, TimedIterator
+
+
+class TestHistogram:
+    """Test cases for the Prometheus histogram and registry."""
+
+    def test_exposition_has_cumulative_buckets_sum_and_count(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, stage="embed")
+
+        lines = registry.render().splitlines()
+
+        assert "# TYPE demo_seconds histogram" in lines
+        assert 'demo_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+        assert 'demo_seconds_bucket{stage="embed",le="1.0"} 3' in lines
+        assert 'demo_seconds_bucket{stage="embed",le="+Inf"} 4' in lines
+        assert 'demo_seconds_sum{stage="embed"} 6.05' in lines
+        assert 'demo_seconds_count{stage="embed"} 4' in lines
+
+    def test_gauge_samples_are_read_at_render_time(self):
+        registry = MetricsRegistry()
+        state = {"value": 1}
+        registry.gauge("demo_open", "Demo gauge.", lambda: [({"pool": 'a"b'}, state["value"])])
+        state["value"] = 7
+
+        assert 'demo_open{pool="a\\"b"} 7.0' in registry.render().splitlines()
+
+    def test_failing_gauge_is_skipped(self):
+        registry = MetricsRegistry()
+        registry.gauge("broken", "Broken.", lambda: 1 / 0)
+        registry.gauge("working", "Working.", lambda: [({}, 1)])
+
+        output = registry.render()
+
+        assert "broken" not in output
+        assert "working 1.0" in output
+
+
+class TestTracing:
+    """Test cases for spans, traces and stage timing."""
+
+    def test_stages_are_children_of_the_trace_root(self):
+        before = metrics.stage_seconds.snapshot(pipeline="test", stage="inner") or {"count": 0}
+        with metrics.trace("request") as root:
+            with metrics.stage("test", "inner") as inner:
+                pass
+
+        assert inner.trace is root.trace
+        assert inner.parent_id == root.span_id
+        assert metrics.stage_seconds.snapshot(pipeline="test", stage="inner")["count"] == before["count"] + 1
+        assert metrics.current_span() is None
+
+    def test_traceparent_continues_the_callers_trace(self):
+        trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+        with metrics.trace("request", traceparent=f"00-{trace_id}-{parent_id}-01") as root:
+            pass
+
+        assert root.trace.trace_id == trace_id
+        assert root.parent_id == parent_id
+
+    def test_timed_iterators_exclude_nested_time(self):
+        def slow(items, delay):
+            for item in items:
+                time.sleep(delay)
+                yield item
+
+        with metrics.trace("job") as root:
+            inner = TimedIterator(slow(range(3), 0.02), "test", "extract")
+            outer = TimedIterator(slow(inner, 0.01), "test", "chunk", exclude=inner)
+            assert list(outer) == [0, 1, 2]
+
+        spans = {span.name: span for span in root.trace.spans}
+        assert spans["extract"].duration >= 0.06
+        # The chunk stage is its own sleeps only, not the extraction it pulled through
+        assert 0.03 <= spans["chunk"].duration < outer.elapsed - 0.05
+        assert spans["chunk"].parent_id == root.span_id
+
+
+class TestMetricsEndpoint:
+    """Test cases for /metrics and request tracing."""
+
+    def test_requests_are_traced_and_exported(self):
+        client = TestClient(app)
+
+        response = client.get("/health")
+        assert len(response.headers["X-Trace-Id"]) == 32
+
+        body = client.get("/metrics").text
+        assert 'rag_http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+        assert "# TYPE rag_db_pool gauge" in body
+
+    def test_failure_starting_a_trace_is_raised_as_is(self):
+        client = TestClient(app)
+
+        with patch.object(metrics, "trace", side_effect=RuntimeError("tracer unavailable")):
+            with pytest.raises(RuntimeError, match="tracer unavailable"):
+                client.get("/health")
+
+        body = client.get("/metrics").text
+        assert 'rag_http_request_duration_seconds_count{method="GET",route="unmatched",status="500"}' in body
@@ -0,0 +1,110 @@
+# tests/test_migrations.py
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+
+# The tables as the original release created them, plus ingestion_jobs as first added
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, email VARCHAR NOT NULL UNIQUE, first_name VARCHAR NOT NULL,
+        last_name VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL, is_active BOOLEAN, created_at DATETIME)""",
+    """CREATE TABLE refresh_tokens (
+        id INTEGER PRIMARY KEY, token TEXT NOT NULL UNIQUE, user_id INTEGER NOT NULL REFERENCES users(id),
+        expires_at DATETIME NOT NULL, is_revoked BOOLEAN, created_at DATETIME)""",
+    """CREATE TABLE documents (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), filename VARCHAR NOT NULL,
+        file_path VARCHAR NOT NULL, file_size INTEGER, content_type VARCHAR, pinecone_namespace VARCHAR,
+        created_at DATETIME)""",
+    """CREATE TABLE chat_sessions (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), title VARCHAR NOT NULL,
+        created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE chat_messages (
+        id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL REFERENCES chat_sessions(id), role VARCHAR NOT NULL,
+        content TEXT NOT NULL, created_at DATETIME)""",
+    """CREATE TABLE ingestion_jobs (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), filename VARCHAR NOT NULL,
+        spool_path VARCHAR, status VARCHAR NOT NULL, stage VARCHAR NOT NULL, progress FLOAT NOT NULL, error TEXT,
+        document_id INTEGER REFERENCES documents(id), num_chunks INTEGER, created_at DATETIME, updated_at DATETIME)""",
+]
+
+EXPECTED_COLUMNS = [
+    ("ingestion_jobs", "batch_id"),
+    ("documents", "content_hash"),
+    ("document_chunks", "vector_id"),
+    ("chat_sessions", "summary"),
+    ("chat_sessions", "summary_through_id"),
+    ("refresh_tokens", "jti"),
+    ("refresh_tokens", "revoked_at"),
+    ("documents", "deleting_at"),
+    ("documents", "chunk_strategy"),
+    ("ingestion_jobs", "chunk_strategy"),
+    ("users", "documents_version"),
+    ("ingestion_jobs", "lease_owner"),
+    ("ingestion_jobs", "lease_expires_at"),
+]
+EXPECTED_INDEXES = [
+    ("ingestion_jobs", "ix_ingestion_jobs_batch_id"),
+    ("document_chunks", "ix_document_chunks_document_id"),
+    ("refresh_tokens", "ix_refresh_tokens_jti"),
+    ("refresh_tokens", "ix_refresh_tokens_expires_at"),
+    ("chat_sessions", "ix_chat_sessions_user_id_updated_at"),
+    ("chat_messages", "ix_chat_messages_session_id_created_at"),
+]
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(str(SERVER_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(SERVER_DIR / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.execute(text(statement))
+    yield url, engine
+    engine.dispose()
+
+
+class TestMigrations:
+    """Test cases for upgrading databases created by earlier releases."""
+
+    def test_upgrade_adds_every_new_column_and_index(self, baseline_db):
+        url, engine = baseline_db
+        command.upgrade(alembic_config(url), "head")
+
+        inspector = inspect(engine)
+        for table, column in EXPECTED_COLUMNS:
+            assert column in {c["name"] for c in inspector.get_columns(table)}, (table, column)
+        for table, index in EXPECTED_INDEXES:
+            assert index in {i["name"] for i in inspector.get_indexes(table)}, (table, index)
+
+    def test_upgraded_schema_matches_the_models(self, baseline_db):
+        url, engine = baseline_db
+        command.upgrade(alembic_config(url), "head")
+
+        inspector = inspect(engine)
+        for table in Base.metadata.sorted_tables:
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            assert {c.name for c in table.columns} <= columns, table.name
+
+    def test_upgrade_is_a_no_op_on_a_fresh_database(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'fresh.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        command.upgrade(alembic_config(url), "head")
+        command.downgrade(alembic_config(url), "base")
+        command.upgrade(alembic_config(url), "head")
+        engine.dispose()
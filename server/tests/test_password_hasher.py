@@ -0,0 +1,42 @@
+# tests/test_password_hasher.py
+import asyncio
+import threading
+
+import pytest
+
+from app.services.password_hasher import HashingPoolSaturated, PasswordHashingPool
+
+
+class TestPasswordHashingPool:
+    """Test cases for the bounded password hashing pool."""
+
+    def test_runs_work_and_returns_result(self):
+        pool = PasswordHashingPool(max_workers=2, max_queue=2)
+        try:
+            assert asyncio.run(pool.run(str.upper, "secret")) == "SECRET"
+            assert pool.stats()["completed"] == 1
+            assert pool.stats()["in_flight"] == 0
+        finally:
+            pool.shutdown()
+
+    def test_rejects_calls_beyond_workers_plus_queue(self):
+        pool = PasswordHashingPool(max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.ensure_future(pool.run(release.wait))
+            queued = asyncio.ensure_future(pool.run(release.wait))
+            await asyncio.sleep(0)
+            with pytest.raises(HashingPoolSaturated):
+                await pool.run(release.wait)
+            release.set()
+            await asyncio.gather(running, queued)
+            # Slots are free again once the admitted calls finish
+            return await pool.run(str.upper, "ok")
+
+        try:
+            assert asyncio.run(scenario()) == "OK"
+            assert pool.stats()["rejected"] == 1
+        finally:
+            release.set()
+            pool.shutdown()
@@ -1,7 +1,9 @@
 # tests/test_query_handler.py
+import asyncio
 import pytest
 from unittest.mock import MagicMock, patch
 from app.services import query_handler
+from app.services.chat_history import EXCERPTS_HEADING
 from app.models import ChatSession, ChatMessage
 from sqlalchemy.orm import Session
 
@@ -47,6 +49,21 @@ def test_build_titan_prompt():
     assert result == expected
 
 
+def test_build_claude_messages():
+    chat_history = [
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": "Hi, how can I help?"},
+    ]
+
+    result = query_handler.build_claude_messages(
+        "You are a helpful assistant.", chat_history, "What is RAG?", context="RAG is retrieval.", summary="User: earlier"
+    )
+
+    assert result["system"] == ["You are a helpful assistant.", f"{EXCERPTS_HEADING}\nUser: earlier"]
+    assert result["messages"][:2] == chat_history
+    assert result["messages"][-1] == {"role": "user", "content": "Context:\nRAG is retrieval.\n\nQuestion: What is RAG?"}
+
+
 # @patch("app.services.query_handler.call_bedrock_model")
 # @patch("app.services.query_handler.get_embeddings")
 # @patch("app.services.query_handler.query_similar_chunks")
@@ -122,3 +139,266 @@ def test_run_chat_no_session():
             system_prompt="System here.",
             user_input="Yo!",
         )
+
+
+class TestChatStream:
+    """Test cases for streaming chat replies."""
+
+    @pytest.fixture
+    def session_factory(self, tmp_path):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def saved_messages(self, session_factory):
+        db = session_factory()
+        try:
+            return [(m.role, m.content) for m in db.query(ChatMessage).all()]
+        finally:
+            db.close()
+
+    def test_stream_persists_full_reply(self, session_factory):
+        stream = query_handler.ChatStream(1, iter(["Hel", "lo", "!"]), session_factory=session_factory)
+
+        assert list(stream) == ["Hel", "lo", "!"]
+        assert stream.message_id is not None
+        assert self.saved_messages(session_factory) == [("assistant", "Hello!")]
+
+    def test_stream_persists_partial_reply_once(self, session_factory):
+        stream = query_handler.ChatStream(1, iter(["Par", "tial", " never"]), session_factory=session_factory)
+
+        iterator = iter(stream)
+        next(iterator)
+        next(iterator)
+        stream.finalize()  # client disconnected
+        stream.finalize()
+
+        assert self.saved_messages(session_factory) == [("assistant", "Partial")]
+
+    def test_empty_stream_saves_nothing(self, session_factory):
+        stream = query_handler.ChatStream(1, iter([]), session_factory=session_factory)
+
+        assert list(stream) == []
+        assert stream.message_id is None
+        assert self.saved_messages(session_factory) == []
+
+    @patch("app.services.bedrock_client.BEDROCK_FAKE_STREAM", True)
+    @patch("app.services.query_handler.answer_cache", None)
+    @patch("app.services.query_handler._start_turn", return_value=([], ""))
+    @patch("app.services.query_handler._build_prompt", return_value=("System\nUser: ping", []))
+    def test_run_chat_stream_uses_fake_stream(self, mock_prompt, mock_turn, session_factory):
+        db = MagicMock(spec=Session)
+
+        stream = query_handler.run_chat(
+            db=db,
+            user_id=1,
+            session_id=1,
+            model="claude",
+            system_prompt="System",
+            user_input="ping",
+            stream=True,
+        )
+        stream.session_factory = session_factory
+        text = "".join(stream)
+
+        assert text == "[fake stream] You said: User: ping"
+        assert self.saved_messages(session_factory) == [("assistant", text)]
+
+
+class TestAnswerCacheInRunChat:
+    """Test cases for serving repeated first-turn questions from the answer cache."""
+
+    @pytest.fixture
+    def cache(self):
+        from app.services.answer_cache import SemanticAnswerCache
+
+        cache = SemanticAnswerCache(threshold=0.9, max_entries=10, ttl_seconds=3600)
+        with patch("app.services.query_handler.answer_cache", cache):
+            yield cache
+
+    def ask(self, question, history=(), enable_rag=True, documents_version=0):
+        with patch("app.services.query_handler._start_turn", return_value=(list(history), "")), \
+             patch("app.services.query_handler.documents_version", return_value=documents_version), \
+             patch("app.services.query_handler._save_reply"):
+            return query_handler.run_chat(
+                db=MagicMock(spec=Session),
+                user_id=1,
+                session_id=1,
+                model="claude",
+                system_prompt="System",
+                user_input=question,
+                enable_rag=enable_rag,
+            )
+
+    @patch("app.services.query_handler.get_embeddings", return_value=[[1.0, 0.0]])
+    @patch("app.services.query_handler._build_prompt", return_value=("prompt", ["doc-1-a"]))
+    @patch("app.services.bedrock_client.call_bedrock_model", return_value="Generated")
+    def test_repeat_question_is_served_from_cache(self, mock_model, mock_prompt, mock_embed, cache):
+        assert self.ask("What is the refund policy?") == "Generated"
+        assert self.ask("what's the refund policy") == "Generated"
+
+        assert mock_model.call_count == 1
+        assert mock_prompt.call_count == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    @patch("app.services.query_handler.get_embeddings", return_value=[[1.0, 0.0]])
+    @patch("app.services.query_handler._build_prompt", return_value=("prompt", []))
+    @patch("app.services.bedrock_client.call_bedrock_model", return_value="Generated")
+    def test_turns_with_history_bypass_cache(self, mock_model, mock_prompt, mock_embed, cache):
+        history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+        self.ask("What is the refund policy?", history)
+        self.ask("What is the refund policy?", history)
+
+        assert mock_model.call_count == 2
+        assert cache.stats()["hits"] + cache.stats()["misses"] == 0
+
+    @patch("app.services.query_handler.get_embeddings", return_value=[[1.0, 0.0]])
+    @patch("app.services.query_handler._build_prompt", return_value=("prompt", []))
+    @patch("app.services.bedrock_client.call_bedrock_model", return_value="Generated")
+    def test_turns_without_rag_skip_cache_and_embedding(self, mock_model, mock_prompt, mock_embed, cache):
+        self.ask("What is the refund policy?", enable_rag=False)
+        self.ask("What is the refund policy?", enable_rag=False)
+
+        assert mock_model.call_count == 2
+        mock_embed.assert_not_called()
+        assert cache.stats()["hits"] + cache.stats()["misses"] == 0
+
+    @patch("app.services.query_handler.get_embeddings", return_value=[[1.0, 0.0]])
+    @patch("app.services.query_handler._build_prompt", return_value=("prompt", []))
+    @patch("app.services.bedrock_client.call_bedrock_model", return_value="Generated")
+    def test_documents_changed_in_another_worker_miss(self, mock_model, mock_prompt, mock_embed, cache):
+        self.ask("What is the refund policy?", documents_version=3)
+        self.ask("What is the refund policy?", documents_version=4)
+
+        assert mock_model.call_count == 2
+        assert cache.stats()["hits"] == 0
+
+
+class TestAsyncChat:
+    """Test cases for the async chat path."""
+
+    @pytest.fixture
+    def database(self, tmp_path):
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy import create_engine
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base, async_database_url
+        from app.services.chat_history import chat_history_builder
+
+        url = f"sqlite:///{tmp_path / 'chat.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        db.add(ChatSession(id=1, user_id=1, title="Async"))
+        db.commit()
+        db.close()
+        chat_history_builder.forget(1)
+
+        async_engine = create_async_engine(async_database_url(url))
+        yield sessionmaker(bind=engine), async_sessionmaker(bind=async_engine, expire_on_commit=False)
+        asyncio.run(async_engine.dispose())
+        chat_history_builder.forget(1)
+
+    def saved_messages(self, session_factory):
+        db = session_factory()
+        try:
+            return [(m.role, m.content) for m in db.query(ChatMessage).order_by(ChatMessage.id)]
+        finally:
+            db.close()
+
+    @patch("app.services.query_handler.answer_cache", None)
+    def test_arun_chat_saves_both_turns(self, database):
+        sync_factory, async_factory = database
+
+        async def fake_model(model_key, prompt):
+            fake_model.prompt = prompt
+            return "Async reply"
+
+        async def scenario():
+            async with async_factory() as db:
+                return await query_handler.arun_chat(db, 1, 1, "claude", "System", "ping")
+
+        with patch("app.services.bedrock_async.async_call_bedrock_model", fake_model):
+            assert asyncio.run(scenario()) == "Async reply"
+
+        assert fake_model.prompt["messages"][-1] == {"role": "user", "content": "ping"}
+        assert self.saved_messages(sync_factory) == [("user", "ping"), ("assistant", "Async reply")]
+
+    @patch("app.services.query_handler.answer_cache", None)
+    @patch("app.services.bedrock_async.BEDROCK_FAKE_STREAM", True)
+    def test_arun_chat_stream_persists_reply(self, database):
+        sync_factory, async_factory = database
+
+        async def scenario():
+            async with async_factory() as db:
+                stream = await query_handler.arun_chat(db, 1, 1, "titan", "System", "ping", stream=True)
+            stream.session_factory = async_factory
+            text = "".join([delta async for delta in stream])
+            return text, stream.message_id
+
+        text, message_id = asyncio.run(scenario())
+
+        assert text.startswith("[fake stream] You said:")
+        assert message_id is not None
+        assert self.saved_messages(sync_factory) == [("user", "ping"), ("assistant", text)]
+
+    def test_arun_chat_cache_follows_documents_version(self, database):
+        from app.models import User
+        from app.services.answer_cache import SemanticAnswerCache, bump_documents_version
+        from app.services.chat_history import chat_history_builder
+
+        sync_factory, async_factory = database
+        db = sync_factory()
+        db.add(User(id=1, email="a@example.com", first_name="A", last_name="B", hashed_password="x"))
+        db.add_all([ChatSession(id=i, user_id=1, title="Async") for i in (2, 3)])
+        db.commit()
+        cache = SemanticAnswerCache(threshold=0.9, max_entries=10, ttl_seconds=3600)
+        calls = []
+
+        async def fake_model(model_key, prompt):
+            calls.append(prompt)
+            return "Async reply"
+
+        async def ask(session_id):
+            async with async_factory() as adb:
+                return await query_handler.arun_chat(adb, 1, session_id, "claude", "System", "ping", enable_rag=True)
+
+        async def fake_embedding(text):
+            return [1.0, 0.0]
+
+        async def fake_retrieve(*args, **kwargs):
+            return []
+
+        with patch("app.services.query_handler.answer_cache", cache), \
+             patch("app.services.embedder.aget_query_embedding", fake_embedding), \
+             patch("app.services.retrieval.aretrieve", fake_retrieve), \
+             patch("app.services.bedrock_async.async_call_bedrock_model", fake_model):
+            asyncio.run(ask(1))
+            asyncio.run(ask(2))
+            assert len(calls) == 1
+            # Another worker ingests a document for this user
+            bump_documents_version(db, 1)
+            db.commit()
+            asyncio.run(ask(3))
+
+        assert len(calls) == 2
+        assert cache.stats()["hits"] == 1
+        db.close()
+        for session_id in (2, 3):
+            chat_history_builder.forget(session_id)
+
+    def test_arun_chat_unknown_session(self, database):
+        _, async_factory = database
+
+        async def scenario():
+            async with async_factory() as db:
+                await query_handler.arun_chat(db, 1, 99, "claude", "System", "ping")
+
+        with pytest.raises(RuntimeError, match="Session not found"):
+            asyncio.run(scenario())
@@ -0,0 +1,106 @@
+# tests/test_refresh_tokens.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import RefreshToken
+from app.services.refresh_tokens import RefreshTokenSweeper, RevocationFilter, sweep_refresh_tokens
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tokens.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def add_tokens(db, count, expires_in=timedelta(days=1), revoked=False, prefix="t"):
+    now = datetime.utcnow()
+    db.add_all(
+        RefreshToken(
+            jti=f"{prefix}{i:031d}"[:32],
+            user_id=1,
+            expires_at=now + expires_in,
+            is_revoked=revoked,
+            revoked_at=now if revoked else None,
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+class TestRevocationFilter:
+    """Test cases for the refresh token revocation bloom filter."""
+
+    def test_everything_may_be_revoked_before_first_sync(self):
+        revocation_filter = RevocationFilter(capacity=100, fp_rate=0.01)
+        assert revocation_filter.might_contain("never-seen")
+
+    def test_sync_loads_revoked_unexpired_tokens(self, session_factory):
+        db = session_factory()
+        add_tokens(db, 5, revoked=True, prefix="r")
+        add_tokens(db, 5, prefix="a")
+        add_tokens(db, 5, expires_in=timedelta(days=-1), revoked=True, prefix="x")
+
+        revocation_filter = RevocationFilter(capacity=100, fp_rate=0.001)
+        revocation_filter.sync(db)
+
+        assert all(revocation_filter.might_contain(f"r{i:031d}") for i in range(5))
+        assert not any(revocation_filter.might_contain(f"a{i:031d}") for i in range(5))
+        assert revocation_filter.count == 5
+        db.close()
+
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        revocation_filter = RevocationFilter(capacity=2000, fp_rate=0.01)
+        revocation_filter.ready = True
+        for i in range(2000):
+            revocation_filter.add(f"revoked-{i}")
+
+        assert all(revocation_filter.might_contain(f"revoked-{i}") for i in range(2000))
+        false_positives = sum(revocation_filter.might_contain(f"live-{i}") for i in range(5000))
+        assert false_positives / 5000 < 0.03
+
+    def test_saturated_filter_is_rebuilt_from_database(self, session_factory):
+        db = session_factory()
+        add_tokens(db, 2, revoked=True, prefix="r")
+        revocation_filter = RevocationFilter(capacity=3, fp_rate=0.01)
+        revocation_filter.sync(db)
+        for i in range(5):
+            revocation_filter.add(f"stale-{i}")
+        assert revocation_filter.saturated
+
+        revocation_filter.sync(db)
+
+        assert revocation_filter.count == 2
+        assert revocation_filter.might_contain(f"r{0:031d}")
+        db.close()
+
+
+class TestSweepRefreshTokens:
+    """Test cases for batched refresh token expiry."""
+
+    def test_deletes_expired_and_revoked_in_batches(self, session_factory):
+        db = session_factory()
+        add_tokens(db, 7, expires_in=timedelta(days=-1), prefix="x")
+        add_tokens(db, 3, revoked=True, prefix="r")
+        add_tokens(db, 4, prefix="a")
+
+        assert sweep_refresh_tokens(db, batch_size=2) == 10
+        assert db.query(RefreshToken).count() == 4
+        db.close()
+
+    def test_revoked_tokens_kept_while_filter_needs_them(self, session_factory):
+        db = session_factory()
+        add_tokens(db, 3, expires_in=timedelta(days=-1), prefix="x")
+        add_tokens(db, 3, revoked=True, prefix="r")
+        db.close()
+
+        revocation_filter = RevocationFilter(capacity=100, fp_rate=0.01)
+        sweeper = RefreshTokenSweeper(session_factory, interval=0, revocation_filter=revocation_filter)
+
+        assert sweeper.run_once() == 3
+        assert revocation_filter.ready
+        assert revocation_filter.might_contain(f"r{0:031d}")
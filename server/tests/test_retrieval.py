@@ -0,0 +1,54 @@
+# tests/test_retrieval.py
+import pytest
+from unittest.mock import patch
+
+from app.services import retrieval
+from app.services.retrieval import reciprocal_rank_fusion, retrieve
+
+
+def m(id, text=None):
+    return {"id": id, "score": 0.0, "metadata": {"text": text or id}}
+
+
+class TestReciprocalRankFusion:
+    def test_items_in_both_lists_win(self):
+        dense = [m("a"), m("b"), m("c")]
+        sparse = [m("c"), m("d")]
+
+        fused = reciprocal_rank_fusion([dense, sparse], k=60, top_k=4)
+
+        assert [f["id"] for f in fused] == ["c", "a", "b", "d"]  # b and d tie; first seen wins
+        assert fused[0]["score"] == pytest.approx(1 / 63 + 1 / 61)
+
+    def test_top_k_limits_results(self):
+        assert len(reciprocal_rank_fusion([[m("a"), m("b")], [m("c")]], top_k=2)) == 2
+
+
+class TestRetrieve:
+    @patch.object(retrieval, "sparse_search", return_value=[m("s1"), m("shared")])
+    @patch.object(retrieval, "dense_search", return_value=[m("shared"), m("d1")])
+    def test_hybrid_fuses_both_retrievers(self, mock_dense, mock_sparse):
+        matches = retrieve(1, "query", top_k=2, mode="hybrid")
+
+        assert matches[0]["id"] == "shared"
+        mock_dense.assert_called_once_with(1, "query", 2 * retrieval.HYBRID_CANDIDATE_FACTOR)
+        mock_sparse.assert_called_once_with(1, "query", 2 * retrieval.HYBRID_CANDIDATE_FACTOR)
+
+    @patch.object(retrieval, "sparse_search")
+    @patch.object(retrieval, "dense_search", return_value=[m("d1")])
+    def test_dense_mode_skips_keyword_index(self, mock_dense, mock_sparse):
+        assert retrieve(1, "query", top_k=4) == [m("d1")]
+        mock_sparse.assert_not_called()
+
+    def test_sparse_mode_reads_user_namespace(self, tmp_path):
+        from app.services.bm25_index import KeywordIndexStore
+
+        store = KeywordIndexStore(str(tmp_path))
+        store.add("user-5", ["c1"], [{"text": "firmware 4.2.1 changelog"}])
+        with patch.object(retrieval, "keyword_index", store):
+            assert [r["id"] for r in retrieve(5, "4.2.1", mode="sparse")] == ["c1"]
+            assert retrieve(6, "4.2.1", mode="sparse") == []
+
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError, match="Unsupported retrieval mode"):
+            retrieve(1, "query", mode="fuzzy")
@@ -0,0 +1,159 @@
+# tests/test_sessions.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import get_current_user
+from app.database import Base, get_db
+from app.main import app
+from app.models import ChatMessage, ChatSession
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def db_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    yield factory
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_current_user, None)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_factory):
+    return TestClient(app)
+
+
+def add_sessions(db_factory, count, user_id=1):
+    db = db_factory()
+    # Pairs of sessions share an updated_at, so pages must break ties on id
+    db.add_all(
+        ChatSession(user_id=user_id, title=f"s{i}", created_at=BASE_TIME, updated_at=BASE_TIME + timedelta(minutes=i // 2))
+        for i in range(count)
+    )
+    db.commit()
+    db.close()
+
+
+def add_messages(db_factory, count):
+    db = db_factory()
+    session = ChatSession(user_id=1, title="chat", created_at=BASE_TIME, updated_at=BASE_TIME)
+    db.add(session)
+    db.flush()
+    db.add_all(
+        ChatMessage(session_id=session.id, role="user", content=f"m{i}", created_at=BASE_TIME + timedelta(seconds=i // 3))
+        for i in range(count)
+    )
+    db.commit()
+    session_id = session.id
+    db.close()
+    return session_id
+
+
+def fetch_all(client, url, **params):
+    items, pages = [], 0
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        items.extend(response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return items, pages
+        params["cursor"] = cursor
+
+
+class TestSessionListing:
+    """Test cases for keyset-paginated session listing."""
+
+    def test_pages_cover_every_session_once_newest_first(self, client, db_factory):
+        add_sessions(db_factory, 11)
+        add_sessions(db_factory, 3, user_id=2)
+
+        sessions, pages = fetch_all(client, "/sessions/", limit=4)
+
+        assert pages == 3
+        assert len({s["id"] for s in sessions}) == 11
+        keys = [(s["updated_at"], s["id"]) for s in sessions]
+        assert keys == sorted(keys, reverse=True)
+        assert set(sessions[0]) == {"id", "title", "created_at", "updated_at"}
+
+    def test_since_returns_only_recently_updated(self, client, db_factory):
+        add_sessions(db_factory, 6)
+
+        response = client.get("/sessions/", params={"since": (BASE_TIME + timedelta(minutes=1)).isoformat() + "Z"})
+
+        assert sorted(s["title"] for s in response.json()) == ["s4", "s5"]
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_invalid_cursor_is_rejected(self, client, db_factory):
+        assert client.get("/sessions/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+class TestMessageListing:
+    """Test cases for keyset-paginated message listing."""
+
+    def test_pages_return_transcript_in_order(self, client, db_factory):
+        session_id = add_messages(db_factory, 10)
+
+        messages, pages = fetch_all(client, f"/sessions/{session_id}/messages", limit=4)
+
+        assert pages == 3
+        assert [m["content"] for m in messages] == [f"m{i}" for i in range(10)]
+
+    def test_descending_pages_start_from_the_newest(self, client, db_factory):
+        session_id = add_messages(db_factory, 10)
+
+        first = client.get(f"/sessions/{session_id}/messages", params={"limit": 4, "order": "desc"})
+        assert [m["content"] for m in first.json()] == ["m9", "m8", "m7", "m6"]
+
+        messages, pages = fetch_all(client, f"/sessions/{session_id}/messages", limit=4, order="desc")
+        assert pages == 3
+        assert [m["content"] for m in messages] == [f"m{i}" for i in reversed(range(10))]
+        assert client.get(f"/sessions/{session_id}/messages", params={"order": "newest"}).status_code == 422
+
+    def test_since_returns_only_new_messages(self, client, db_factory):
+        session_id = add_messages(db_factory, 9)
+
+        response = client.get(f"/sessions/{session_id}/messages", params={"since": (BASE_TIME + timedelta(seconds=1)).isoformat()})
+
+        assert [m["content"] for m in response.json()] == ["m6", "m7", "m8"]
+
+    def test_other_users_session_is_not_found(self, client, db_factory):
+        session_id = add_messages(db_factory, 1)
+        app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=2)
+
+        assert client.get(f"/sessions/{session_id}/messages").status_code == 404
+
+
+class TestSessionDeletion:
+    """Test cases for deleting a session and its transcript."""
+
+    def test_delete_removes_session_and_messages(self, client, db_factory):
+        session_id = add_messages(db_factory, 5)
+        other_id = add_messages(db_factory, 2)
+
+        assert client.delete(f"/sessions/{session_id}").status_code == 200
+
+        db = db_factory()
+        assert db.query(ChatSession.id).all() == [(other_id,)]
+        assert db.query(ChatMessage).filter_by(session_id=session_id).count() == 0
+        assert db.query(ChatMessage).count() == 2
+        db.close()
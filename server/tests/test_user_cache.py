@@ -0,0 +1,48 @@
+# tests/test_user_cache.py
+from unittest.mock import patch
+
+from app.models import User
+from app.services.user_cache import UserCache
+
+
+def make_user(user_id, email="a@example.com", is_active=True):
+    return User(id=user_id, email=email, first_name="A", last_name="B", hashed_password="x", is_active=is_active)
+
+
+class TestUserCache:
+    """Test cases for the authenticated user cache."""
+
+    def test_get_returns_detached_copy(self):
+        cache = UserCache(max_entries=10, ttl_seconds=60)
+        cache.put(make_user(1))
+
+        first, second = cache.get(1), cache.get(1)
+
+        assert first.email == "a@example.com"
+        assert first is not second
+        assert cache.stats()["hits"] == 2
+
+    def test_entries_expire(self):
+        cache = UserCache(max_entries=10, ttl_seconds=60)
+        with patch("app.services.user_cache.time.monotonic", return_value=100.0):
+            cache.put(make_user(1))
+        with patch("app.services.user_cache.time.monotonic", return_value=161.0):
+            assert cache.get(1) is None
+        assert cache.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0, "entries": 0}
+
+    def test_least_recently_used_is_evicted(self):
+        cache = UserCache(max_entries=2, ttl_seconds=60)
+        cache.put(make_user(1))
+        cache.put(make_user(2))
+        cache.get(1)
+        cache.put(make_user(3))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+        assert cache.get(3) is not None
+
+    def test_invalidate(self):
+        cache = UserCache(max_entries=10, ttl_seconds=60)
+        cache.put(make_user(1))
+        cache.invalidate(1)
+        assert cache.get(1) is None
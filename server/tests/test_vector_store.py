@@ -0,0 +1,250 @@
+# tests/test_vector_store.py
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.services.vector_store import LocalVectorStore, PineconeVectorStore, VectorStore
+
+
+def vec(id, values, **metadata):
+    return {"id": id, "values": values, "metadata": metadata}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(str(tmp_path / "vectors"))
+
+
+class TestLocalVectorStore:
+    """Test cases for the in-process vector store."""
+
+    def test_query_ranks_by_cosine_similarity(self, store):
+        store.upsert("ns", [
+            vec("a", [1.0, 0.0], text="x axis"),
+            vec("b", [0.0, 10.0], text="y axis"),
+            vec("c", [1.0, 1.0], text="diagonal"),
+        ])
+
+        matches = store.query("ns", [2.0, 0.1], top_k=2)
+
+        assert [m["id"] for m in matches] == ["a", "c"]
+        assert matches[0]["metadata"]["text"] == "x axis"
+        assert matches[0]["score"] == pytest.approx(2.0 / np.linalg.norm([2.0, 0.1]), rel=1e-5)
+
+    def test_top_k_larger_than_namespace(self, store):
+        store.upsert("ns", [vec("a", [1.0, 0.0])])
+        assert len(store.query("ns", [1.0, 0.0], top_k=10)) == 1
+
+    def test_empty_namespace_returns_nothing(self, store):
+        assert store.query("missing", [1.0, 0.0], top_k=3) == []
+
+    def test_namespaces_are_isolated(self, store):
+        store.upsert("user-1", [vec("a", [1.0, 0.0])])
+        store.upsert("user-2", [vec("b", [1.0, 0.0])])
+        assert [m["id"] for m in store.query("user-1", [1.0, 0.0], top_k=5)] == ["a"]
+
+    def test_upsert_overwrites_existing_id(self, store):
+        store.upsert("ns", [vec("a", [1.0, 0.0], v=1), vec("b", [0.0, 1.0])])
+        store.upsert("ns", [vec("a", [0.0, 1.0], v=2)])
+
+        matches = store.query("ns", [0.0, 1.0], top_k=5)
+        assert len(matches) == 2
+        a = next(m for m in matches if m["id"] == "a")
+        assert a["metadata"] == {"v": 2}
+        assert a["score"] == pytest.approx(1.0)
+
+    def test_dimension_mismatch_rejected(self, store):
+        store.upsert("ns", [vec("a", [1.0, 0.0])])
+        with pytest.raises(ValueError, match="dimension"):
+            store.upsert("ns", [vec("b", [1.0, 0.0, 0.0])])
+
+    def test_delete_by_id_and_by_document(self, store):
+        store.upsert("ns", [
+            vec("a", [1.0, 0.0], document_id=1),
+            vec("b", [0.9, 0.1], document_id=1),
+            vec("c", [0.8, 0.2], document_id=2),
+            vec("d", [0.7, 0.3], document_id=3),
+        ])
+
+        store.delete("ns", ids=["d"])
+        store.delete("ns", filter={"document_id": 1})
+
+        assert [m["id"] for m in store.query("ns", [1.0, 0.0], top_k=5)] == ["c"]
+
+    def test_reload_from_disk(self, tmp_path):
+        root = str(tmp_path / "vectors")
+        first = LocalVectorStore(root)
+        first.upsert("ns", [vec("a", [1.0, 0.0], text="kept"), vec("b", [0.0, 1.0], text="gone")])
+        first.delete("ns", ids=["b"])
+        first.upsert("ns", [vec("c", [0.5, 0.5], text="new")])
+
+        second = LocalVectorStore(root)
+        matches = second.query("ns", [1.0, 0.0], top_k=5)
+        assert [(m["id"], m["metadata"]["text"]) for m in matches] == [("a", "kept"), ("c", "new")]
+
+    def test_stores_sharing_a_directory_stay_in_step(self, tmp_path):
+        root = str(tmp_path / "vectors")
+        a, b = LocalVectorStore(root), LocalVectorStore(root)
+        a.upsert("ns", [vec("x", [1.0, 0.0], text="x")])
+        b.upsert("ns", [vec("y", [0.0, 1.0], text="y")])
+        a.upsert("ns", [vec("z", [0.6, 0.8], text="z")])
+
+        for store in (a, b):
+            matches = store.query("ns", [0.0, 1.0], top_k=5)
+            assert [(m["id"], m["metadata"]["text"]) for m in matches] == [("y", "y"), ("z", "z"), ("x", "x")]
+
+        b.delete("ns", ids=["x", "y"])  # crosses the compaction threshold, replacing the files
+        a.upsert("ns", [vec("w", [1.0, 0.0], text="w")])
+        assert [m["id"] for m in b.query("ns", [1.0, 0.0], top_k=5)] == ["w", "z"]
+        assert [m["id"] for m in a.query("ns", [1.0, 0.0], top_k=5)] == ["w", "z"]
+
+    def test_compaction_keeps_live_rows(self, tmp_path):
+        root = str(tmp_path / "vectors")
+        store = LocalVectorStore(root)
+        store.upsert("ns", [vec(str(i), [1.0, float(i)], document_id=i % 3) for i in range(9)])
+
+        store.delete("ns", filter={"document_id": 0})
+        store.delete("ns", filter={"document_id": 1})  # crosses the compaction threshold
+
+        ns = store._namespace("ns")
+        assert len(ns.ids) == 3
+        reloaded = LocalVectorStore(root)
+        assert sorted(m["id"] for m in reloaded.query("ns", [1.0, 0.0], top_k=10)) == ["2", "5", "8"]
+
+
+class TestPineconeVectorStore:
+    """Test cases for the Pinecone adapter."""
+
+    def test_calls_are_forwarded_to_index(self):
+        index = MagicMock()
+        index.query.return_value = {"matches": [{"id": "a", "score": 0.9, "metadata": {}}]}
+        store = PineconeVectorStore(index)
+
+        store.upsert("user-1", [vec("a", [1.0])])
+        matches = store.query("user-1", [1.0], top_k=3)
+        store.delete("user-1", filter={"document_id": 7})
+
+        index.upsert.assert_called_once_with(vectors=[vec("a", [1.0])], namespace="user-1")
+        index.query.assert_called_once_with(vector=[1.0], top_k=3, include_metadata=True, namespace="user-1")
+        index.delete.assert_called_once_with(filter={"document_id": 7}, namespace="user-1")
+        assert matches[0]["id"] == "a"
+
+    def test_rejected_filter_delete_raises(self):
+        index = MagicMock()
+        index.delete.side_effect = Exception("(400) Delete by metadata is not supported")
+
+        with pytest.raises(RuntimeError, match="serverless"):
+            PineconeVectorStore(index).delete("user-1", filter={"filename": "old.pdf", "user_id": 1})
+
+
+def test_backend_must_implement_every_operation():
+    class QueryOnlyStore(VectorStore):
+        def upsert(self, namespace, vectors):
+            pass
+
+        def query(self, namespace, vector, top_k=5):
+            return []
+
+    with pytest.raises(TypeError, match="delete"):
+        QueryOnlyStore()
+
+
+def test_pinecone_client_uses_local_backend(tmp_path):
+    from app.services import pinecone_client, vector_store
+
+    with patch.object(vector_store, "_vector_store", LocalVectorStore(str(tmp_path))):
+        namespace = pinecone_client.upsert_documents("7", ["alpha", "beta"], [[1.0, 0.0], [0.0, 1.0]], {"document_id": 3})
+        matches = pinecone_client.query_similar_chunks("7", [0.0, 1.0], top_k=1)
+        pinecone_client.delete_document_vectors("7", 3)
+        remaining = pinecone_client.query_similar_chunks("7", [0.0, 1.0], top_k=5)
+
+    assert namespace == "user-7"
+    assert matches[0]["metadata"]["text"] == "beta"
+    assert matches[0]["id"] == pinecone_client.chunk_vector_id(3, "beta")
+    assert remaining == []
+
+
+def test_legacy_delete_spares_a_newer_document_with_the_same_filename(tmp_path):
+    from app.services import pinecone_client, vector_store
+
+    with patch.object(vector_store, "_vector_store", LocalVectorStore(str(tmp_path))):
+        # Indexed by the original code, with no document_id, then re-uploaded as document 4
+        pinecone_client.upsert_documents("7", ["old"], [[1.0, 0.0]], {"filename": "a.pdf", "user_id": "7"})
+        pinecone_client.upsert_documents("7", ["new"], [[0.0, 1.0]], {"filename": "a.pdf", "user_id": "7", "document_id": 4})
+
+        pinecone_client.delete_document_vectors("7", 3, "a.pdf")
+        remaining = pinecone_client.query_similar_chunks("7", [1.0, 1.0], top_k=5)
+
+    assert [m["metadata"]["text"] for m in remaining] == ["new"]
+
+
+class TestIVFIndex:
+    """Test cases for the approximate IVF index on the local store."""
+
+    @pytest.fixture
+    def data(self):
+        rng = np.random.default_rng(0)
+        centres = rng.normal(size=(20, 16))
+        return (centres[rng.integers(0, 20, size=2000)] + 0.3 * rng.normal(size=(2000, 16))).astype(np.float32)
+
+    def make_store(self, root, data, min_train_rows=1000, nlist=20):
+        store = LocalVectorStore(root, index_type="ivf", nlist=nlist, nprobe=4, min_train_rows=min_train_rows)
+        store.upsert("ns", [vec(str(i), v.tolist(), n=i) for i, v in enumerate(data)])
+        return store
+
+    def test_index_trains_once_namespace_is_large_enough(self, tmp_path, data):
+        store = LocalVectorStore(str(tmp_path), index_type="ivf", nlist=8, min_train_rows=500)
+        store.upsert("ns", [vec(str(i), v.tolist()) for i, v in enumerate(data[:400])])
+        assert not store._namespace("ns").ivf.is_trained
+
+        store.upsert("ns", [vec(str(i), v.tolist()) for i, v in enumerate(data[400:600], start=400)])
+        assert store._namespace("ns").ivf.is_trained
+
+    def test_recall_against_exact_search(self, tmp_path, data):
+        store = self.make_store(str(tmp_path), data)
+        queries = data[:50] + 0.05
+
+        recalls = []
+        for q in queries:
+            truth = {m["id"] for m in store.query("ns", q.tolist(), top_k=10, exact=True)}
+            found = {m["id"] for m in store.query("ns", q.tolist(), top_k=10)}
+            recalls.append(len(truth & found) / 10)
+        assert np.mean(recalls) >= 0.9
+
+    def test_probing_every_list_is_exact(self, tmp_path, data):
+        store = self.make_store(str(tmp_path), data)
+        q = data[7].tolist()
+
+        exact = store.query("ns", q, top_k=10, exact=True)
+        probed = store.query("ns", q, top_k=10, nprobe=20)
+        assert [m["id"] for m in probed] == [m["id"] for m in exact]
+
+    def test_rows_added_after_training_are_found(self, tmp_path, data):
+        store = self.make_store(str(tmp_path), data)
+        store.upsert("ns", [vec("new", (data[3] * 1.01).tolist())])
+        store.upsert("ns", [vec("5", (-data[5]).tolist())])  # overwrite moves row 5 to another list
+
+        assert "new" in [m["id"] for m in store.query("ns", data[3].tolist(), top_k=3)]
+        assert store.query("ns", (-data[5]).tolist(), top_k=1)[0]["id"] == "5"
+
+    def test_stores_sharing_a_directory_share_the_index(self, tmp_path, data):
+        root = str(tmp_path)
+        trainer = self.make_store(root, data)
+        other = LocalVectorStore(root, index_type="ivf", nlist=20, nprobe=4, min_train_rows=1000)
+        other.upsert("ns", [vec("new", (data[3] * 1.01).tolist())])
+
+        assert "new" in [m["id"] for m in trainer.query("ns", data[3].tolist(), top_k=3)]
+        assert len(trainer._namespace("ns").ivf.assign) == len(data) + 1
+
+    def test_index_persists_and_survives_compaction(self, tmp_path, data):
+        root = str(tmp_path)
+        store = self.make_store(root, data)
+        store.delete("ns", filter={"n": 0})
+        store.delete("ns", ids=[str(i) for i in range(1, 1500)])  # triggers compaction
+
+        reloaded = LocalVectorStore(root, index_type="ivf", nlist=20, nprobe=20, min_train_rows=1000)
+        ns = reloaded._namespace("ns")
+        assert ns.ivf.is_trained
+        assert len(ns.ivf.assign) == len(ns.ids) == 500
+        q = data[1600].tolist()
+        assert reloaded.query("ns", q, top_k=1)[0]["id"] == "1600"
@@ -0,0 +1,94 @@
+# tests/test_vector_upserter.py
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.services.vector_upserter import iter_batches, upsert_in_batches, vector_size
+
+
+def make_vectors(n, text="chunk"):
+    return [{"id": f"v{i}", "values": [0.1, 0.2], "metadata": {"text": text}} for i in range(n)]
+
+
+class ApiError(Exception):
+    """Shaped like the Pinecone client's API errors, which carry the HTTP status."""
+
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class RecordingStore:
+    def __init__(self, fail_times=0, error=None):
+        self.calls = []
+        self.fail_times = fail_times
+        self.error = error or ConnectionError("reset by peer")
+        self.lock = threading.Lock()
+
+    def upsert(self, namespace, vectors):
+        with self.lock:
+            self.calls.append([v["id"] for v in vectors])
+            if self.fail_times:
+                self.fail_times -= 1
+                raise self.error
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    with patch("app.services.vector_upserter.time.sleep"):
+        yield
+
+
+class TestVectorUpserter:
+    """Test cases for batched, concurrent vector upserts."""
+
+    def test_batches_split_by_count(self):
+        batches = list(iter_batches(make_vectors(250), max_vectors=100, max_bytes=10 ** 9))
+        assert [len(b) for b in batches] == [100, 100, 50]
+
+    def test_batches_split_by_size(self):
+        vectors = make_vectors(10, text="x" * 1000)
+        limit = vector_size(vectors[0]) * 3
+        batches = list(iter_batches(vectors, max_vectors=100, max_bytes=limit))
+        assert [len(b) for b in batches] == [3, 3, 3, 1]
+        assert all(sum(vector_size(v) for v in b) <= limit for b in batches)
+
+    def test_oversized_vector_goes_alone(self):
+        vectors = make_vectors(3)
+        batches = list(iter_batches(vectors, max_vectors=100, max_bytes=1))
+        assert [len(b) for b in batches] == [1, 1, 1]
+
+    def test_every_vector_sent_once_with_stats(self):
+        store = RecordingStore()
+        stats = upsert_in_batches(store, "ns", make_vectors(25), max_vectors=10, max_bytes=10 ** 9)
+        sent = sorted(i for call in store.calls for i in call)
+        assert sent == sorted(f"v{i}" for i in range(25))
+        assert stats["vectors"] == 25
+        assert stats["batches"] == 3
+        assert stats["vectors_per_second"] > 0
+
+    def test_failed_batch_is_retried_with_same_ids(self):
+        store = RecordingStore(fail_times=1)
+        upsert_in_batches(store, "ns", make_vectors(5), max_vectors=10, max_bytes=10 ** 9)
+        assert store.calls == [[f"v{i}" for i in range(5)]] * 2
+
+    def test_error_raised_after_retries_exhausted(self):
+        store = RecordingStore(fail_times=100)
+        with pytest.raises(ConnectionError):
+            upsert_in_batches(store, "ns", make_vectors(20), max_vectors=10, max_bytes=10 ** 9, max_retries=2)
+        # Both batches were attempted 1 + max_retries times
+        assert len(store.calls) == 6
+
+    @pytest.mark.parametrize("error", [ApiError(429), ApiError(503), TimeoutError("read timed out")])
+    def test_transient_errors_are_retried(self, error):
+        store = RecordingStore(fail_times=1, error=error)
+        upsert_in_batches(store, "ns", make_vectors(5), max_vectors=10, max_bytes=10 ** 9)
+        assert len(store.calls) == 2
+
+    @pytest.mark.parametrize("error", [ApiError(400), ValueError("dimension mismatch")])
+    def test_permanent_errors_are_raised_at_once(self, error):
+        store = RecordingStore(fail_times=100, error=error)
+        with pytest.raises(type(error)):
+            upsert_in_batches(store, "ns", make_vectors(5), max_vectors=10, max_bytes=10 ** 9, max_retries=3)
+        assert len(store.calls) == 1